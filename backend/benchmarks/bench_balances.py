@@ -0,0 +1,119 @@
+"""
+Compare the balance ledger with aggregating splits on the fly.
+
+For a sample of user pairs and users, times:
+- pair lookup: balances primary key vs SUM over splits JOIN orders
+- user view: balances rows for one user vs GROUP BY over that user's splits
+- full summary: per-user totals from balances vs the full aggregate
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_balances --seed-orders 1000000 --seed-users 20000
+"""
+import argparse
+import random
+import sys
+import time
+
+from sqlalchemy import text
+
+from benchmarks.stats import print_table, summarize, write_results
+
+PAIR_SQL = text("""
+    SELECT COALESCE(SUM(s.amount_owed), 0)
+    FROM splits s JOIN orders o ON o.id = s.order_id
+    WHERE s.user_id = :debtor AND o.paid_by_user_id = :creditor AND COALESCE(s.paid_status, false) = false
+""")
+
+USER_SQL = text("""
+    SELECT o.paid_by_user_id, SUM(s.amount_owed)
+    FROM splits s JOIN orders o ON o.id = s.order_id
+    WHERE s.user_id = :user_id AND COALESCE(s.paid_status, false) = false AND s.user_id <> o.paid_by_user_id
+    GROUP BY o.paid_by_user_id
+    UNION ALL
+    SELECT -s.user_id, SUM(s.amount_owed)
+    FROM splits s JOIN orders o ON o.id = s.order_id
+    WHERE o.paid_by_user_id = :user_id AND COALESCE(s.paid_status, false) = false AND s.user_id <> o.paid_by_user_id
+    GROUP BY s.user_id
+""")
+
+
+def time_calls(fn, args_list: list) -> dict:
+    latencies = []
+    started = time.perf_counter()
+    for args in args_list:
+        t0 = time.perf_counter()
+        fn(*args)
+        latencies.append(time.perf_counter() - t0)
+    return summarize(latencies, 0, time.perf_counter() - started)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Balance ledger vs on-the-fly aggregation")
+    parser.add_argument("--samples", type=int, default=200, help="Lookups per scenario")
+    parser.add_argument("--summary-samples", type=int, default=5, help="Full-summary runs per method")
+    parser.add_argument("--seed-orders", type=int, default=0, help="Seed up to this many orders first")
+    parser.add_argument("--seed-users", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/balances-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from database import Base, SessionLocal, engine
+    import models  # noqa: F401  (register tables)
+    from services.balance_service import (
+        compute_balances,
+        get_balance_summary,
+        get_pair_balance,
+        get_user_balances,
+        rebuild_balances,
+    )
+
+    if args.seed_orders:
+        from benchmarks.load_test import ensure_dataset
+        ensure_dataset(engine, args.seed_orders, args.seed_users, items_per_order=10)
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    try:
+        print("🔁 Rebuilding ledger from splits...")
+        t0 = time.perf_counter()
+        report = rebuild_balances(db, apply=True)
+        rebuild_seconds = time.perf_counter() - t0
+        print(f"   {report['pairs_checked']:,} pairs in {rebuild_seconds:.2f}s")
+
+        rng = random.Random(args.seed)
+        pairs = [tuple(r) for r in db.execute(text(
+            "SELECT debtor_id, creditor_id FROM balances ORDER BY random() LIMIT :n"), {"n": args.samples})]
+        if not pairs:
+            raise SystemExit("No balances found - seed the database first (--seed-orders)")
+        users = [rng.choice(pairs)[rng.randint(0, 1)] for _ in range(args.samples)]
+
+        results = [
+            {"scenario": "pair_lookup", "method": "ledger",
+             **time_calls(lambda d, c: get_pair_balance(db, d, c), pairs)},
+            {"scenario": "pair_lookup", "method": "aggregate",
+             **time_calls(lambda d, c: db.execute(PAIR_SQL, {"debtor": d, "creditor": c}).scalar(), pairs)},
+            {"scenario": "user_balances", "method": "ledger",
+             **time_calls(lambda u: get_user_balances(db, u), [(u,) for u in users])},
+            {"scenario": "user_balances", "method": "aggregate",
+             **time_calls(lambda u: db.execute(USER_SQL, {"user_id": u}).all(), [(u,) for u in users])},
+            {"scenario": "all_users_summary", "method": "ledger",
+             **time_calls(lambda: get_balance_summary(db), [()] * args.summary_samples)},
+            {"scenario": "all_users_summary", "method": "aggregate",
+             **time_calls(lambda: compute_balances(db), [()] * args.summary_samples)},
+        ]
+        db.rollback()
+    finally:
+        db.close()
+
+    for r in results:
+        r["scenario"] = f"{r['scenario']}[{r.pop('method')}]"
+    print_table(results)
+    config = {**{k: v for k, v in vars(args).items() if k != "output"},
+              "pairs": report["pairs_checked"], "rebuild_seconds": round(rebuild_seconds, 2)}
+    path = write_results("balances", config, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+"""
+Measure export throughput and memory on a large dataset.
+
+Streams /api/exports/{kind} from a local uvicorn server for each kind and
+format, discarding the body, and reports rows/s, MB/s and how far the
+process's resident memory rose while streaming. With a server-side cursor
+the memory figure should stay flat as the export grows.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_export --seed-orders 1000000 --seed-users 20000
+    uv run python -m benchmarks.bench_export --kinds orders,splits --formats ndjson --days 30
+"""
+import argparse
+import asyncio
+import os
+import resource
+import sys
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.stats import write_results
+
+KINDS = ["orders", "items", "splits"]
+FORMATS = ["csv", "ndjson"]
+
+
+def rss_mb() -> float:
+    """Current resident set size (Linux), falling back to the peak elsewhere"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+async def run_export(client, kind: str, fmt: str, params: dict) -> dict:
+    rows = size = 0
+    start_rss = peak_rss = rss_mb()
+    started = time.perf_counter()
+    first_byte = None
+    async with client.stream("GET", f"/api/exports/{kind}", params={**params, "format": fmt}) as response:
+        response.raise_for_status()
+        async for chunk in response.aiter_bytes():
+            if first_byte is None:
+                first_byte = time.perf_counter() - started
+            rows += chunk.count(b"\n")
+            size += len(chunk)
+            peak_rss = max(peak_rss, rss_mb())
+    elapsed = time.perf_counter() - started
+    if fmt == "csv":
+        rows -= 1  # header
+    return {
+        "scenario": f"{kind}.{fmt}",
+        "rows": rows,
+        "mb": round(size / 2**20, 1),
+        "seconds": round(elapsed, 2),
+        "rows_per_s": round(rows / elapsed) if elapsed else 0,
+        "mb_per_s": round(size / 2**20 / elapsed, 1) if elapsed else 0,
+        "first_byte_ms": round((first_byte or elapsed) * 1000, 1),
+        "rss_growth_mb": round(peak_rss - start_rss, 1),
+    }
+
+
+def start_server():
+    """
+    Serve the app with uvicorn on a free local port in a background thread.
+
+    httpx's ASGITransport buffers the whole response body, which would hide
+    exactly what this benchmark measures, so requests go over a real socket.
+    """
+    import socket
+    import threading
+    import uvicorn
+    from main import app
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread, f"http://127.0.0.1:{port}"
+
+
+async def run(args, base_url: str) -> list[dict]:
+    import httpx
+
+    params = {}
+    if args.days:
+        params["start"] = (datetime.utcnow() - timedelta(days=args.days)).isoformat()
+    if args.paid_by_user_id:
+        params["paid_by_user_id"] = args.paid_by_user_id
+
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        for kind in args.kinds:
+            for fmt in args.formats:
+                print(f"📤 {kind}.{fmt}...")
+                results.append(await run_export(client, kind, fmt, params))
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Export throughput and memory")
+    parser.add_argument("--kinds", type=lambda v: v.split(","), default=KINDS)
+    parser.add_argument("--formats", type=lambda v: v.split(","), default=FORMATS)
+    parser.add_argument("--days", type=int, default=0, help="Only export orders from the last N days")
+    parser.add_argument("--paid-by-user-id", type=int)
+    parser.add_argument("--seed-orders", type=int, default=0, help="Seed up to this many orders first")
+    parser.add_argument("--seed-users", type=int, default=5000)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/export-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    if args.seed_orders:
+        from database import engine
+        from benchmarks.load_test import ensure_dataset
+        ensure_dataset(engine, args.seed_orders, args.seed_users, items_per_order=10)
+
+    server, thread, base_url = start_server()
+    try:
+        results = asyncio.run(run(args, base_url))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"\n{'export':<16} {'rows':>11} {'MB':>8} {'sec':>7} {'rows/s':>9} {'MB/s':>6} {'ttfb ms':>8} {'+RSS MB':>8}")
+    for r in results:
+        print(f"{r['scenario']:<16} {r['rows']:>11,} {r['mb']:>8} {r['seconds']:>7} {r['rows_per_s']:>9,} "
+              f"{r['mb_per_s']:>6} {r['first_byte_ms']:>8} {r['rss_growth_mb']:>8}")
+
+    path = write_results("export", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
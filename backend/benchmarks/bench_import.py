@@ -0,0 +1,165 @@
+"""
+Time the bulk order importer on a generated history file.
+
+Writes N orders (restaurants and items from the fixture corpus, each item
+assigned to 1-3 diners) as NDJSON or CSV, imports it, then imports it again
+to check the second run creates nothing. Reports rows/s for both runs.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_import --orders 100000 --format csv      # ~1M CSV rows
+    uv run python -m benchmarks.bench_import --orders 100000 --format ndjson --bad-rows 0.01
+"""
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from benchmarks.fixtures import load_receipts
+from benchmarks.stats import write_results
+
+CSV_HEADER = ["order_ref", "date", "restaurant", "total", "subtotal", "tax", "delivery_fee", "tip", "discount",
+              "paid_by_user_id", "settled", "item_name", "item_price", "item_quantity", "user_ids"]
+
+
+def generate_orders(count: int, user_ids: list[int], items_per_order: int, bad_rows: float, seed: int):
+    """Yield import records; a fraction get an invalid price to exercise error reporting"""
+    rng = random.Random(seed)
+    receipts = load_receipts()
+    start = datetime(2025, 1, 1)
+    run = rng.randrange(1 << 30)
+    for n in range(count):
+        receipt = rng.choice(receipts)["parsed"]
+        diners = rng.sample(user_ids, min(len(user_ids), rng.randint(2, 5)))
+        items = []
+        for _ in range(max(1, int(rng.gauss(items_per_order, items_per_order / 3)))):
+            entry = rng.choice(receipt["items"])
+            items.append({
+                "name": entry["name"],
+                "price": -1 if rng.random() < bad_rows else round(entry["price"], 2),
+                "quantity": rng.randint(1, 3),
+                "user_ids": rng.sample(diners, rng.randint(1, min(3, len(diners)))),
+            })
+        subtotal = round(sum(i["price"] * i["quantity"] for i in items), 2)
+        tax = round(subtotal * 0.08, 2)
+        yield {
+            "order_ref": f"bench-{run}-{n}",
+            "date": (start + timedelta(minutes=n)).isoformat(),
+            "restaurant": receipt["restaurant"],
+            "total": round(subtotal + tax, 2),
+            "subtotal": subtotal,
+            "tax": tax,
+            "paid_by_user_id": diners[0],
+            "settled": rng.random() < 0.5,
+            "items": items,
+        }
+
+
+def write_file(path: str, fmt: str, orders) -> int:
+    """Write orders to path and return the number of data rows"""
+    rows = 0
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        if fmt == "ndjson":
+            for order in orders:
+                f.write(json.dumps(order) + "\n")
+                rows += 1
+            return rows
+
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        for order in orders:
+            head = [order["order_ref"], order["date"], order["restaurant"], order["total"], order["subtotal"],
+                    order["tax"], "", "", "", order["paid_by_user_id"], order["settled"]]
+            for item in order["items"]:
+                writer.writerow(head + [item["name"], item["price"], item["quantity"],
+                                        ";".join(str(u) for u in item["user_ids"])])
+                rows += 1
+    return rows
+
+
+def timed_import(path: str, fmt: str) -> dict:
+    from database import SessionLocal
+    from services.import_service import import_orders
+
+    db = SessionLocal()
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            return import_orders(db, f, fmt)
+    finally:
+        db.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Bulk import throughput")
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--items-per-order", type=int, default=10)
+    parser.add_argument("--format", choices=["csv", "ndjson"], default="csv")
+    parser.add_argument("--users", type=int, default=5000, help="Users to draw diners from (seeded if missing)")
+    parser.add_argument("--bad-rows", type=float, default=0.0, help="Fraction of items given an invalid price")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/import-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from database import Base, engine
+    from migrate import run_migrations
+    import models  # noqa: F401  (register tables)
+    from benchmarks.seed import seed
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    with engine.connect() as conn:
+        user_ids = [r[0] for r in conn.execute(text("SELECT id FROM users ORDER BY id LIMIT :n"), {"n": args.users})]
+    if len(user_ids) < args.users:
+        seed(users=args.users - len(user_ids), orders=0)
+        with engine.connect() as conn:
+            user_ids = [r[0] for r in conn.execute(text("SELECT id FROM users ORDER BY id LIMIT :n"),
+                                                   {"n": args.users})]
+
+    fd, path = tempfile.mkstemp(suffix=f".{args.format}")
+    os.close(fd)
+    try:
+        print(f"📝 Generating {args.orders:,} orders...")
+        rows = write_file(path, args.format, generate_orders(
+            args.orders, user_ids, args.items_per_order, args.bad_rows, args.seed))
+        size_mb = os.path.getsize(path) / 2**20
+        print(f"   {rows:,} rows, {size_mb:.1f} MB")
+
+        results = []
+        for run in ("first", "repeat"):
+            print(f"📥 Import ({run})...")
+            t0 = time.perf_counter()
+            report = timed_import(path, args.format)
+            elapsed = time.perf_counter() - t0
+            results.append({
+                "scenario": f"{args.format}[{run}]",
+                "rows": rows,
+                "seconds": round(elapsed, 2),
+                "rows_per_s": round(rows / elapsed),
+                **{k: v for k, v in report.items() if k not in ("errors", "seconds")},
+            })
+    finally:
+        os.remove(path)
+
+    print(f"\n{'run':<16} {'rows':>10} {'sec':>8} {'rows/s':>9} {'orders':>8} {'items':>10} {'splits':>9} "
+          f"{'existing':>9} {'errors':>7}")
+    for r in results:
+        print(f"{r['scenario']:<16} {r['rows']:>10,} {r['seconds']:>8} {r['rows_per_s']:>9,} "
+              f"{r['orders_created']:>8,} {r['items_created']:>10,} {r['splits_created']:>9,} "
+              f"{r['orders_existing']:>9,} {r['error_count']:>7,}")
+
+    path = write_results("import", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    for r in results:
+        print(f"{r['scenario']:<16} {r['timings']}")
+
+    print(f"\n💾 Results written to {path}")
+    return 0 if results[-1]["orders_created"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+"""
+Compare the list endpoints' fast path with building Pydantic models from ORM rows.
+
+For pages of --sizes rows (100, 1k and 10k by default), times:
+- orders: GET /api/orders?limit=N (each order with its items)
+- users: GET /api/users?limit=N
+- splits: GET /api/splits/order/{id} for an order with N splits (cache cleared each time)
+
+and the same lists through the previous implementation, mounted under
+/legacy: the ORM query returned with response_model, so FastAPI validates
+every row from attributes and encodes it with the JSON encoder. Both go over
+a real socket to a local uvicorn server. Each pair of responses is checked
+to decode to the same JSON before timing.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_lists --seed-orders 20000 --seed-users 20000
+    uv run python -m benchmarks.bench_lists --sizes 100,1000 --repeats 50
+"""
+import argparse
+import sys
+import time
+from typing import List
+
+from sqlalchemy import func, insert, select
+
+from benchmarks.bench_export import start_server
+from benchmarks.stats import summarize, write_results
+
+SPLIT_ORDER_PREFIX = "Benchmark splits x"
+
+
+def legacy_router():
+    """The list endpoints as they were before the fast path (ordered by id so pages match)"""
+    from fastapi import APIRouter, Depends
+    from sqlalchemy.orm import Session
+
+    import models
+    import schemas
+    from database import get_db
+
+    router = APIRouter()
+
+    @router.get("/orders", response_model=List[schemas.Order])
+    def list_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return db.query(models.Order).order_by(models.Order.id).offset(skip).limit(limit).all()
+
+    @router.get("/users", response_model=List[schemas.User])
+    def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
+        return db.query(models.User).order_by(models.User.id).offset(skip).limit(limit).all()
+
+    @router.get("/splits/order/{order_id}", response_model=List[schemas.Split])
+    def get_order_splits(order_id: int, db: Session = Depends(get_db)):
+        return db.query(models.Split).filter(models.Split.order_id == order_id).order_by(models.Split.id).all()
+
+    return router
+
+
+def normalized(rows: list) -> list:
+    """Orders' items sorted by id; the ORM relationship returns them in no particular order"""
+    return [{**row, "items": sorted(row["items"], key=lambda i: i["id"])} if "items" in row else row for row in rows]
+
+
+def ensure_split_orders(sizes: list[int]) -> dict:
+    """An order with exactly N splits for each size, created on first use"""
+    import models
+    from database import SessionLocal
+
+    orders = {}
+    with SessionLocal() as db:
+        user_ids = db.execute(select(models.User.id).order_by(models.User.id).limit(max(sizes))).scalars().all()
+        for size in sizes:
+            name = f"{SPLIT_ORDER_PREFIX}{size}"
+            order_id = db.execute(select(models.Order.id).where(models.Order.restaurant == name)).scalar()
+            if order_id is None:
+                order_id = db.execute(insert(models.Order).returning(models.Order.id), {
+                    "restaurant": name, "total": float(size), "paid_by_user_id": user_ids[0],
+                }).scalar()
+                db.execute(insert(models.Split), [
+                    {"order_id": order_id, "user_id": user_ids[i % len(user_ids)], "item_ids": [],
+                     "amount_owed": 1.0, "paid_status": i % 3 == 0, "reminder_sent": False}
+                    for i in range(size)
+                ])
+                db.commit()
+            orders[size] = order_id
+    return orders
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Fast list serialization vs ORM + Pydantic")
+    parser.add_argument("--sizes", type=lambda v: [int(x) for x in v.split(",")], default=[100, 1000, 10000])
+    parser.add_argument("--repeats", type=int, default=20, help="Requests per list, size and path")
+    parser.add_argument("--seed-orders", type=int, default=0, help="Seed up to this many orders first")
+    parser.add_argument("--seed-users", type=int, default=20000)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/lists-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    import httpx
+
+    import models
+    from database import SessionLocal, engine
+    from main import app
+    from services.cache_service import response_cache
+    from services.listing_service import ORJSON_AVAILABLE
+
+    if args.seed_orders:
+        from benchmarks.load_test import ensure_dataset
+        ensure_dataset(engine, args.seed_orders, args.seed_users, items_per_order=10)
+    with SessionLocal() as db:
+        orders, users = (db.execute(select(func.count()).select_from(t)).scalar() for t in (models.Order, models.User))
+    if min(orders, users) < max(args.sizes):
+        print(f"❌ Need at least {max(args.sizes):,} orders and users (have {orders:,} and {users:,}); use --seed-orders")
+        return 1
+
+    app.include_router(legacy_router(), prefix="/legacy")
+    split_orders = ensure_split_orders(args.sizes)
+    print(f"⚙️  Encoder: {'orjson' if ORJSON_AVAILABLE else 'json'}")
+
+    server, thread, base_url = start_server()
+    results = []
+    try:
+        with httpx.Client(base_url=base_url, timeout=None) as client:
+            for size in args.sizes:
+                paths = {
+                    "orders": (f"/api/orders/?limit={size}", f"/legacy/orders?limit={size}"),
+                    "users": (f"/api/users/?limit={size}", f"/legacy/users?limit={size}"),
+                    "splits": (f"/api/splits/order/{split_orders[size]}", f"/legacy/splits/order/{split_orders[size]}"),
+                }
+                for name, (fast_path, legacy_path) in paths.items():
+                    fast = client.get(fast_path)
+                    legacy = client.get(legacy_path)
+                    if normalized(fast.json()) != normalized(legacy.json()):
+                        print(f"❌ {name} x{size}: fast path and legacy responses differ")
+                        return 1
+
+                    for mode, path in (("legacy", legacy_path), ("fast", fast_path)):
+                        print(f"📋 {name} x{size} {mode}...")
+                        latencies = []
+                        started = time.perf_counter()
+                        for _ in range(args.repeats):
+                            response_cache.clear()
+                            t0 = time.perf_counter()
+                            body = client.get(path).content
+                            latencies.append(time.perf_counter() - t0)
+                        results.append({
+                            "scenario": f"{name}.{size}.{mode}",
+                            **summarize(latencies, 0, time.perf_counter() - started),
+                            "rows": size,
+                            "kb": round(len(body) / 1024, 1),
+                        })
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"\n{'list':<22} {'KB':>9} {'p50 ms':>9} {'p95 ms':>9} {'rows/s':>10} {'speedup':>8}")
+    by_name = {r["scenario"]: r for r in results}
+    for r in results:
+        legacy = by_name[r["scenario"].rsplit(".", 1)[0] + ".legacy"]
+        r["speedup_p50"] = round(legacy["p50_ms"] / r["p50_ms"], 2) if r["p50_ms"] else 0.0
+        print(f"{r['scenario']:<22} {r['kb']:>9} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} "
+              f"{r['rows'] / (r['p50_ms'] / 1000):>10,.0f} {r['speedup_p50']:>7.2f}x")
+
+    path = write_results("lists", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
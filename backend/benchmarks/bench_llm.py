@@ -0,0 +1,111 @@
+"""
+Benchmark the LLM dispatcher against a single-model server.
+
+The fake LLM server serves --server-slots requests at a time (1 for LM
+Studio / Ollama with one model loaded) and queues the rest internally. A
+burst of batch-priority receipts (background jobs) arrives first, then
+interactive uploads trickle in. Each configuration reports latency per
+priority, failures (timeouts) and the dispatcher's queue-wait and
+tokens/sec metrics.
+
+"unbounded" sends everything straight to the server, which is what
+parse_receipt_text did before the dispatcher.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_llm
+    uv run python -m benchmarks.bench_llm --batch 60 --interactive 20 --llm-latency-ms 500 --batch-sizes 1,4
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.fakes import FakeLLMServer, Latency
+from benchmarks.fixtures import load_receipts
+from benchmarks.stats import summarize, write_results
+
+
+async def run_config(llm_service, name: str, concurrency: int, batch_size: int, args) -> list[dict]:
+    dispatcher = llm_service.LLMDispatcher(concurrency=concurrency, batch_size=batch_size)
+    llm_service._dispatchers[asyncio.get_running_loop()] = dispatcher
+    texts = [r["ocr_text"] for r in load_receipts()]
+    latencies = {"interactive": [], "batch": []}
+    errors = {"interactive": 0, "batch": 0}
+
+    async def one(kind: str, i: int):
+        priority = llm_service.PRIORITY_INTERACTIVE if kind == "interactive" else llm_service.PRIORITY_BATCH
+        started = time.perf_counter()
+        try:
+            await llm_service.parse_receipt_text(texts[i % len(texts)], priority=priority)
+            latencies[kind].append(time.perf_counter() - started)
+        except Exception:
+            errors[kind] += 1
+
+    async def interactive_arrivals():
+        tasks = []
+        for i in range(args.interactive):
+            tasks.append(asyncio.create_task(one("interactive", i)))
+            await asyncio.sleep(args.interactive_gap_ms / 1000)
+        await asyncio.gather(*tasks)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one("batch", i) for i in range(args.batch)), interactive_arrivals())
+    elapsed = time.perf_counter() - started
+
+    metrics = dispatcher.metrics()
+    if dispatcher._client is not None:
+        await dispatcher._client.aclose()
+    return [
+        {
+            "scenario": f"{name}.{kind}",
+            **summarize(latencies[kind], errors[kind], elapsed),
+            "queue_wait_p95_ms": metrics["queue_wait"][kind]["p95_ms"],
+            "tokens_per_second": metrics["tokens_per_second"],
+            "rejected_or_timed_out": metrics["rejected"] + metrics["queue_timeouts"],
+        }
+        for kind in ("interactive", "batch")
+    ]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="LLM dispatcher vs direct calls on a one-model server")
+    parser.add_argument("--batch", type=int, default=40, help="Batch-priority requests sent at once")
+    parser.add_argument("--interactive", type=int, default=10, help="Interactive requests, sent one per gap")
+    parser.add_argument("--interactive-gap-ms", type=float, default=200)
+    parser.add_argument("--llm-latency-ms", type=float, default=300)
+    parser.add_argument("--server-slots", type=int, default=1)
+    parser.add_argument("--concurrency", type=int, default=1, help="Dispatcher concurrency")
+    parser.add_argument("--batch-sizes", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4])
+    parser.add_argument("--request-timeout", type=float, default=5.0,
+                        help="HTTP timeout per completion (stands in for the 30s default)")
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/llm-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from services import llm_service
+    llm_service.LLM_REQUEST_TIMEOUT_SECONDS = args.request_timeout
+    configs = [("unbounded", args.batch + args.interactive, 1)]
+    configs += [(f"c{args.concurrency}.b{b}", args.concurrency, b) for b in args.batch_sizes]
+
+    results = []
+    for name, concurrency, batch_size in configs:
+        # A fresh server each time: requests abandoned by a timed-out client keep it busy
+        server = FakeLLMServer(Latency(args.llm_latency_ms), slots=args.server_slots).start()
+        llm_service.LLM_API_URL = server.chat_url
+        print(f"🤖 {name}...")
+        try:
+            results += asyncio.run(run_config(llm_service, name, concurrency, batch_size, args))
+        finally:
+            server.stop()
+
+    print(f"\n{'scenario':<26} {'ok':>4} {'fail':>5} {'p50 ms':>9} {'p95 ms':>9} {'wait p95':>9} {'tok/s':>8}")
+    for r in results:
+        print(f"{r['scenario']:<26} {r['requests'] - r['errors']:>4} {r['errors']:>5} {r['p50_ms']:>9.0f} "
+              f"{r['p95_ms']:>9.0f} {r['queue_wait_p95_ms']:>9.0f} {r['tokens_per_second']:>8}")
+
+    path = write_results("llm", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
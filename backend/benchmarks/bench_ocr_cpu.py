@@ -0,0 +1,154 @@
+"""
+Compare OCR throughput and accuracy with and without the CPU inference profile.
+
+Runs the real OCR engine (Surya or Docling/RapidOCR, whichever --engine
+names, it must be installed) on the fixture receipt images:
+
+- fp32.default: one process, library default threading, no pinning (baseline)
+- fp32.t<N>: --cores / N processes, each pinned to its own N cores with
+  OCR_THREADS=N and OCR_INTEROP_THREADS=1
+- int8.t<N>: the same with OCR_QUANTIZE (Surya only)
+
+Each process loads its own models (like one OCR service per core group),
+then they all start together on a shared list of images. The table
+reports receipts/sec, receipts/sec per core, p50 latency per receipt, and
+how close the text is to the fp32 baseline and to the fixture text
+(difflib similarity, 100% = identical).
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_ocr_cpu --engine surya --cores 8 --threads 1,2,4
+    uv run python -m benchmarks.bench_ocr_cpu --engine docling --repeats 3
+"""
+import argparse
+import asyncio
+import difflib
+import multiprocessing as mp
+import os
+import sys
+import time
+
+from benchmarks.fixtures import receipt_images
+from benchmarks.stats import summarize, write_results
+
+
+def _worker(engine: str, threads: int, cores: str, quantize: bool, jobs: list, ready, start, results):
+    # Set before ocr_service (and torch) are imported in this process
+    os.environ["OCR_ENGINE"] = engine
+    os.environ["OCR_THREADS"] = str(threads)
+    os.environ["OCR_INTEROP_THREADS"] = "1" if threads else "0"
+    os.environ["OCR_CPU_CORES"] = cores
+    os.environ["OCR_QUANTIZE"] = "true" if quantize else "false"
+    os.environ["OCR_SERVICE_URL"] = ""
+    from services import ocr_service
+
+    with ocr_service._model_lock:
+        if engine == "surya":
+            ocr_service.initialize_surya_models()
+        else:
+            ocr_service.initialize_docling_converter()
+    ready.put(os.getpid())
+    start.wait()
+
+    async def run():
+        out = []
+        for index, image in jobs:
+            t0 = time.perf_counter()
+            result = await ocr_service.process_receipt_bytes(image)
+            out.append((index, result.get("raw_text", ""), time.perf_counter() - t0, bool(result.get("error"))))
+        return out
+
+    results.put(asyncio.run(run()))
+
+
+def run_config(name: str, engine: str, processes: int, threads: int, quantize: bool, images: list,
+               repeats: int) -> tuple[dict, dict]:
+    ctx = mp.get_context("spawn")
+    ready, results, start = ctx.Queue(), ctx.Queue(), ctx.Event()
+    jobs = [(i, img) for _ in range(repeats) for i, img in enumerate(images)]
+    workers = []
+    for p in range(processes):
+        cores = f"{p * threads}-{(p + 1) * threads - 1}" if threads else ""
+        worker = ctx.Process(target=_worker, args=(engine, threads, cores, quantize, jobs[p::processes],
+                                                   ready, start, results))
+        worker.start()
+        workers.append(worker)
+
+    for _ in workers:
+        ready.get()
+    started = time.perf_counter()
+    start.set()
+    done = [item for _ in workers for item in results.get()]
+    elapsed = time.perf_counter() - started
+    for worker in workers:
+        worker.join()
+
+    texts = {index: text for index, text, _, _ in done}
+    latencies = [lat for _, _, lat, failed in done if not failed]
+    errors = sum(failed for *_, failed in done)
+    cores_used = processes * threads if threads else os.cpu_count()
+    return {
+        "scenario": name,
+        "processes": processes,
+        "threads": threads or "default",
+        "quantized": quantize,
+        **summarize(latencies, errors, elapsed),
+        "receipts_per_second": round(len(done) / elapsed, 3),
+        "receipts_per_second_per_core": round(len(done) / elapsed / cores_used, 3),
+    }, texts
+
+
+def similarity(a: str, b: str) -> float:
+    return difflib.SequenceMatcher(None, a, b, autojunk=False).ratio()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="OCR receipts/sec per core and accuracy of the CPU profile")
+    parser.add_argument("--engine", choices=["surya", "docling"], default="surya")
+    parser.add_argument("--cores", type=int, default=os.cpu_count(), help="Cores to spread processes over")
+    parser.add_argument("--threads", type=lambda v: [int(x) for x in v.split(",")], default=[1, 2, 4],
+                        help="Threads per process to try")
+    parser.add_argument("--repeats", type=int, default=2, help="Passes over the fixture images")
+    parser.add_argument("--no-quantize", action="store_true", help="Skip the int8 configurations")
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/ocr-cpu-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from services import ocr_service
+    available = ocr_service.SURYA_AVAILABLE if args.engine == "surya" else ocr_service.DOCLING_AVAILABLE
+    if not available:
+        print(f"❌ {args.engine} is not installed; this benchmark needs the real OCR engine")
+        return 1
+
+    corpus = receipt_images()
+    images = [img for _, img in corpus]
+    configs = [("fp32.default", 1, 0, False)]
+    for threads in args.threads:
+        if threads > args.cores:
+            continue
+        configs.append((f"fp32.t{threads}", args.cores // threads, threads, False))
+        if args.engine == "surya" and not args.no_quantize:
+            configs.append((f"int8.t{threads}", args.cores // threads, threads, True))
+
+    results, baseline = [], None
+    for name, processes, threads, quantize in configs:
+        print(f"🔍 {name} ({processes} x {threads or 'default'} threads)...")
+        result, texts = run_config(name, args.engine, processes, threads, quantize, images, args.repeats)
+        baseline = baseline or texts
+        result["similarity_to_fp32_pct"] = round(
+            100 * sum(similarity(baseline[i], texts.get(i, "")) for i in baseline) / len(baseline), 2)
+        result["similarity_to_fixture_pct"] = round(
+            100 * sum(similarity(r["ocr_text"], texts.get(i, "")) for i, (r, _) in enumerate(corpus)) / len(corpus), 2)
+        results.append(result)
+
+    print(f"\n{'config':<14} {'procs':>5} {'thr':>7} {'rcpt/s':>8} {'/core':>7} {'p50 ms':>9} {'vs fp32':>8} {'vs fixture':>10}")
+    for r in results:
+        print(f"{r['scenario']:<14} {r['processes']:>5} {r['threads']:>7} {r['receipts_per_second']:>8.2f} "
+              f"{r['receipts_per_second_per_core']:>7.3f} {r['p50_ms']:>9.0f} {r['similarity_to_fp32_pct']:>7.1f}% "
+              f"{r['similarity_to_fixture_pct']:>9.1f}%")
+
+    path = write_results("ocr-cpu", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
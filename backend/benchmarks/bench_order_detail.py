@@ -0,0 +1,153 @@
+"""
+Compare loading the split review through GET /api/orders/{id}/detail with
+the calls the frontend made before it.
+
+For orders with --splits users each, times:
+- sequential: GET order, GET its splits, then GET /api/users/{id} for the
+  payer and each split user, one after another
+- parallel: GET order and splits together, then all users together
+  (the best the separate endpoints allow)
+- detail: one GET /api/orders/{id}/detail
+
+Requests go over a real socket to a local uvicorn server. The response
+cache is cleared before every load, so each one hits the database.
+--rtt-ms adds a delay to each request, so the count of round trips shows
+up the way it would over a real network. The table reports HTTP round trips
+and SQL statements per load, and latency percentiles.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_order_detail --orders 50 --splits 8
+    uv run python -m benchmarks.bench_order_detail --splits 20 --rtt-ms 40
+"""
+import argparse
+import asyncio
+import random
+import sys
+import time
+
+from sqlalchemy import event
+
+from benchmarks.bench_export import start_server
+from benchmarks.stats import summarize, write_results
+
+
+def create_orders(client, count: int, splits: int, items: int, rng: random.Random) -> list[int]:
+    """Orders with `splits` users each, created through the API"""
+    users = [client.post("/api/users/", json={"name": f"Bench User {i}", "phone": f"+1555{i:07d}"}).json()["id"]
+             for i in range(splits + 1)]
+    order_ids = []
+    for n in range(count):
+        payer, *members = rng.sample(users, splits + 1)
+        order = client.post("/api/orders/", json={
+            "restaurant": f"Bench Restaurant {n}",
+            "total": 0,
+            "paid_by_user_id": payer,
+            "items": [{"name": f"Item {i}", "price": round(rng.uniform(2, 30), 2), "quantity": 1}
+                      for i in range(items)],
+        }).json()
+        assignments = [{"item_id": item["id"], "user_ids": rng.sample(members, rng.randint(1, min(3, len(members))))}
+                       for item in order["items"]]
+        client.post("/api/splits/bulk", json={"order_id": order["id"], "assignments": assignments}).raise_for_status()
+        order_ids.append(order["id"])
+    return order_ids
+
+
+async def load_sequential(get, order_id: int):
+    order = await get(f"/api/orders/{order_id}")
+    splits = await get(f"/api/splits/order/{order_id}")
+    for user_id in dict.fromkeys([order["paid_by_user_id"], *(s["user_id"] for s in splits)]):
+        await get(f"/api/users/{user_id}")
+
+
+async def load_parallel(get, order_id: int):
+    order, splits = await asyncio.gather(get(f"/api/orders/{order_id}"), get(f"/api/splits/order/{order_id}"))
+    user_ids = dict.fromkeys([order["paid_by_user_id"], *(s["user_id"] for s in splits)])
+    await asyncio.gather(*(get(f"/api/users/{user_id}") for user_id in user_ids))
+
+
+async def load_detail(get, order_id: int):
+    await get(f"/api/orders/{order_id}/detail")
+
+
+SCENARIOS = {"sequential": load_sequential, "parallel": load_parallel, "detail": load_detail}
+
+
+async def run(base_url: str, order_ids: list[int], rtt_ms: float, queries: list) -> list[dict]:
+    import httpx
+    from services.cache_service import response_cache
+
+    results = []
+    async with httpx.AsyncClient(base_url=base_url, timeout=None) as client:
+        for name, load in SCENARIOS.items():
+            round_trips = 0
+
+            async def get(path: str):
+                nonlocal round_trips
+                round_trips += 1
+                if rtt_ms:
+                    await asyncio.sleep(rtt_ms / 1000)
+                response = await client.get(path)
+                response.raise_for_status()
+                return response.json()
+
+            print(f"📦 {name}...")
+            latencies = []
+            queries[0] = 0
+            started = time.perf_counter()
+            for order_id in order_ids:
+                response_cache.clear()
+                t0 = time.perf_counter()
+                await load(get, order_id)
+                latencies.append(time.perf_counter() - t0)
+            elapsed = time.perf_counter() - started
+            results.append({
+                "scenario": name,
+                **summarize(latencies, 0, elapsed),
+                "round_trips_per_load": round(round_trips / len(order_ids), 1),
+                "queries_per_load": round(queries[0] / len(order_ids), 1),
+            })
+    return results
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Composite order detail vs separate order/splits/user calls")
+    parser.add_argument("--orders", type=int, default=50, help="Orders to create and load")
+    parser.add_argument("--splits", type=int, default=8, help="Users splitting each order")
+    parser.add_argument("--items", type=int, default=12, help="Items per order")
+    parser.add_argument("--rtt-ms", type=float, default=0, help="Simulated network delay per request")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/order-detail-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    import httpx
+    from database import engine
+
+    # Counts statements the server runs; it shares this process
+    queries = [0]
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def count_query(*_):
+        queries[0] += 1
+
+    server, thread, base_url = start_server()
+    try:
+        with httpx.Client(base_url=base_url, timeout=None) as client:
+            print(f"🌱 Creating {args.orders} orders with {args.splits} splits each...")
+            order_ids = create_orders(client, args.orders, args.splits, args.items, random.Random(args.seed))
+        results = asyncio.run(run(base_url, order_ids, args.rtt_ms, queries))
+    finally:
+        server.should_exit = True
+        thread.join()
+
+    print(f"\n{'load':<12} {'trips':>6} {'queries':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for r in results:
+        print(f"{r['scenario']:<12} {r['round_trips_per_load']:>6} {r['queries_per_load']:>8} "
+              f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f}")
+
+    path = write_results("order-detail", {k: v for k, v in vars(args).items() if k != "output"}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+"""
+Benchmark the receipt pipeline, split routes and reminder routes.
+
+The API runs in-process behind httpx's ASGI transport. The LLM endpoint,
+Ollama (GLM-OCR), S3 and Twilio are replaced by the local fakes in
+benchmarks/fakes.py so only our own code and Postgres are measured.
+
+Usage (from backend/, with DATABASE_URL pointing at a scratch database):
+    uv run python -m benchmarks.bench_pipeline
+    uv run python -m benchmarks.bench_pipeline --concurrency 1,8,32 --requests 400 --llm-latency-ms 300
+    uv run python -m benchmarks.bench_pipeline --baseline benchmarks/results/pipeline-<stamp>.json
+"""
+import argparse
+import asyncio
+import sys
+
+from benchmarks.fakes import FakeBackends
+from benchmarks.fixtures import receipt_images
+from benchmarks.stats import compare_results, print_table, run_closed_loop, write_results
+
+SCENARIOS = [
+    "upload_receipt",
+    "create_bulk_splits",
+    "get_order_splits",
+    "mark_split_paid",
+    "send_reminder_for_split",
+    "send_all_reminders_for_order",
+]
+
+
+async def seed(client, order_count: int, user_count: int) -> dict:
+    """Create users and fixture orders through the API, returning their ids"""
+    user_ids = []
+    for i in range(user_count):
+        res = await client.post("/api/users/", json={
+            "name": f"Bench User {i}",
+            "phone": f"+1555000{i:04d}",
+            "payment_handle": f"cliq @bench{i}",
+        })
+        res.raise_for_status()
+        user_ids.append(res.json()["id"])
+
+    orders = []
+    corpus = receipt_images()
+    for i in range(order_count):
+        parsed = corpus[i % len(corpus)][0]["parsed"]
+        res = await client.post("/api/orders/", json={
+            **parsed,
+            "paid_by_user_id": user_ids[i % user_count],
+            "items": parsed["items"],
+        })
+        res.raise_for_status()
+        orders.append(res.json())
+    return {"user_ids": user_ids, "orders": orders}
+
+
+def assignments_for(order: dict, user_ids: list[int], offset: int) -> list[dict]:
+    """Spread an order's items over three users, rotating with offset"""
+    n = len(user_ids)
+    return [
+        {"item_id": item["id"], "user_ids": [user_ids[(offset + j + k) % n] for k in range(1 + j % 2)]}
+        for j, item in enumerate(order["items"])
+    ]
+
+
+async def prepare_splits(client, data: dict) -> dict[int, list[int]]:
+    """Create splits for every seeded order, returning split ids per order"""
+    split_ids = {}
+    for i, order in enumerate(data["orders"]):
+        res = await client.post("/api/splits/bulk", json={
+            "order_id": order["id"],
+            "assignments": assignments_for(order, data["user_ids"], i),
+        })
+        res.raise_for_status()
+        split_ids[order["id"]] = [s["id"] for s in res.json()]
+    return split_ids
+
+
+def build_request_fn(scenario: str, client, data: dict, split_ids: dict[int, list[int]]):
+    corpus = receipt_images()
+    orders = data["orders"]
+    all_splits = [sid for ids in split_ids.values() for sid in ids]
+
+    async def upload_receipt(i):
+        receipt, image = corpus[i % len(corpus)]
+        res = await client.post(
+            "/api/orders/upload-receipt",
+            files={"file": (f"{receipt['id']}.png", image, "image/png")},
+        )
+        return res.status_code == 200
+
+    async def create_bulk_splits(i):
+        order = orders[i % len(orders)]
+        res = await client.post("/api/splits/bulk", json={
+            "order_id": order["id"],
+            "assignments": assignments_for(order, data["user_ids"], i),
+        })
+        return res.status_code == 200
+
+    async def get_order_splits(i):
+        res = await client.get(f"/api/splits/order/{orders[i % len(orders)]['id']}")
+        return res.status_code == 200
+
+    async def mark_split_paid(i):
+        split_id = all_splits[i % len(all_splits)]
+        res = await client.put(f"/api/splits/{split_id}/paid", params={"paid": str(i % 2 == 0).lower()})
+        return res.status_code == 200
+
+    async def send_reminder_for_split(i):
+        res = await client.post(f"/api/splits/{all_splits[i % len(all_splits)]}/send-reminder")
+        return res.status_code == 200
+
+    async def send_all_reminders_for_order(i):
+        res = await client.post(f"/api/splits/order/{orders[i % len(orders)]['id']}/send-all-reminders")
+        return res.status_code == 200
+
+    return {
+        "upload_receipt": upload_receipt,
+        "create_bulk_splits": create_bulk_splits,
+        "get_order_splits": get_order_splits,
+        "mark_split_paid": mark_split_paid,
+        "send_reminder_for_split": send_reminder_for_split,
+        "send_all_reminders_for_order": send_all_reminders_for_order,
+    }[scenario]
+
+
+async def run(args) -> list[dict]:
+    import httpx
+    from main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        print(f"🌱 Seeding {args.orders} orders and {args.users} users...")
+        data = await seed(client, args.orders, args.users)
+        split_ids = await prepare_splits(client, data)
+
+        results = []
+        for scenario in args.scenarios:
+            for concurrency in args.concurrency:
+                # create_bulk_splits replaces splits, so refresh the ids every run
+                split_ids.update(await prepare_splits(client, data))
+                request_fn = build_request_fn(scenario, client, data, split_ids)
+
+                print(f"⏱️  {scenario} @ concurrency {concurrency}...")
+                summary = await run_closed_loop(request_fn, args.requests, concurrency)
+                results.append({"scenario": scenario, "concurrency": concurrency, **summary})
+        return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Receipt pipeline / split / reminder benchmark")
+    parser.add_argument("--concurrency", default="1,4,16",
+                        help="Comma separated concurrency levels (default: 1,4,16)")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per scenario and level")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS),
+                        help=f"Comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument("--orders", type=int, default=32, help="Orders to seed")
+    parser.add_argument("--users", type=int, default=8, help="Users to seed")
+    parser.add_argument("--llm-latency-ms", type=float, default=50.0)
+    parser.add_argument("--ocr-latency-ms", type=float, default=100.0)
+    parser.add_argument("--s3-latency-ms", type=float, default=5.0)
+    parser.add_argument("--sms-latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0, help="RNG seed for latency jitter")
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/pipeline-<stamp>.json)")
+    parser.add_argument("--baseline", help="Previous result file to compare against")
+    parser.add_argument("--threshold", type=float, default=20.0,
+                        help="p95 slowdown (%%) that counts as a regression")
+    args = parser.parse_args(argv)
+    args.concurrency = [int(c) for c in args.concurrency.split(",") if c]
+    args.scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    fakes = FakeBackends(
+        llm_latency_ms=args.llm_latency_ms,
+        ocr_latency_ms=args.ocr_latency_ms,
+        s3_latency_ms=args.s3_latency_ms,
+        sms_latency_ms=args.sms_latency_ms,
+        jitter_ms=args.jitter_ms,
+        seed=args.seed,
+    ).start()
+    try:
+        fakes.patch_services()
+        results = asyncio.run(run(args))
+    finally:
+        fakes.stop()
+
+    print_table(results)
+    config = {k: v for k, v in vars(args).items() if k not in ("output", "baseline")}
+    path = write_results("pipeline", config, results, args.output)
+    print(f"\n💾 Results written to {path}")
+
+    if args.baseline:
+        regressions = compare_results(args.baseline, results, args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) above {args.threshold}% p95")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
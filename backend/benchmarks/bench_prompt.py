@@ -0,0 +1,141 @@
+"""
+Measure what OCR preprocessing, sized max_tokens and prompt caching save
+per parse_receipt_text call over the fixture corpus.
+
+Three modes run the corpus --repeats times, one request at a time:
+
+- baseline: raw OCR text, max_tokens=LLM_MAX_TOKENS, no cache_prompt
+- preprocess: cleaned OCR text and a max_tokens sized from its lines
+- preprocess+cache: the same, sent with cache_prompt
+
+Prompt tokens, cached prompt tokens and the completion budget come from the
+server's usage figures. Latency is measured against --llm-url when given
+(a real LM Studio / llama.cpp server). Otherwise it runs against the fake
+server, where only prompt prefill costs time (--prefill-ms-per-token), so
+the fake's latency numbers are modelled, not measured. The fidelity column
+checks that every item name and amount survives preprocessing.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_prompt
+    uv run python -m benchmarks.bench_prompt --llm-url http://localhost:1234/v1/chat/completions --repeats 3
+"""
+import argparse
+import asyncio
+import sys
+import time
+
+from benchmarks.fakes import FakeLLMServer, Latency
+from benchmarks.fixtures import load_receipts
+from benchmarks.stats import summarize, write_results
+
+MODES = {
+    "baseline": {"preprocess": False, "cache": False, "sized_max_tokens": False},
+    "preprocess": {"preprocess": True, "cache": False, "sized_max_tokens": True},
+    "preprocess+cache": {"preprocess": True, "cache": True, "sized_max_tokens": True},
+}
+
+
+def fidelity(llm_service, receipt: dict) -> bool:
+    """Every item name, line total and fee of the expected result is still in the preprocessed text"""
+    text = llm_service.preprocess_ocr_text(receipt["ocr_text"]).lower()
+    parsed = receipt["parsed"]
+    amounts = [item["price"] * item["quantity"] for item in parsed["items"]]
+    amounts += [parsed[k] for k in ("subtotal", "tax", "delivery_fee", "tip", "discount", "total") if parsed.get(k)]
+    # Receipts print amounts as 12.50 or 12.5 / 4
+    return all(item["name"].lower() in text for item in parsed["items"]) and all(
+        f"{amount:.2f}" in text or f"{amount:g}" in text for amount in amounts
+    )
+
+
+async def run_mode(llm_service, name: str, options: dict, repeats: int) -> dict:
+    llm_service.LLM_PREPROCESS = options["preprocess"]
+    llm_service.LLM_PROMPT_CACHE = options["cache"]
+    sized = llm_service.max_tokens_for
+    budgets = []
+
+    def budget(text):
+        tokens = sized(text) if options["sized_max_tokens"] else llm_service.LLM_MAX_TOKENS
+        budgets.append(tokens)
+        return tokens
+
+    llm_service.max_tokens_for = budget
+    dispatcher = llm_service.LLMDispatcher(concurrency=1, batch_size=1)
+    llm_service._dispatchers[asyncio.get_running_loop()] = dispatcher
+
+    latencies, errors = [], 0
+    started = time.perf_counter()
+    try:
+        for _ in range(repeats):
+            for receipt in load_receipts():
+                t0 = time.perf_counter()
+                try:
+                    await llm_service.parse_receipt_text(receipt["ocr_text"])
+                    latencies.append(time.perf_counter() - t0)
+                except Exception:
+                    errors += 1
+    finally:
+        llm_service.max_tokens_for = sized
+        if dispatcher._client is not None:
+            await dispatcher._client.aclose()
+
+    calls = max(1, len(latencies) + errors)
+    stats = dispatcher.stats
+    return {
+        "scenario": name,
+        **summarize(latencies, errors, time.perf_counter() - started),
+        "prompt_tokens": round(stats["prompt_tokens"] / calls),
+        "cached_prompt_tokens": round(stats["cached_prompt_tokens"] / calls),
+        "uncached_prompt_tokens": round((stats["prompt_tokens"] - stats["cached_prompt_tokens"]) / calls),
+        "completion_tokens": round(stats["completion_tokens"] / calls),
+        "max_tokens": round(sum(budgets) / max(1, len(budgets))),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Prompt preprocessing, token budget and prefix caching")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--llm-url", help="Real chat completions URL (default: local fake server)")
+    parser.add_argument("--prefill-ms-per-token", type=float, default=0.5, help="Fake server prompt cost")
+    parser.add_argument("--decode-latency-ms", type=float, default=50, help="Fake server fixed latency")
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/prompt-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from services import llm_service
+
+    server = None
+    if not args.llm_url:
+        server = FakeLLMServer(Latency(args.decode_latency_ms), prefill_ms_per_token=args.prefill_ms_per_token).start()
+    llm_service.LLM_API_URL = args.llm_url or server.chat_url
+
+    results = []
+    try:
+        for name, options in MODES.items():
+            print(f"📝 {name}...")
+            results.append(asyncio.run(run_mode(llm_service, name, options, args.repeats)))
+    finally:
+        if server:
+            server.stop()
+
+    corpus = load_receipts()
+    kept = sum(fidelity(llm_service, r) for r in corpus)
+    raw_chars = sum(len(r["ocr_text"]) for r in corpus)
+    clean_chars = sum(len(llm_service.preprocess_ocr_text(r["ocr_text"])) for r in corpus)
+
+    print(f"\n{'mode':<18} {'prompt tok':>10} {'uncached':>9} {'max_tok':>8} {'compl tok':>9} {'p50 ms':>8} {'p95 ms':>8} {'err':>4}")
+    for r in results:
+        print(f"{r['scenario']:<18} {r['prompt_tokens']:>10} {r['uncached_prompt_tokens']:>9} {r['max_tokens']:>8} "
+              f"{r['completion_tokens']:>9} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['errors']:>4}")
+    print(f"\nOCR text: {raw_chars:,} -> {clean_chars:,} characters; "
+          f"fidelity {kept}/{len(corpus)} receipts keep every item and amount")
+    if server:
+        print("(latency from the fake server's prefill model, not a real model)")
+
+    config = {**{k: v for k, v in vars(args).items() if k != "output"},
+              "ocr_chars": raw_chars, "preprocessed_chars": clean_chars, "fidelity": f"{kept}/{len(corpus)}"}
+    path = write_results("prompt", config, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
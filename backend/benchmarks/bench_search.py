@@ -0,0 +1,125 @@
+"""
+Benchmark order search with and without its indexes.
+
+Each search runs twice: once through search_orders, and once with index and
+bitmap scans disabled for the transaction, which is what the same query costs on a table
+without the trigram/full-text indexes. The plan's index names are recorded so
+it's visible which index (if any) served each query. Searches for a term that
+matches nothing are the worst case for an unindexed scan.
+
+Usage (from backend/):
+    uv run python -m benchmarks.bench_search --seed-orders 3000000 --seed-users 50000
+    uv run python -m benchmarks.bench_search --restaurant shawarma,zzqx --item falafel --q hummus
+"""
+import argparse
+import json
+import sys
+import time
+
+from sqlalchemy import text
+
+from benchmarks.stats import print_table, summarize, write_results
+
+DEFAULT_SEARCHES = {
+    "restaurant": ["pizza", "zzqx"],
+    "item": ["falafel", "zzqx"],
+    "q": ["shawarma", "zzqx"],
+}
+
+# CLI option -> build_search_query keyword
+SEARCH_ARGS = {"restaurant": "restaurant", "item": "item", "q": "text"}
+
+
+def plan_indexes(db, query) -> list[str]:
+    """Index names used by the query's plan"""
+    sql = str(query.statement.compile(db.bind, compile_kwargs={"literal_binds": True}))
+    plan = db.execute(text("EXPLAIN (FORMAT JSON) " + sql)).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    found = []
+
+    def walk(node):
+        if "Index Name" in node:
+            found.append(node["Index Name"])
+        for child in node.get("Plans", []):
+            walk(child)
+
+    walk(plan[0]["Plan"])
+    return sorted(set(found))
+
+
+def parse_terms(value: str) -> list[str]:
+    return [t for t in value.split(",") if t]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Order search with vs without indexes")
+    parser.add_argument("--restaurant", type=parse_terms, default=DEFAULT_SEARCHES["restaurant"])
+    parser.add_argument("--item", type=parse_terms, default=DEFAULT_SEARCHES["item"])
+    parser.add_argument("--q", type=parse_terms, default=DEFAULT_SEARCHES["q"])
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=20, help="Runs per search and mode")
+    parser.add_argument("--seed-orders", type=int, default=0, help="Seed up to this many orders first")
+    parser.add_argument("--seed-users", type=int, default=5000)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/search-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    from database import SessionLocal, engine
+    from services.search_service import SPARSE_MATCH_LIMIT, build_search_query, count_text_matches, search_orders
+
+    if args.seed_orders:
+        from benchmarks.load_test import ensure_dataset
+        ensure_dataset(engine, args.seed_orders, args.seed_users, items_per_order=10)
+
+    db = SessionLocal()
+    results = []
+    try:
+        order_count = db.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+        trigram = db.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")).scalar() is not None
+        print(f"🔎 {order_count:,} orders, pg_trgm {'installed' if trigram else 'NOT installed'}")
+
+        for field in ("restaurant", "item", "q"):
+            for term in getattr(args, field):
+                kwargs = {SEARCH_ARGS[field]: term}
+                for mode in ("indexed", "scan"):
+                    if mode == "scan":
+                        db.execute(text("SET LOCAL enable_indexscan = off"))
+                        db.execute(text("SET LOCAL enable_bitmapscan = off"))
+                    sparse = field == "q" and count_text_matches(db, term) < SPARSE_MATCH_LIMIT
+                    query = build_search_query(db, limit=args.limit, sparse=sparse, **kwargs)
+                    indexes = plan_indexes(db, query)
+                    # The indexed run goes through search_orders so the sparse-match probe is timed too
+                    run = (lambda: search_orders(db, limit=args.limit, **kwargs)) if mode == "indexed" else query.all
+
+                    latencies = []
+                    rows = 0
+                    started = time.perf_counter()
+                    for _ in range(args.repeats):
+                        t0 = time.perf_counter()
+                        rows = len(run())
+                        latencies.append(time.perf_counter() - t0)
+                        db.expunge_all()
+                    results.append({
+                        "scenario": f"{field}={term}[{mode}]",
+                        **summarize(latencies, 0, time.perf_counter() - started),
+                        "rows": rows,
+                        "indexes": indexes,
+                    })
+                    db.rollback()  # drops the SET LOCALs
+    finally:
+        db.close()
+
+    print_table(results)
+    print(f"\n{'scenario':<40} {'rows':>5}  indexes")
+    for r in results:
+        print(f"{r['scenario']:<40} {r['rows']:>5}  {', '.join(r['indexes']) or '-'}")
+
+    config = {**{k: v for k, v in vars(args).items() if k != "output"}, "orders": order_count, "pg_trgm": trigram}
+    path = write_results("search", config, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,321 @@
+"""
+Deterministic local stand-ins for the external services the API talks to.
+
+- FakeLLMServer: OpenAI-compatible /v1/chat/completions answering with a
+  fill_invoice tool call taken from the fixture corpus, and /v1/completions
+  answering batched prompts with the same data as JSON text
+- FakeOllamaServer: /api/generate returning the OCR text of a fixture image
+- FakeS3Client: in-memory replacement for the boto3 client in storage_service
+- FakeTwilioClient: in-memory replacement for the Twilio client in sms_service
+
+Every fake takes a latency (ms) and an optional jitter (ms). Jitter comes from a
+seeded RNG so two runs with the same settings see the same delays.
+"""
+import base64
+import itertools
+import json
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from benchmarks.fixtures import image_digest, load_receipts, receipt_images
+
+
+class Latency:
+    """Seeded, thread-safe delay generator"""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def next_delay(self) -> float:
+        with self._lock:
+            jitter = self._rng.uniform(0, self.jitter_ms) if self.jitter_ms else 0.0
+        return (self.latency_ms + jitter) / 1000.0
+
+    def sleep(self):
+        delay = self.next_delay()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def _match_receipt(text: str) -> dict:
+    """Find the fixture receipt whose restaurant name appears in the text"""
+    lowered = text.lower()
+    receipts = load_receipts()
+    for receipt in receipts:
+        if receipt["parsed"]["restaurant"].lower() in lowered:
+            return receipt
+    return receipts[0]
+
+
+class _FakeHTTPServer:
+    """Run a ThreadingHTTPServer on a free localhost port in a daemon thread"""
+
+    def __init__(self, latency: Latency, slots: int = 0):
+        self.latency = latency
+        self.request_count = 0
+        self.abandoned_count = 0
+        # Requests served at once; 0 = unlimited. A local model server runs one
+        # model, so extra requests queue inside it and eventually time out.
+        self._slots = threading.Semaphore(slots) if slots else None
+        self._server = None
+        self._thread = None
+
+    def handle_post(self, path: str, payload: dict) -> tuple[int, dict]:
+        raise NotImplementedError
+
+    def start(self) -> "_FakeHTTPServer":
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                fake.request_count += 1
+                if fake._slots:
+                    with fake._slots:
+                        fake.latency.sleep()
+                else:
+                    fake.latency.sleep()
+                status, body = fake.handle_post(self.path, payload)
+                data = json.dumps(body).encode("utf-8")
+                try:
+                    self.send_response(status)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(data)))
+                    self.end_headers()
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    # The client gave up (timeout or cancelled request)
+                    fake.abandoned_count += 1
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def stop(self):
+        if self._server:
+            self._server.shutdown()
+            self._server.server_close()
+
+
+class FakeLLMServer(_FakeHTTPServer):
+    """
+    OpenAI-compatible chat completions endpoint that always calls fill_invoice.
+
+    With prefill_ms_per_token, reading the prompt costs time per prompt token
+    (4 characters each). A request sent with cache_prompt only pays for
+    what differs from the previous prompt, the way llama.cpp reuses a slot's
+    KV cache.
+    """
+
+    def __init__(self, latency: Latency, slots: int = 0, prefill_ms_per_token: float = 0.0):
+        super().__init__(latency, slots)
+        self.prefill_ms_per_token = prefill_ms_per_token
+        self._last_prompt = ""
+
+    def _prefill(self, prompt: str, cache: bool) -> tuple[int, int]:
+        """Sleep for the uncached part of prompt; returns (prompt_tokens, cached_tokens)"""
+        cached_chars = 0
+        if cache:
+            last = self._last_prompt
+            limit = min(len(last), len(prompt))
+            while cached_chars < limit and last[cached_chars] == prompt[cached_chars]:
+                cached_chars += 1
+        self._last_prompt = prompt
+        prompt_tokens, cached_tokens = len(prompt) // 4, cached_chars // 4
+        if self.prefill_ms_per_token:
+            time.sleep((prompt_tokens - cached_tokens) * self.prefill_ms_per_token / 1000.0)
+        return prompt_tokens, cached_tokens
+
+    def handle_post(self, path: str, payload: dict) -> tuple[int, dict]:
+        if path.endswith("/v1/completions"):
+            return self.handle_completions(payload)
+        if not path.endswith("/chat/completions"):
+            return 404, {"error": f"unknown path {path}"}
+
+        messages = payload.get("messages", [])
+        # Chat templates put the tools after the system prompt, before the conversation
+        rendered = json.dumps(messages[:1]) + json.dumps(payload.get("tools", [])) + json.dumps(messages[1:])
+        prompt_tokens, cached_tokens = self._prefill(rendered, bool(payload.get("cache_prompt")))
+        prompt = "\n".join(m.get("content", "") for m in messages)
+        receipt = _match_receipt(prompt)
+        arguments = json.dumps(receipt["parsed"])
+        return 200, {
+            "id": "chatcmpl-bench",
+            "object": "chat.completion",
+            "model": payload.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls",
+                "message": {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [{
+                        "id": "call_0",
+                        "type": "function",
+                        "function": {"name": "fill_invoice", "arguments": arguments},
+                    }],
+                },
+            }],
+            # Rough 4-chars-per-token estimate, good enough to compare prompts
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(arguments) // 4,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }
+
+    def handle_completions(self, payload: dict) -> tuple[int, dict]:
+        """Batched completions: one choice per prompt, the receipt as JSON text"""
+        prompts = payload.get("prompt") or []
+        if isinstance(prompts, str):
+            prompts = [prompts]
+        # The receipt text follows the schema in the prompt
+        texts = [json.dumps(_match_receipt(p.rsplit("Receipt:", 1)[-1])["parsed"]) for p in prompts]
+        return 200, {
+            "id": "cmpl-bench",
+            "object": "text_completion",
+            "model": payload.get("model", "fake"),
+            "choices": [{"index": i, "text": text, "finish_reason": "stop"} for i, text in enumerate(texts)],
+            "usage": {
+                "prompt_tokens": sum(len(p) for p in prompts) // 4,
+                "completion_tokens": sum(len(t) for t in texts) // 4,
+            },
+        }
+
+    @property
+    def chat_url(self) -> str:
+        return f"{self.base_url}/v1/chat/completions"
+
+
+class FakeOllamaServer(_FakeHTTPServer):
+    """Ollama /api/generate endpoint returning fixture OCR text for fixture images"""
+
+    def __init__(self, latency: Latency):
+        super().__init__(latency)
+        self._text_by_digest = {image_digest(img): r["ocr_text"] for r, img in receipt_images()}
+
+    def handle_post(self, path: str, payload: dict) -> tuple[int, dict]:
+        if path != "/api/generate":
+            return 404, {"error": f"unknown path {path}"}
+
+        images = payload.get("images") or []
+        text = ""
+        if images:
+            text = self._text_by_digest.get(image_digest(base64.b64decode(images[0])), "")
+        return 200, {"model": payload.get("model"), "response": text, "done": True}
+
+
+class FakeS3Client:
+    """In-memory subset of the boto3 S3 client used by storage_service"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.buckets: set[str] = set()
+        self.objects: dict[tuple[str, str], dict] = {}
+        self._lock = threading.Lock()
+
+    def head_bucket(self, Bucket: str):
+        self.latency.sleep()
+        if Bucket not in self.buckets:
+            raise Exception(f"NoSuchBucket: {Bucket}")
+        return {}
+
+    def create_bucket(self, Bucket: str):
+        self.latency.sleep()
+        self.buckets.add(Bucket)
+        return {}
+
+    def put_object(self, Bucket: str, Key: str, Body: bytes, ContentType: str = "binary/octet-stream", **kwargs):
+        self.latency.sleep()
+        with self._lock:
+            self.objects[(Bucket, Key)] = {"Body": Body, "ContentType": ContentType}
+        return {"ETag": f'"{image_digest(Body)[:32]}"'}
+
+    def get_object(self, Bucket: str, Key: str, **kwargs):
+        self.latency.sleep()
+        obj = self.objects[(Bucket, Key)]
+        return {"Body": SimpleNamespace(read=lambda: obj["Body"]), "ContentType": obj["ContentType"]}
+
+
+class FakeTwilioClient:
+    """In-memory Twilio client: messages.create() records the message and returns a sid"""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.sent: list[dict] = []
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self.messages = SimpleNamespace(create=self._create)
+
+    def _create(self, **params):
+        self.latency.sleep()
+        with self._lock:
+            sid = f"SM{next(self._counter):032x}"
+            self.sent.append({"sid": sid, **params})
+        return SimpleNamespace(sid=sid)
+
+
+class FakeBackends:
+    """
+    Start all fakes and point the services at them.
+
+    Call start() before importing any service module (they read their URLs
+    from the environment at import time), then patch_services() once the
+    modules are imported.
+    """
+
+    def __init__(
+        self,
+        llm_latency_ms: float = 0.0,
+        ocr_latency_ms: float = 0.0,
+        s3_latency_ms: float = 0.0,
+        sms_latency_ms: float = 0.0,
+        jitter_ms: float = 0.0,
+        seed: int = 0,
+    ):
+        self.llm = FakeLLMServer(Latency(llm_latency_ms, jitter_ms, seed))
+        self.ollama = FakeOllamaServer(Latency(ocr_latency_ms, jitter_ms, seed + 1))
+        self.s3 = FakeS3Client(Latency(s3_latency_ms, jitter_ms, seed + 2))
+        self.twilio = FakeTwilioClient(Latency(sms_latency_ms, jitter_ms, seed + 3))
+
+    def start(self) -> "FakeBackends":
+        self.llm.start()
+        self.ollama.start()
+        os.environ["LLM_API_URL"] = self.llm.chat_url
+        os.environ["GLM_OCR_OLLAMA_URL"] = self.ollama.base_url
+        os.environ["OCR_ENGINE"] = "glm-ocr"
+        return self
+
+    def patch_services(self):
+        from services import ocr_service, llm_service, sms_service, storage_service
+
+        llm_service.LLM_API_URL = self.llm.chat_url
+        ocr_service.GLM_OCR_OLLAMA_URL = self.ollama.base_url
+        ocr_service.OCR_ENGINE = "glm-ocr"
+        ocr_service.OCR_SERVICE_URL = ""
+        storage_service.s3_client = self.s3
+        sms_service.twilio_client = self.twilio
+        sms_service.TWILIO_PHONE_NUMBER = "+15005550006"
+        sms_service.TWILIO_MESSAGING_SERVICE_SID = None
+
+    def stop(self):
+        self.llm.stop()
+        self.ollama.stop()
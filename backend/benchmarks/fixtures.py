@@ -0,0 +1,48 @@
+"""
+Fixture receipt corpus for benchmarks.
+
+Each receipt in data/receipts.json carries the OCR text an engine would
+produce and the structured data the LLM is expected to return for it. Images
+are rendered from the OCR text so the corpus stays small and diffable.
+"""
+import hashlib
+import io
+import json
+import os
+from functools import lru_cache
+
+from PIL import Image, ImageDraw
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), "data")
+
+
+@lru_cache(maxsize=1)
+def load_receipts() -> list[dict]:
+    """Load the receipt corpus (id, ocr_text, parsed)"""
+    with open(os.path.join(DATA_DIR, "receipts.json")) as f:
+        return json.load(f)
+
+
+def render_receipt_image(ocr_text: str) -> bytes:
+    """Render receipt text onto a white PNG, deterministic for a given text"""
+    lines = ocr_text.splitlines()
+    width = 480
+    height = 40 + 18 * len(lines)
+    image = Image.new("RGB", (width, height), color="white")
+    draw = ImageDraw.Draw(image)
+    for i, line in enumerate(lines):
+        draw.text((20, 20 + 18 * i), line, fill="black")
+
+    buf = io.BytesIO()
+    image.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+@lru_cache(maxsize=1)
+def receipt_images() -> list[tuple[dict, bytes]]:
+    """Return (receipt, png_bytes) pairs for the whole corpus"""
+    return [(r, render_receipt_image(r["ocr_text"])) for r in load_receipts()]
+
+
+def image_digest(image_bytes: bytes) -> str:
+    return hashlib.sha256(image_bytes).hexdigest()
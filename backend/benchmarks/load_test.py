@@ -0,0 +1,270 @@
+"""
+Open-loop load test for the CRUD and split routes against a large dataset.
+
+Each endpoint in the profile gets its own arrival rate (requests/second).
+Requests are fired on schedule whether or not earlier ones have finished, so
+queueing shows up in the latency numbers instead of silently lowering the
+offered load. The API runs in-process, which lets us count SQL statements per
+request and sample the connection pool while the test runs.
+
+Usage (from backend/, DATABASE_URL pointing at a local Postgres):
+    uv run python -m benchmarks.load_test --seed-orders 1000000 --seed-users 20000
+    uv run python -m benchmarks.load_test --rps list_orders=20,get_order_splits=50,create_bulk_splits=5 --duration 60
+"""
+import argparse
+import asyncio
+import contextvars
+import random
+import sys
+import time
+
+from sqlalchemy import event, text
+
+from benchmarks.stats import print_table, summarize, write_results
+
+DEFAULT_PROFILE = {
+    "list_orders": 10,
+    "get_order": 30,
+    "get_order_splits": 30,
+    "list_users": 5,
+    "create_bulk_splits": 5,
+}
+
+# Per-request statement counter, set by the load generator before each call
+_query_counter: contextvars.ContextVar = contextvars.ContextVar("query_counter", default=None)
+
+
+def install_query_counter(engine):
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count(conn, cursor, statement, parameters, context, executemany):
+        counter = _query_counter.get()
+        if counter is not None:
+            counter[0] += 1
+
+
+def ensure_dataset(engine, orders: int, users: int, items_per_order: int):
+    """Seed with COPY when the database holds fewer orders than requested"""
+    from database import Base
+    import models  # noqa: F401  (register tables)
+
+    Base.metadata.create_all(bind=engine)
+    with engine.connect() as conn:
+        existing = conn.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+    if existing >= orders:
+        print(f"📦 Using existing dataset ({existing:,} orders)")
+        return
+
+    from benchmarks.seed import seed
+    seed(users=users, orders=orders - existing, items_per_order=items_per_order)
+
+
+def load_targets(engine, sample_size: int, rng: random.Random) -> dict:
+    """Sample order ids (with their item ids) and user ids to aim requests at"""
+    with engine.connect() as conn:
+        max_order = conn.execute(text("SELECT COALESCE(MAX(id), 0) FROM orders")).scalar()
+        order_count = conn.execute(text("SELECT COUNT(*) FROM orders")).scalar()
+        user_ids = [r[0] for r in conn.execute(text("SELECT id FROM users ORDER BY random() LIMIT 1000"))]
+        rows = conn.execute(
+            text("SELECT order_id, array_agg(id) FROM items WHERE order_id = ANY(:ids) GROUP BY order_id"),
+            {"ids": [rng.randint(1, max_order) for _ in range(sample_size)]},
+        ).all()
+    return {
+        "order_count": order_count,
+        "orders": [(order_id, item_ids) for order_id, item_ids in rows],
+        "user_ids": user_ids,
+    }
+
+
+def build_requests(client, targets: dict, page_size: int, rng: random.Random) -> dict:
+    orders = targets["orders"]
+    user_ids = targets["user_ids"]
+    max_skip = max(0, targets["order_count"] - page_size)
+
+    def list_orders():
+        return client.get("/api/orders/", params={"skip": rng.randint(0, max_skip), "limit": page_size})
+
+    def get_order():
+        return client.get(f"/api/orders/{rng.choice(orders)[0]}")
+
+    def get_order_splits():
+        return client.get(f"/api/splits/order/{rng.choice(orders)[0]}")
+
+    def list_users():
+        return client.get("/api/users/", params={"skip": rng.randint(0, max(0, len(user_ids) - page_size)),
+                                                 "limit": page_size})
+
+    def create_bulk_splits():
+        order_id, item_ids = rng.choice(orders)
+        diners = rng.sample(user_ids, min(len(user_ids), rng.randint(2, 5)))
+        return client.post("/api/splits/bulk", json={
+            "order_id": order_id,
+            "assignments": [
+                {"item_id": item_id, "user_ids": rng.sample(diners, rng.randint(1, len(diners)))}
+                for item_id in item_ids
+            ],
+        })
+
+    return {
+        "list_orders": list_orders,
+        "get_order": get_order,
+        "get_order_splits": get_order_splits,
+        "list_users": list_users,
+        "create_bulk_splits": create_bulk_splits,
+    }
+
+
+class EndpointStats:
+    def __init__(self):
+        self.latencies: list[float] = []
+        self.queries: list[int] = []
+        self.errors = 0
+
+
+async def drive_endpoint(name: str, make_request, rps: float, duration: float, stats: EndpointStats,
+                         max_in_flight: int):
+    """Fire make_request() every 1/rps seconds for `duration` seconds"""
+    in_flight: set[asyncio.Task] = set()
+    interval = 1.0 / rps
+    started = time.perf_counter()
+    n = 0
+
+    async def one():
+        counter = [0]
+        _query_counter.set(counter)
+        t0 = time.perf_counter()
+        try:
+            response = await make_request()
+            ok = response.status_code < 400
+        except Exception:
+            ok = False
+        if ok:
+            stats.latencies.append(time.perf_counter() - t0)
+            stats.queries.append(counter[0])
+        else:
+            stats.errors += 1
+
+    while time.perf_counter() - started < duration:
+        if len(in_flight) >= max_in_flight:
+            # Load generator saturated; count as an error rather than queueing forever
+            stats.errors += 1
+        else:
+            task = asyncio.create_task(one())
+            in_flight.add(task)
+            task.add_done_callback(in_flight.discard)
+        n += 1
+        await asyncio.sleep(max(0.0, started + n * interval - time.perf_counter()))
+
+    if in_flight:
+        await asyncio.gather(*in_flight)
+
+
+async def sample_pool(engine, samples: list[dict], stop: asyncio.Event, interval: float = 0.5):
+    pool = engine.pool
+    while not stop.is_set():
+        samples.append({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": pool.overflow(),
+        })
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run(args, profile: dict) -> tuple[list[dict], dict]:
+    import httpx
+    from database import engine
+    from main import app
+
+    install_query_counter(engine)
+    rng = random.Random(args.seed)
+    targets = load_targets(engine, args.sample_orders, rng)
+    if not targets["orders"] or not targets["user_ids"]:
+        raise SystemExit("Dataset is empty - run with --seed-orders first")
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://load", timeout=None) as client:
+        requests = build_requests(client, targets, args.page_size, rng)
+        stats = {name: EndpointStats() for name in profile}
+        pool_samples: list[dict] = []
+        stop = asyncio.Event()
+        sampler = asyncio.create_task(sample_pool(engine, pool_samples, stop))
+
+        print(f"🚀 Running {', '.join(f'{k}={v}/s' for k, v in profile.items())} for {args.duration}s...")
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            drive_endpoint(name, requests[name], rps, args.duration, stats[name], args.max_in_flight)
+            for name, rps in profile.items()
+        ))
+        elapsed = time.perf_counter() - started
+        stop.set()
+        await sampler
+
+    results = []
+    for name, s in stats.items():
+        summary = summarize(s.latencies, s.errors, elapsed)
+        queries = sorted(s.queries)
+        results.append({
+            "scenario": name,
+            "target_rps": profile[name],
+            **summary,
+            "queries_per_request_mean": round(sum(queries) / len(queries), 2) if queries else 0.0,
+            "queries_per_request_max": queries[-1] if queries else 0,
+        })
+
+    pool_stats = {
+        "size": pool_samples[-1]["size"] if pool_samples else None,
+        "max_checked_out": max((p["checked_out"] for p in pool_samples), default=0),
+        "max_overflow": max((p["overflow"] for p in pool_samples), default=0),
+        "mean_checked_out": round(sum(p["checked_out"] for p in pool_samples) / len(pool_samples), 2)
+        if pool_samples else 0.0,
+    }
+    return results, pool_stats
+
+
+def parse_profile(value: str) -> dict:
+    profile = {}
+    for part in value.split(","):
+        name, _, rps = part.partition("=")
+        if name not in DEFAULT_PROFILE:
+            raise argparse.ArgumentTypeError(f"Unknown endpoint '{name}' (choose from {', '.join(DEFAULT_PROFILE)})")
+        profile[name] = float(rps)
+    return profile
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Open-loop load test against a seeded dataset")
+    parser.add_argument("--rps", type=parse_profile, default=DEFAULT_PROFILE,
+                        help="endpoint=rps pairs, e.g. list_orders=20,get_order_splits=50")
+    parser.add_argument("--duration", type=float, default=30.0, help="Seconds to run each endpoint")
+    parser.add_argument("--page-size", type=int, default=100, help="limit used for list endpoints")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="Per-endpoint cap on outstanding requests")
+    parser.add_argument("--sample-orders", type=int, default=5000, help="Orders sampled as request targets")
+    parser.add_argument("--seed-orders", type=int, default=0, help="Seed up to this many orders before running")
+    parser.add_argument("--seed-users", type=int, default=5000)
+    parser.add_argument("--items-per-order", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Result file path (default: benchmarks/results/load-<stamp>.json)")
+    args = parser.parse_args(argv)
+
+    if args.seed_orders:
+        from database import engine
+        ensure_dataset(engine, args.seed_orders, args.seed_users, args.items_per_order)
+
+    results, pool_stats = asyncio.run(run(args, args.rps))
+
+    print_table(results)
+    print(f"\n{'scenario':<32} {'queries/req':>12} {'max':>6}")
+    for r in results:
+        print(f"{r['scenario']:<32} {r['queries_per_request_mean']:>12.2f} {r['queries_per_request_max']:>6}")
+    print(f"\n🏊 Pool: {pool_stats}")
+
+    config = {k: v for k, v in vars(args).items() if k != "output"}
+    path = write_results("load", {**config, "pool": pool_stats}, results, args.output)
+    print(f"\n💾 Results written to {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,218 @@
+"""
+Bulk-load a large, realistic dataset into Postgres with COPY.
+
+Generates users, orders (restaurants and items drawn from the fixture
+corpus), items and splits whose amounts follow the same proportional-fee
+rule as create_bulk_splits. Ids are assigned client-side so items and
+splits can reference their orders without round trips; the sequences are
+moved past the loaded ids at the end.
+
+Usage (from backend/):
+    uv run python -m benchmarks.seed --users 5000 --orders 1000000 --items-per-order 10
+"""
+import argparse
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from benchmarks.fixtures import load_receipts
+
+FIRST_NAMES = [
+    "Ahmad", "Sara", "Omar", "Lina", "Yousef", "Maya", "Khaled", "Noor", "Ali", "Dana",
+    "John", "Jane", "Alex", "Sam", "Chris", "Taylor", "Jordan", "Casey", "Riley", "Morgan",
+]
+LAST_NAMES = [
+    "Haddad", "Khalil", "Nasser", "Saleh", "Mansour", "Smith", "Johnson", "Lee", "Brown", "Garcia",
+]
+
+
+def _max_id(cur, table: str) -> int:
+    cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}")
+    return cur.fetchone()[0]
+
+
+def _bump_sequence(cur, table: str):
+    cur.execute(
+        f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+        f"(SELECT COALESCE(MAX(id), 1) FROM {table}))"
+    )
+
+
+def seed_users(cur, count: int, rng: random.Random) -> list[int]:
+    start = _max_id(cur, "users") + 1
+    created_at = datetime.utcnow()
+    with cur.copy("COPY users (id, name, phone, whatsapp_number, payment_handle, created_at) FROM STDIN") as copy:
+        for user_id in range(start, start + count):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            phone = f"+9627{user_id:08d}"
+            copy.write_row((
+                user_id,
+                name,
+                phone,
+                phone if rng.random() < 0.7 else None,
+                f"cliq @{name.split()[0].lower()}{user_id}",
+                created_at,
+            ))
+    _bump_sequence(cur, "users")
+    return list(range(start, start + count))
+
+
+def _order_rows(order_id: int, user_ids: list[int], items_per_order: int, rng: random.Random, start_date: datetime):
+    """Build one order with its items and splits as plain tuples"""
+    fixture = rng.choice(load_receipts())
+    receipt = fixture["parsed"]
+    menu = receipt["items"]
+    item_count = max(1, int(rng.gauss(items_per_order, items_per_order / 3)))
+
+    items = []
+    for _ in range(item_count):
+        entry = rng.choice(menu)
+        items.append([entry["name"], round(entry["price"] * rng.uniform(0.9, 1.1), 2), rng.randint(1, 3)])
+
+    subtotal = round(sum(price * qty for _, price, qty in items), 2)
+    tax = round(subtotal * 0.08, 2)
+    delivery_fee = rng.choice([0.0, 1.0, 1.5, 2.0])
+    tip = rng.choice([0.0, 0.0, 1.0, 2.0, 5.0])
+    discount = rng.choice([0.0, 0.0, 0.0, 1.0, 2.0])
+    total = round(subtotal + tax + delivery_fee + tip - discount, 2)
+
+    diners = rng.sample(user_ids, min(len(user_ids), rng.randint(2, 6)))
+    payer = diners[0]
+    date = start_date + timedelta(minutes=order_id % (365 * 24 * 60))
+
+    parsed = json.dumps({
+        "restaurant": receipt["restaurant"], "total": total, "subtotal": subtotal, "tax": tax,
+        "delivery_fee": delivery_fee, "tip": tip, "discount": discount,
+        "items": [{"name": name, "price": price, "quantity": qty} for name, price, qty in items],
+    })
+    order = (order_id, receipt["restaurant"], total, subtotal, tax, delivery_fee, tip, discount, date, payer,
+             fixture["ocr_text"], parsed)
+    return order, items, diners, tax + delivery_fee + tip - discount
+
+
+def seed_orders(
+    cur,
+    count: int,
+    user_ids: list[int],
+    items_per_order: int,
+    rng: random.Random,
+    batch_size: int,
+    commit,
+) -> tuple[int, int]:
+    """COPY orders, items and splits in batches; returns (items, splits) loaded"""
+    next_order = _max_id(cur, "orders") + 1
+    next_item = _max_id(cur, "items") + 1
+    next_split = _max_id(cur, "splits") + 1
+    start_date = datetime.utcnow() - timedelta(days=365)
+    total_items = total_splits = 0
+
+    for batch_start in range(0, count, batch_size):
+        batch = min(batch_size, count - batch_start)
+        orders, items, splits, split_items = [], [], [], []
+
+        for order_id in range(next_order, next_order + batch):
+            order, order_items, diners, fees = _order_rows(order_id, user_ids, items_per_order, rng, start_date)
+            orders.append(order)
+            payer = order[9]
+
+            user_subtotals = {uid: 0.0 for uid in diners}
+            user_items = {uid: [] for uid in diners}
+            for name, price, qty in order_items:
+                items.append((next_item, order_id, name, price, qty))
+                sharers = rng.sample(diners, rng.choice([1, 1, 1, 2, len(diners)]))
+                for uid in sharers:
+                    user_subtotals[uid] += price * qty / len(sharers)
+                    user_items[uid].append((next_item, name, 1 / len(sharers)))
+                next_item += 1
+
+            total_subtotal = sum(user_subtotals.values())
+            for uid, subtotal in user_subtotals.items():
+                if subtotal <= 0:
+                    continue
+                amount = round(subtotal + fees * (subtotal / total_subtotal), 2)
+                paid = uid == payer or rng.random() < 0.6
+                payload = json.dumps({"restaurant": order[1], "items": [name for _, name, _ in user_items[uid]]})
+                splits.append((next_split, order_id, uid, [i for i, _, _ in user_items[uid]], amount, paid, False,
+                               payload))
+                split_items.extend((next_split, i, share) for i, _, share in user_items[uid])
+                next_split += 1
+
+        with cur.copy(
+            "COPY orders (id, restaurant, total, subtotal, tax, delivery_fee, tip, discount, date, paid_by_user_id, "
+            "ocr_raw_text, parsed_data) FROM STDIN"
+        ) as copy:
+            for row in orders:
+                copy.write_row(row)
+        with cur.copy("COPY items (id, order_id, name, price, quantity) FROM STDIN") as copy:
+            for row in items:
+                copy.write_row(row)
+        with cur.copy(
+            "COPY splits (id, order_id, user_id, item_ids, amount_owed, paid_status, reminder_sent, reminder_payload) "
+            "FROM STDIN"
+        ) as copy:
+            for row in splits:
+                copy.write_row(row)
+        with cur.copy("COPY split_items (split_id, item_id, share) FROM STDIN") as copy:
+            for row in split_items:
+                copy.write_row(row)
+        commit()
+
+        next_order += batch
+        total_items += len(items)
+        total_splits += len(splits)
+        print(f"   {batch_start + batch:>10,} / {count:,} orders ({total_items:,} items, {total_splits:,} splits)")
+
+    for table in ("orders", "items", "splits"):
+        _bump_sequence(cur, table)
+    return total_items, total_splits
+
+
+def seed(users: int, orders: int, items_per_order: int = 10, batch_size: int = 20000, seed: int = 0) -> dict:
+    """Load the dataset into DATABASE_URL and return row counts"""
+    from database import Base, engine
+    from migrate import run_migrations
+    import models  # noqa: F401  (register tables)
+
+    Base.metadata.create_all(bind=engine)
+    run_migrations(engine)
+    rng = random.Random(seed)
+    started = time.perf_counter()
+
+    raw = engine.raw_connection()
+    try:
+        conn = raw.driver_connection
+        with conn.cursor() as cur:
+            print(f"🌱 Loading {users:,} users...")
+            user_ids = seed_users(cur, users, rng)
+            conn.commit()
+
+            print(f"🌱 Loading {orders:,} orders (~{items_per_order} items each)...")
+            item_count, split_count = seed_orders(
+                cur, orders, user_ids, items_per_order, rng, batch_size, conn.commit
+            )
+
+            print("📊 Analyzing tables...")
+            cur.execute("ANALYZE users, orders, items, splits, split_items")
+            conn.commit()
+    finally:
+        raw.close()
+
+    elapsed = time.perf_counter() - started
+    print(f"✅ Seeded in {elapsed:.1f}s")
+    return {"users": users, "orders": orders, "items": item_count, "splits": split_count, "seconds": round(elapsed, 1)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk-load a synthetic dataset with COPY")
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--orders", type=int, default=100000)
+    parser.add_argument("--items-per-order", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=20000, help="Orders per COPY batch / commit")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+    seed(args.users, args.orders, args.items_per_order, args.batch_size, args.seed)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Latency collection, percentile math and JSON result files shared by the benchmarks.
+"""
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Optional
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return sorted_values[0]
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    weight = rank - lower
+    return sorted_values[lower] * (1 - weight) + sorted_values[upper] * weight
+
+
+def summarize(latencies_s: list[float], errors: int, elapsed_s: float) -> dict:
+    """Turn raw latencies (seconds) into the summary stored in result files"""
+    ordered = sorted(latencies_s)
+    count = len(ordered)
+    return {
+        "requests": count + errors,
+        "errors": errors,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "mean_ms": round(sum(ordered) / count * 1000, 3) if count else 0.0,
+        "max_ms": round(ordered[-1] * 1000, 3) if count else 0.0,
+        "throughput_rps": round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+    }
+
+
+async def run_closed_loop(
+    request_fn: Callable[[int], Awaitable[bool]],
+    total_requests: int,
+    concurrency: int,
+) -> dict:
+    """
+    Fire total_requests calls of request_fn(i) with at most `concurrency` in flight.
+
+    request_fn returns True on success; False or an exception counts as an error.
+    """
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(total_requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            start = time.perf_counter()
+            try:
+                ok = await request_fn(i)
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def _git_revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except Exception:
+        return None
+
+
+def write_results(name: str, config: dict, results: list[dict], output: Optional[str] = None) -> str:
+    """Write a result file and return its path"""
+    if output is None:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        output = os.path.join(RESULTS_DIR, f"{name}-{stamp}.json")
+
+    document = {
+        "benchmark": name,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results,
+    }
+    with open(output, "w") as f:
+        json.dump(document, f, indent=2)
+    return output
+
+
+def _result_key(result: dict) -> tuple:
+    return tuple(sorted((k, v) for k, v in result.items() if not isinstance(v, (int, float)) or k == "concurrency"))
+
+
+def compare_results(baseline_path: str, results: list[dict], threshold_pct: float = 20.0) -> list[dict]:
+    """
+    Compare results against a previous result file.
+
+    Rows are matched on their non-metric fields (scenario, concurrency, ...).
+    Returns the rows whose p95 got slower by more than threshold_pct.
+    """
+    with open(baseline_path) as f:
+        baseline = {_result_key(r): r for r in json.load(f)["results"]}
+
+    regressions = []
+    print(f"\n{'scenario':<40} {'p95 before':>12} {'p95 now':>12} {'delta':>9}")
+    for result in results:
+        before = baseline.get(_result_key(result))
+        if not before or not before.get("p95_ms"):
+            continue
+        delta = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100
+        label = f"{result.get('scenario', '?')} c={result.get('concurrency', '-')}"
+        flag = "  <-- regression" if delta > threshold_pct else ""
+        print(f"{label:<40} {before['p95_ms']:>12.2f} {result['p95_ms']:>12.2f} {delta:>8.1f}%{flag}")
+        if delta > threshold_pct:
+            regressions.append({**result, "baseline_p95_ms": before["p95_ms"], "delta_pct": round(delta, 1)})
+    return regressions
+
+
+def print_table(results: list[dict]):
+    print(f"\n{'scenario':<32} {'conc':>5} {'reqs':>6} {'err':>5} {'p50':>9} {'p95':>9} {'p99':>9} {'rps':>9}")
+    for r in results:
+        print(
+            f"{r.get('scenario', '?'):<32} {r.get('concurrency', '-'):>5} {r['requests']:>6} {r['errors']:>5} "
+            f"{r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['throughput_rps']:>9.1f}"
+        )
@@ -1,12 +1,35 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from database import engine, Base
-from routers import users, orders, splits
+from migrate import run_migrations
+from services.idempotency_service import IdempotencyMiddleware
+from services.deadline_service import request_metrics
+from services.llm_service import llm_metrics
+from services.ocr_service import get_ocr_metrics
+from services.receipt_job_service import start_workers, stop_workers
+from services.reminder_service import start_scheduler, stop_scheduler
+from routers import users, orders, splits, balances, settlements, exports, imports, receipt_jobs
 
 # Create database tables
 Base.metadata.create_all(bind=engine)
+run_migrations(engine)
 
-app = FastAPI(title="Bill Splitter API", version="1.0.0")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Background workers for POST /api/receipt-jobs (RECEIPT_JOB_WORKERS, 0 to run them separately)
+    workers = start_workers(engine)
+    # Scheduled payment reminder sweeps (REMINDER_SWEEP_ENABLED)
+    reminders = start_scheduler(engine)
+    yield
+    await stop_scheduler(reminders)
+    await stop_workers(workers)
+
+app = FastAPI(title="Bill Splitter API", version="1.0.0", lifespan=lifespan)
+
+# Replays responses for retried uploads / order creation (Idempotency-Key header).
+# Added before CORS so CORS stays outermost and covers its responses too.
+app.add_middleware(IdempotencyMiddleware, engine=engine)
 
 # CORS middleware for frontend
 app.add_middleware(
@@ -15,12 +38,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Idempotent-Replayed", "Splits-Version"],
 )
 
 # Include routers
 app.include_router(users.router, prefix="/api/users", tags=["users"])
 app.include_router(orders.router, prefix="/api/orders", tags=["orders"])
 app.include_router(splits.router, prefix="/api/splits", tags=["splits"])
+app.include_router(balances.router, prefix="/api/balances", tags=["balances"])
+app.include_router(settlements.router, prefix="/api/settlements", tags=["settlements"])
+app.include_router(exports.router, prefix="/api/exports", tags=["exports"])
+app.include_router(imports.router, prefix="/api/imports", tags=["imports"])
+app.include_router(receipt_jobs.router, prefix="/api/receipt-jobs", tags=["receipt-jobs"])
 
 @app.get("/")
 def read_root():
@@ -29,3 +58,18 @@ def read_root():
 @app.get("/health")
 def health_check():
     return {"status": "healthy"}
+
+@app.get("/metrics/llm")
+async def llm_dispatcher_metrics():
+    """LLM queue depth, queue-wait percentiles per priority and tokens/sec"""
+    return llm_metrics()
+
+@app.get("/metrics/ocr")
+async def ocr_tier_metrics():
+    """OCR escalation rate, reasons and engine seconds per receipt"""
+    return await get_ocr_metrics()
+
+@app.get("/metrics/requests")
+def cancelled_request_metrics():
+    """Requests cancelled by client disconnect or deadline, and work finished after its client left"""
+    return request_metrics()
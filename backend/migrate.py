@@ -0,0 +1,65 @@
+"""
+Apply SQL migrations from migrations/ that haven't run yet.
+
+Base.metadata.create_all() only creates missing tables, so changes to
+existing tables (new columns, type changes, backfills) live here as numbered
+.sql files. Each file runs once, in its own transaction, and is recorded in
+schema_migrations. Files should be idempotent (IF NOT EXISTS etc.) because a
+fresh database already has the current schema from create_all().
+
+Usage: uv run python migrate.py   (also runs on API startup)
+"""
+import os
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(__file__), "migrations")
+
+# Arbitrary constant so concurrent API workers don't run the same migration twice
+MIGRATION_LOCK_ID = 804_201
+
+
+def pending_migrations(applied: set) -> list[str]:
+    files = sorted(f for f in os.listdir(MIGRATIONS_DIR) if f.endswith(".sql"))
+    return [f for f in files if f not in applied]
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    """Apply pending migrations and return their file names"""
+    ran = []
+    with engine.connect() as conn:
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_migrations ("
+                "name VARCHAR PRIMARY KEY, applied_at TIMESTAMP NOT NULL DEFAULT (now() AT TIME ZONE 'utc'))"
+            ))
+            conn.commit()
+
+            applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+            for name in pending_migrations(applied):
+                print(f"🛠️  Applying migration {name}...")
+                with open(os.path.join(MIGRATIONS_DIR, name)) as f:
+                    sql = f.read()
+                # Run the whole file on the driver cursor without parameters, so
+                # '%' in the SQL isn't taken for a placeholder
+                with conn.connection.dbapi_connection.cursor() as cursor:
+                    cursor.execute(sql)
+                conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+                conn.commit()
+                ran.append(name)
+        finally:
+            conn.rollback()
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()
+    return ran
+
+
+if __name__ == "__main__":
+    from database import engine, Base
+    import models  # noqa: F401  (register tables)
+
+    Base.metadata.create_all(bind=engine)
+    applied = run_migrations(engine)
+    print(f"✓ {len(applied)} migration(s) applied" if applied else "✓ Database is up to date")
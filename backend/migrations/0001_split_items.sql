@@ -0,0 +1,46 @@
+-- Split <-> item association with share weights, replacing lookups through splits.item_ids.
+-- splits.item_ids is kept (and still written) so API responses don't change.
+
+CREATE TABLE IF NOT EXISTS split_items (
+    split_id INTEGER NOT NULL REFERENCES splits (id) ON DELETE CASCADE,
+    item_id INTEGER NOT NULL REFERENCES items (id) ON DELETE CASCADE,
+    share DOUBLE PRECISION NOT NULL DEFAULT 1,
+    PRIMARY KEY (split_id, item_id)
+);
+CREATE INDEX IF NOT EXISTS ix_split_items_item_id ON split_items (item_id);
+
+-- Reminder queries walk from an order to its items and splits
+CREATE INDEX IF NOT EXISTS ix_items_order_id ON items (order_id);
+CREATE INDEX IF NOT EXISTS ix_splits_order_id ON splits (order_id);
+
+ALTER TABLE splits ADD COLUMN IF NOT EXISTS reminder_payload JSONB;
+
+-- Backfill from the array column. An item's share is split evenly between the
+-- splits that list it; ids that don't belong to the split's order are dropped.
+WITH pairs AS (
+    SELECT s.id AS split_id, s.order_id, u.item_id
+    FROM splits s
+    CROSS JOIN LATERAL unnest(s.item_ids) AS u (item_id)
+),
+sharers AS (
+    SELECT item_id, count(*) AS n FROM pairs GROUP BY item_id
+)
+INSERT INTO split_items (split_id, item_id, share)
+SELECT p.split_id, p.item_id, 1.0 / c.n
+FROM pairs p
+JOIN sharers c ON c.item_id = p.item_id
+JOIN items i ON i.id = p.item_id AND i.order_id = p.order_id
+ON CONFLICT DO NOTHING;
+
+UPDATE splits s
+SET reminder_payload = jsonb_build_object(
+    'restaurant', o.restaurant,
+    'items', COALESCE(
+        (SELECT jsonb_agg(i.name ORDER BY i.id)
+         FROM split_items si JOIN items i ON i.id = si.item_id
+         WHERE si.split_id = s.id),
+        '[]'::jsonb
+    )
+)
+FROM orders o
+WHERE o.id = s.order_id AND s.reminder_payload IS NULL;
@@ -0,0 +1,56 @@
+-- orders.parsed_data becomes JSONB, plus indexes for searching orders by
+-- restaurant, item name and OCR text.
+
+-- Rows that never held valid JSON become NULL (and are rebuilt below)
+CREATE OR REPLACE FUNCTION pg_temp.try_jsonb(value text) RETURNS jsonb AS $$
+BEGIN
+    RETURN value::jsonb;
+EXCEPTION WHEN others THEN
+    RETURN NULL;
+END
+$$ LANGUAGE plpgsql IMMUTABLE;
+
+ALTER TABLE orders ALTER COLUMN parsed_data TYPE JSONB USING pg_temp.try_jsonb(parsed_data::text);
+
+-- create_order never stored parsed_data; rebuild it from the saved order
+UPDATE orders o
+SET parsed_data = jsonb_build_object(
+    'restaurant', o.restaurant,
+    'total', o.total,
+    'subtotal', o.subtotal,
+    'tax', o.tax,
+    'delivery_fee', o.delivery_fee,
+    'tip', o.tip,
+    'discount', o.discount,
+    'items', COALESCE(
+        (SELECT jsonb_agg(jsonb_build_object('name', i.name, 'price', i.price, 'quantity', i.quantity) ORDER BY i.id)
+         FROM items i WHERE i.order_id = o.id),
+        '[]'::jsonb
+    )
+)
+WHERE o.parsed_data IS NULL;
+
+-- Free-text search over OCR output
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS ocr_tsv tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple', coalesce(ocr_raw_text, ''))) STORED;
+CREATE INDEX IF NOT EXISTS ix_orders_ocr_tsv ON orders USING gin (ocr_tsv);
+
+-- Substring (ILIKE '%...%') search on restaurant and item names. pg_trgm ships
+-- with Postgres contrib but may be missing on minimal installs; searches still
+-- work without it, they just scan.
+DO $$
+BEGIN
+    CREATE EXTENSION IF NOT EXISTS pg_trgm;
+EXCEPTION WHEN others THEN
+    RAISE NOTICE 'pg_trgm unavailable (%), skipping trigram indexes', SQLERRM;
+END
+$$;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm') THEN
+        CREATE INDEX IF NOT EXISTS ix_orders_restaurant_trgm ON orders USING gin (restaurant gin_trgm_ops);
+        CREATE INDEX IF NOT EXISTS ix_items_name_trgm ON items USING gin (name gin_trgm_ops);
+    END IF;
+END
+$$;
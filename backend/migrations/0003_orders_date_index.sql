@@ -0,0 +1,2 @@
+-- Exports (and any date-range report) filter orders by date
+CREATE INDEX IF NOT EXISTS ix_orders_date ON orders (date);
@@ -0,0 +1,3 @@
+-- Identifies orders created by the bulk importer, so importing the same file twice is a no-op
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS import_key VARCHAR;
+CREATE UNIQUE INDEX IF NOT EXISTS ix_orders_import_key ON orders (import_key);
@@ -0,0 +1,3 @@
+-- WebP thumbnail and mid-resolution copies of the receipt image, set in the background after upload
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS thumbnail_url VARCHAR;
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS medium_url VARCHAR;
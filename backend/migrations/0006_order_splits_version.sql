@@ -0,0 +1,2 @@
+-- Optimistic concurrency for split editing (PATCH /api/splits/order/{id})
+ALTER TABLE orders ADD COLUMN IF NOT EXISTS splits_version INTEGER NOT NULL DEFAULT 0;
@@ -0,0 +1,5 @@
+-- Scheduled reminder sweeps (services/reminder_service.py) page through unpaid splits by (user_id, id).
+-- Indexing that order lets each page start where the last one stopped and stop at its LIMIT.
+-- The index only covers paid_status = false, so older rows with a NULL status are normalised first.
+UPDATE splits SET paid_status = false WHERE paid_status IS NULL;
+CREATE INDEX IF NOT EXISTS ix_splits_unpaid_keyset ON splits (user_id, id) WHERE paid_status = false;
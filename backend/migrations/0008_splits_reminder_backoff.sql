@@ -0,0 +1,3 @@
+-- Failed reminder sends back off instead of being retried every sweep
+ALTER TABLE splits ADD COLUMN IF NOT EXISTS reminder_failures INTEGER NOT NULL DEFAULT 0;
+ALTER TABLE splits ADD COLUMN IF NOT EXISTS reminder_retry_at TIMESTAMP;
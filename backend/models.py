@@ -1,5 +1,6 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, ARRAY
-from sqlalchemy.orm import relationship
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Boolean, ARRAY, Index, Computed, LargeBinary, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
 from database import Base
 
@@ -28,22 +29,34 @@ class Order(Base):
     delivery_fee = Column(Float)
     tip = Column(Float)
     discount = Column(Float, default=0)
-    date = Column(DateTime, default=datetime.utcnow)
+    date = Column(DateTime, default=datetime.utcnow, index=True)
     paid_by_user_id = Column(Integer, ForeignKey("users.id"))
     image_url = Column(String)
+    thumbnail_url = Column(String)  # WebP derivatives of image_url, filled in after the order is saved
+    medium_url = Column(String)
     ocr_raw_text = Column(String)
-    parsed_data = Column(String)  # JSON string
+    parsed_data = Column(JSONB)  # Receipt as parsed/confirmed: restaurant, totals and items
+    import_key = Column(String, unique=True, index=True)  # Set for imported orders so re-imports are skipped
+    # Bumped whenever the order's split assignments change; editors send it back to detect conflicting edits
+    splits_version = Column(Integer, nullable=False, default=0, server_default="0")
+    # Full-text index over the OCR output, maintained by Postgres
+    ocr_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('simple', coalesce(ocr_raw_text, ''))", persisted=True)))
     
     # Relationships
     payer = relationship("User", back_populates="orders_paid")
     items = relationship("Item", back_populates="order", cascade="all, delete-orphan")
     splits = relationship("Split", back_populates="order", cascade="all, delete-orphan")
 
+    # Trigram indexes on restaurant/item names need pg_trgm and are created in migrations/
+    __table_args__ = (
+        Index("ix_orders_ocr_tsv", "ocr_tsv", postgresql_using="gin"),
+    )
+
 class Item(Base):
     __tablename__ = "items"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     name = Column(String, nullable=False)
     price = Column(Float, nullable=False)
     quantity = Column(Integer, default=1)
@@ -55,15 +68,94 @@ class Split(Base):
     __tablename__ = "splits"
     
     id = Column(Integer, primary_key=True, index=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    item_ids = Column(ARRAY(Integer))
+    item_ids = Column(ARRAY(Integer))  # Mirrors split_items for API responses
     amount_owed = Column(Float, nullable=False)
     paid_status = Column(Boolean, default=False)
     reminder_sent = Column(Boolean, default=False)
     reminder_sent_at = Column(DateTime, nullable=True)
     message_sid = Column(String, nullable=True)
+    reminder_payload = Column(JSONB, nullable=True)  # {"restaurant": ..., "items": [names]}, set at creation
+    # Failed scheduled reminders in a row, and when the sweep may try again
+    reminder_failures = Column(Integer, nullable=False, default=0, server_default="0")
+    reminder_retry_at = Column(DateTime, nullable=True)
     
     # Relationships
     order = relationship("Order", back_populates="splits")
     user = relationship("User", back_populates="splits")
+    split_items = relationship("SplitItem", back_populates="split", cascade="all, delete-orphan",
+                               passive_deletes=True)
+
+    # Scheduled reminder sweeps page through unpaid splits in (user_id, id) order
+    __table_args__ = (
+        Index("ix_splits_unpaid_keyset", "user_id", "id", postgresql_where=text("paid_status = false")),
+    )
+
+class SplitItem(Base):
+    __tablename__ = "split_items"
+    
+    split_id = Column(Integer, ForeignKey("splits.id", ondelete="CASCADE"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id", ondelete="CASCADE"), primary_key=True, index=True)
+    share = Column(Float, nullable=False, default=1)  # Fraction of the item this split's user pays for
+    
+    # Relationships
+    split = relationship("Split", back_populates="split_items")
+    item = relationship("Item")
+
+# Outstanding amount a debtor owes a creditor (the payer), summed over unpaid splits.
+# One row per direction, kept up to date by services.balance_service.
+class Balance(Base):
+    __tablename__ = "balances"
+
+    debtor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    creditor_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    amount = Column(Float, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_balances_creditor_id", "creditor_id"),
+    )
+
+# Responses to requests sent with an Idempotency-Key header, see services.idempotency_service.
+# A row is "in_progress" while its first request runs and "completed" once the response is stored.
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String, primary_key=True)
+    method = Column(String, nullable=False)
+    path = Column(String, nullable=False)
+    fingerprint = Column(String, nullable=False)  # Hash of the request, so a reused key with another body is refused
+    status = Column(String, nullable=False, default="in_progress")
+    owner = Column(String, nullable=False)  # Token of the request holding the key while in progress
+    locked_until = Column(DateTime)  # An in-progress key past this is assumed abandoned
+    response_status = Column(Integer)
+    response_headers = Column(JSONB)
+    response_body = Column(LargeBinary)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    expires_at = Column(DateTime, nullable=False, index=True)
+
+# Receipt uploads processed in the background (POST /api/receipt-jobs), see services.receipt_job_service.
+# status: queued -> running -> succeeded | failed. The image is kept until the job finishes
+# so a restarted worker can pick it up again.
+class ReceiptJob(Base):
+    __tablename__ = "receipt_jobs"
+
+    id = Column(String, primary_key=True)
+    status = Column(String, nullable=False, default="queued")
+    filename = Column(String)
+    content_type = Column(String)
+    image_data = deferred(Column(LargeBinary))
+    callback_url = Column(String)
+    attempts = Column(Integer, nullable=False, default=0)
+    locked_until = Column(DateTime)  # Lease of the worker running it; expired leases are picked up again
+    result = Column(JSONB)  # Same shape as the upload-receipt response
+    error = Column(String)
+    callback_status = Column(String)  # "delivered" or the last delivery error
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+
+    __table_args__ = (
+        Index("ix_receipt_jobs_queue", "status", "created_at"),
+    )
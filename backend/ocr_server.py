@@ -0,0 +1,202 @@
+"""
+OCR inference service.
+
+Loads the OCR models once and serves every API worker over HTTP, so adding
+uvicorn workers to the API doesn't multiply the ~2GB of Surya predictors
+or their load time. Run it with a single worker next to the API:
+
+    uv run uvicorn ocr_server:app --port 8001 --workers 1
+
+and set OCR_SERVICE_URL=http://localhost:8001 for the API.
+
+POST /ocr takes the raw image bytes and returns the same result as
+ocr_service.process_receipt_bytes. With OCR_ENGINE=surya, images that arrive
+from any API worker within OCR_BATCH_WAIT_MS of each other are recognised in
+one predictor call (up to OCR_BATCH_SIZE). Docling, RapidOCR and tiered mode
+run one image at a time; GLM-OCR requests go straight through to Ollama.
+"""
+import asyncio
+import io
+import os
+import time
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+load_dotenv()
+
+from services import ocr_service  # noqa: E402  (reads OCR_ENGINE at import)
+from services.deadline_service import request_metrics, run_cancellable  # noqa: E402
+
+OCR_BATCH_SIZE = int(os.getenv("OCR_BATCH_SIZE", "4"))
+OCR_BATCH_WAIT_MS = float(os.getenv("OCR_BATCH_WAIT_MS", "25"))
+# Images waiting or running before new ones are refused with 503 (the client retries)
+OCR_MAX_QUEUE = int(os.getenv("OCR_MAX_QUEUE", "32"))
+# Load the models at startup instead of on the first image
+OCR_PRELOAD = os.getenv("OCR_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+
+class OCRBatcher:
+    """Queues images from all callers and runs Surya on them in batches"""
+
+    def __init__(self, batch_size: int = OCR_BATCH_SIZE, batch_wait_ms: float = OCR_BATCH_WAIT_MS,
+                 max_queue: int = OCR_MAX_QUEUE):
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000
+        self.max_queue = max_queue
+        self.pending = 0
+        self.stats = {"images": 0, "batches": 0, "errors": 0, "rejected": 0, "batched_images": 0,
+                      "cancelled_queued": 0, "wasted": 0, "busy_seconds": 0.0}
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task = None
+
+    @property
+    def batching(self) -> bool:
+        return ocr_service.OCR_ENGINE == "surya" and ocr_service.SURYA_AVAILABLE
+
+    def start(self):
+        if self.batching:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    async def submit(self, contents: bytes) -> dict:
+        if self.pending >= self.max_queue:
+            self.stats["rejected"] += 1
+            raise HTTPException(status_code=503, detail="OCR queue is full", headers={"Retry-After": "1"})
+        self.pending += 1
+        started = time.perf_counter()
+        try:
+            if not self.batching:
+                result = await ocr_service.process_receipt_bytes(contents)
+                self._record(1, time.perf_counter() - started)
+            else:
+                future = asyncio.get_running_loop().create_future()
+                await self._queue.put((contents, future))
+                result = await future
+        finally:
+            self.pending -= 1
+        self.stats["images"] += 1
+        if result.get("error"):
+            self.stats["errors"] += 1
+        return result
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.batch_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Callers that went away while queued
+            waiting = [(contents, future) for contents, future in batch if not future.done()]
+            self.stats["cancelled_queued"] += len(batch) - len(waiting)
+            batch = waiting
+            if batch:
+                await self._run_batch(batch)
+
+    async def _run_batch(self, batch: list):
+        images, waiting = [], []
+        for contents, future in batch:
+            try:
+                images.append(Image.open(io.BytesIO(contents)))
+                waiting.append(future)
+            except Exception as e:
+                future.set_result(ocr_service.get_error_result(f"Unreadable image: {e}"))
+        if not images:
+            return
+
+        started = time.perf_counter()
+        try:
+            results = await run_in_threadpool(ocr_service.ocr_images_with_surya, images)
+        except Exception as e:
+            print(f"❌ OCR batch of {len(images)} failed: {e}")
+            results = [ocr_service.get_error_result(str(e))] * len(images)
+        self._record(len(images), time.perf_counter() - started)
+
+        for future, result in zip(waiting, results):
+            if future.done():
+                self.stats["wasted"] += 1
+            else:
+                future.set_result(result)
+
+    def _record(self, images: int, elapsed: float):
+        self.stats["batches"] += 1
+        self.stats["batched_images"] += images
+        self.stats["busy_seconds"] += elapsed
+
+    def metrics(self) -> dict:
+        batches = self.stats["batches"]
+        return {
+            "engine": ocr_service.OCR_ENGINE,
+            "batching": self.batching,
+            "batch_size": self.batch_size,
+            "pending": self.pending,
+            **self.stats,
+            "busy_seconds": round(self.stats["busy_seconds"], 2),
+            "avg_batch_size": round(self.stats["batched_images"] / batches, 2) if batches else 0.0,
+        }
+
+
+def preload_models():
+    with ocr_service._model_lock:
+        if ocr_service.OCR_ENGINE == "surya":
+            ocr_service.initialize_surya_models()
+        elif ocr_service.OCR_ENGINE == "docling":
+            ocr_service.initialize_docling_converter()
+        elif ocr_service.OCR_ENGINE == "rapidocr":
+            ocr_service.initialize_rapidocr()
+        elif ocr_service.OCR_ENGINE == "tiered":
+            # The first tier serves most receipts; later ones load when first needed
+            if ocr_service.OCR_TIERS and ocr_service.OCR_TIERS[0] == "rapidocr":
+                ocr_service.initialize_rapidocr()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    print(f"🔍 OCR service starting (engine: {ocr_service.OCR_ENGINE})")
+    # From the main thread, before the threadpool and torch start theirs, so they inherit it
+    ocr_service.pin_to_cores()
+    if OCR_PRELOAD:
+        await run_in_threadpool(preload_models)
+    batcher.start()
+    yield
+    await batcher.stop()
+
+
+batcher = OCRBatcher()
+app = FastAPI(title="Bill Splitter OCR", version="1.0.0", lifespan=lifespan)
+
+
+@app.post("/ocr")
+async def ocr(request: Request):
+    """OCR the image in the request body"""
+    contents = await request.body()
+    if not contents:
+        raise HTTPException(status_code=400, detail="Empty image")
+    # Drops the image from the queue (or aborts GLM-OCR) if the API worker stops waiting
+    return await run_cancellable(request, batcher.submit(contents), "ocr",
+                                 ocr_service.OCR_SERVICE_TIMEOUT_SECONDS)
+
+
+@app.get("/health")
+def health_check():
+    return {"status": "healthy", **batcher.metrics(), "requests": request_metrics().get("ocr", {})}
+
+
+@app.get("/metrics")
+def metrics():
+    """Tiered OCR escalation rate and engine seconds per receipt"""
+    return ocr_service.ocr_metrics()
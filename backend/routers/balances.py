@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+from typing import List
+import models
+import schemas
+from database import get_db
+from services.balance_service import (
+    get_balance_summary,
+    get_pair_balance,
+    get_user_balances,
+    rebuild_balances,
+)
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.BalanceSummary])
+def list_balances(db: Session = Depends(get_db)):
+    """Total owed / owing per user, for every user with an open balance"""
+    return get_balance_summary(db)
+
+
+@router.get("/user/{user_id}", response_model=schemas.UserBalances)
+def get_balances_for_user(user_id: int, db: Session = Depends(get_db)):
+    """Who this user owes and who owes them"""
+    user = db.query(models.User).filter(models.User.id == user_id).first()
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return get_user_balances(db, user_id)
+
+
+@router.get("/{debtor_id}/{creditor_id}", response_model=schemas.PairBalance)
+def get_balance_between(debtor_id: int, creditor_id: int, db: Session = Depends(get_db)):
+    """How much debtor owes creditor, in both directions and netted"""
+    amount = get_pair_balance(db, debtor_id, creditor_id)
+    reverse_amount = get_pair_balance(db, creditor_id, debtor_id)
+    return {
+        "debtor_id": debtor_id,
+        "creditor_id": creditor_id,
+        "amount": amount,
+        "reverse_amount": reverse_amount,
+        "net": round(amount - reverse_amount, 2),
+    }
+
+
+@router.post("/rebuild", response_model=schemas.BalanceRebuildReport)
+def rebuild(apply: bool = False, db: Session = Depends(get_db)):
+    """Recompute balances from splits and report drift; apply=true replaces the ledger"""
+    return rebuild_balances(db, apply=apply)
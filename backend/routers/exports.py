@@ -0,0 +1,40 @@
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from typing import Literal, Optional
+from datetime import datetime
+from database import engine
+from services.export_service import EXPORTS, build_export, stream_export
+
+router = APIRouter()
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+}
+
+
+@router.get("/{kind}")
+def export(
+    kind: str,
+    format: Literal["csv", "ndjson"] = "csv",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    paid_by_user_id: Optional[int] = None,
+):
+    """
+    Stream every order, item or split (kind) as CSV or NDJSON.
+
+    Filters apply to the order: date in [start, end) and payer.
+    """
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail=f"Unknown export '{kind}' (choose from {', '.join(EXPORTS)})")
+    if start and end and start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+
+    stmt = build_export(kind, start=start, end=end, paid_by_user_id=paid_by_user_id)
+    filename = f"{kind}-{datetime.utcnow():%Y%m%dT%H%M%SZ}.{format}"
+    return StreamingResponse(
+        stream_export(engine, stmt, format),
+        media_type=MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -0,0 +1,42 @@
+import io
+from fastapi import APIRouter, Depends, File, HTTPException, UploadFile
+from sqlalchemy.orm import Session
+from typing import Literal, Optional
+import schemas
+from database import get_db
+from services.import_service import import_orders
+
+router = APIRouter()
+
+
+@router.post("/orders", response_model=schemas.ImportReport)
+def import_orders_file(
+    file: UploadFile = File(...),
+    format: Optional[Literal["csv", "ndjson"]] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Import historical orders, items and item assignments from CSV or NDJSON.
+
+    Safe to repeat: orders already imported (same order_ref or content) are skipped.
+    """
+    fmt = format
+    if fmt is None:
+        name = (file.filename or "").lower()
+        if name.endswith(".csv"):
+            fmt = "csv"
+        elif name.endswith((".ndjson", ".jsonl")):
+            fmt = "ndjson"
+        else:
+            raise HTTPException(status_code=400, detail="Pass format=csv or format=ndjson")
+
+    print(f"📥 Importing {file.filename} ({fmt})...")
+    stream = io.TextIOWrapper(file.file, encoding="utf-8", newline="")
+    try:
+        report = import_orders(db, stream, fmt)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 text")
+    finally:
+        stream.detach()
+    print(f"✅ Imported {report['orders_created']} orders ({report['error_count']} errors) in {report['seconds']}s")
+    return report
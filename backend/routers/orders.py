@@ -1,97 +1,277 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Request, UploadFile, File, Header
+from sqlalchemy import delete, insert
+from sqlalchemy.orm import Session, joinedload, selectinload
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
 import models
 import schemas
-from database import get_db
-from services.ocr_service import process_receipt_image
+from database import SessionLocal, get_db
+from services.ocr_service import process_receipt_contents
 from services.llm_service import parse_receipt_text
-from services.storage_service import upload_image
+from services.storage_service import (UPLOAD_PREFIX, create_presigned_upload, get_uploaded_object, object_url,
+                                      schedule_derivatives, upload_image)
+from services.balance_service import apply_balance_deltas, split_deltas
+from services.cache_service import cached_json_response, order_detail_key, order_key, response_cache
+from services.search_service import search_orders
+from services.deadline_service import run_cancellable
+from services.listing_service import json_response, order_rows
 
 router = APIRouter()
 
 @router.post("/upload-receipt")
-async def upload_receipt(file: UploadFile = File(...), db: Session = Depends(get_db)):
-    """Upload receipt image, perform OCR, and parse with LLM"""
+async def upload_receipt(request: Request, file: UploadFile = File(...)):
+    """
+    Upload receipt image, perform OCR, and parse with LLM. Abandoned (and the
+    OCR/LLM work cancelled) if the client disconnects or UPLOAD_DEADLINE_SECONDS passes.
+    """
+    return await run_cancellable(request, process_upload(file), "upload_receipt")
+
+
+async def process_upload(file: UploadFile) -> dict:
     try:
-        # Upload image to S3
+        contents = await file.read()
+        ocr_result, parsed_data = await ocr_and_parse(contents, file.content_type)
+
+        # Upload image to S3 last, so an abandoned request never stores it
         print("📤 Uploading image to S3...")
+        file.file.seek(0)  # Reset file pointer
         image_url = await upload_image(file)
         print(f"✅ Image uploaded: {image_url}")
-        
-        # Perform OCR
-        print("🔍 Running OCR on image...")
-        file.file.seek(0)  # Reset file pointer
-        ocr_result = await process_receipt_image(file)
-        print(f"✅ OCR completed. Extracted {len(ocr_result['raw_text'])} characters")
-        
-        # Parse with LLM
-        print("🤖 Sending OCR text to LLM for parsing...")
-        parsed_data = await parse_receipt_text(ocr_result["raw_text"])
-        print(f"✅ LLM parsing completed. Restaurant: {parsed_data.get('restaurant', 'N/A')}")
-        
-        return {
-            "image_url": image_url,
-            "ocr_raw_text": ocr_result["raw_text"],
-            "ocr_confidence": ocr_result.get("confidence", 0),
-            "ocr_engine": ocr_result.get("engine", "unknown"),
-            "ocr_annotated_image": ocr_result.get("annotated_image"),
-            "ocr_bboxes": ocr_result.get("bboxes", []),
-            "parsed_data": parsed_data
-        }
+
+        return receipt_response(image_url, ocr_result, parsed_data)
     except Exception as e:
         print(f"❌ Error processing receipt: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing receipt: {str(e)}")
 
+
+async def ocr_and_parse(contents: bytes, content_type: Optional[str]):
+    # Perform OCR
+    print("🔍 Running OCR on image...")
+    ocr_result = await process_receipt_contents(contents, content_type)
+    print(f"✅ OCR completed. Extracted {len(ocr_result['raw_text'])} characters")
+
+    # Parse with LLM
+    print("🤖 Sending OCR text to LLM for parsing...")
+    parsed_data = await parse_receipt_text(ocr_result["raw_text"])
+    print(f"✅ LLM parsing completed. Restaurant: {parsed_data.get('restaurant', 'N/A')}")
+    return ocr_result, parsed_data
+
+
+def receipt_response(image_url: str, ocr_result: dict, parsed_data: dict) -> dict:
+    return {
+        "image_url": image_url,
+        "ocr_raw_text": ocr_result["raw_text"],
+        "ocr_confidence": ocr_result.get("confidence", 0),
+        "ocr_engine": ocr_result.get("engine", "unknown"),
+        "ocr_annotated_image": ocr_result.get("annotated_image"),
+        "ocr_bboxes": ocr_result.get("bboxes", []),
+        "parsed_data": parsed_data
+    }
+
+
+@router.post("/upload-url", response_model=schemas.ReceiptUploadURL)
+def create_receipt_upload_url(body: schemas.ReceiptUploadRequest):
+    """
+    Presigned URLs for uploading a receipt image straight to S3, so the bytes
+    never pass through the API. Follow up with POST /process-receipt and the key.
+    """
+    if not body.content_type.startswith("image/"):
+        raise HTTPException(status_code=400, detail="content_type must be an image type")
+    return create_presigned_upload(body.filename, body.content_type)
+
+
+@router.post("/process-receipt")
+async def process_uploaded_receipt(request: Request, body: schemas.ProcessReceiptRequest):
+    """OCR and parse a receipt uploaded with /upload-url; same response as upload-receipt"""
+    if not body.key.startswith(UPLOAD_PREFIX) or ".." in body.key:
+        raise HTTPException(status_code=400, detail="Not an upload key")
+    return await run_cancellable(request, process_stored_receipt(body.key), "process_receipt")
+
+
+async def process_stored_receipt(key: str) -> dict:
+    try:
+        stored = await run_in_threadpool(get_uploaded_object, key)
+    except ValueError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if stored is None:
+        raise HTTPException(status_code=404, detail="Uploaded image not found")
+    contents, content_type = stored
+
+    try:
+        ocr_result, parsed_data = await ocr_and_parse(contents, content_type)
+        return receipt_response(object_url(key), ocr_result, parsed_data)
+    except Exception as e:
+        print(f"❌ Error processing receipt: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error processing receipt: {str(e)}")
+
+# Upper bound on orders per POST /bulk call
+MAX_BULK_ORDERS = 1000
+
+ORDER_FIELDS = ("restaurant", "total", "subtotal", "tax", "delivery_fee", "tip", "discount",
+                "paid_by_user_id", "image_url", "ocr_raw_text")
+
+
+def insert_orders(db: Session, orders_data: List[schemas.OrderCreateWithItems]) -> List[dict]:
+    """
+    Insert orders and their items with one multi-row INSERT ... RETURNING each.
+
+    Does not commit. Returns the created orders as dicts shaped like
+    schemas.Order, built from the input and the returned ids, so nothing
+    has to be re-read afterwards.
+    """
+    payer_ids = {o.paid_by_user_id for o in orders_data}
+    found = {uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(payer_ids))}
+    if payer_ids - found:
+        raise HTTPException(status_code=404, detail="Payer user not found")
+
+    order_values = []
+    for order_data in orders_data:
+        values = order_data.model_dump(include=set(ORDER_FIELDS))
+        # Keep what the client parsed; otherwise record the order as saved
+        values["parsed_data"] = order_data.parsed_data or order_data.model_dump(
+            include={"restaurant", "total", "subtotal", "tax", "delivery_fee", "tip", "discount", "items"}
+        )
+        order_values.append(values)
+
+    order_rows = db.execute(
+        insert(models.Order).returning(models.Order.id, models.Order.date, sort_by_parameter_order=True),
+        order_values,
+    ).all()
+
+    item_values = [
+        {"order_id": order_id, **item.model_dump()}
+        for (order_id, _), order_data in zip(order_rows, orders_data)
+        for item in order_data.items
+    ]
+    item_ids = []
+    if item_values:
+        item_ids = db.execute(
+            insert(models.Item).returning(models.Item.id, sort_by_parameter_order=True),
+            item_values,
+        ).scalars().all()
+
+    created = []
+    position = 0
+    for (order_id, date), values, order_data in zip(order_rows, order_values, orders_data):
+        end = position + len(order_data.items)
+        items = [{"id": item_id, **item} for item_id, item in zip(item_ids[position:end], item_values[position:end])]
+        created.append({**values, "id": order_id, "date": date, "items": items})
+        position = end
+    return created
+
+
+def record_derivatives(order_id: int, urls: dict):
+    """Store the derivative URLs (and the original's new location) on the order"""
+    with SessionLocal() as db:
+        db.query(models.Order).filter(models.Order.id == order_id).update(urls)
+        db.commit()
+    response_cache.invalidate_order(order_id)
+
+
+def schedule_order_derivatives(orders: List[dict]):
+    for order in orders:
+        schedule_derivatives(order.get("image_url"), lambda urls, order_id=order["id"]: record_derivatives(order_id, urls))
+
 @router.post("/", response_model=schemas.Order)
 def create_order(order_data: schemas.OrderCreateWithItems, db: Session = Depends(get_db)):
     """Create a new order with items"""
-    payer = db.query(models.User).filter(models.User.id == order_data.paid_by_user_id).first()
-    if not payer:
-        raise HTTPException(status_code=404, detail="Payer user not found")
-
-    db_order = models.Order(
-        restaurant=order_data.restaurant,
-        total=order_data.total,
-        subtotal=order_data.subtotal,
-        tax=order_data.tax,
-        delivery_fee=order_data.delivery_fee,
-        tip=order_data.tip,
-        discount=order_data.discount,
-        paid_by_user_id=order_data.paid_by_user_id,
-        image_url=order_data.image_url,
-        ocr_raw_text=order_data.ocr_raw_text,
-    )
-    db.add(db_order)
+    order = insert_orders(db, [order_data])[0]
     db.commit()
-    db.refresh(db_order)
+    response_cache.invalidate_order(order["id"])
+    schedule_order_derivatives([order])
+    return order
 
-    for item_data in order_data.items:
-        db_item = models.Item(order_id=db_order.id, **item_data.model_dump())
-        db.add(db_item)
+@router.post("/bulk", response_model=List[schemas.Order])
+def create_orders_bulk(data: schemas.OrderBulkCreate, db: Session = Depends(get_db)):
+    """Create many orders with their items in one transaction (all or nothing)"""
+    if not data.orders:
+        raise HTTPException(status_code=400, detail="No orders provided")
+    if len(data.orders) > MAX_BULK_ORDERS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_ORDERS} orders per request")
 
+    orders = insert_orders(db, data.orders)
     db.commit()
-    db.refresh(db_order)
-    return db_order
+    for order in orders:
+        response_cache.invalidate_order(order["id"])
+    schedule_order_derivatives(orders)
+    print(f"✅ Created {len(orders)} orders in bulk")
+    return orders
 
 @router.get("/", response_model=List[schemas.Order])
 def list_orders(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    orders = db.query(models.Order).offset(skip).limit(limit).all()
-    return orders
+    """Orders by id with their items, projected straight from SQL (see listing_service)"""
+    return json_response(order_rows(db, skip, limit))
+
+@router.get("/search", response_model=List[schemas.Order])
+def search(
+    restaurant: Optional[str] = None,
+    item: Optional[str] = None,
+    q: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    db: Session = Depends(get_db),
+):
+    """Search orders by restaurant name, item name and/or OCR text (all given filters must match)"""
+    if not (restaurant or item or q):
+        raise HTTPException(status_code=400, detail="Provide restaurant, item or q")
+    return search_orders(db, restaurant=restaurant, item=item, text=q, skip=skip, limit=limit)
 
 @router.get("/{order_id}", response_model=schemas.Order)
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if order is None:
-        raise HTTPException(status_code=404, detail="Order not found")
-    return order
+def get_order(order_id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    def build() -> bytes:
+        order = (
+            db.query(models.Order)
+            .options(selectinload(models.Order.items))
+            .filter(models.Order.id == order_id)
+            .first()
+        )
+        if order is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return schemas.Order.model_validate(order).model_dump_json().encode()
+
+    return cached_json_response(order_key(order_id), if_none_match, build)
+
+@router.get("/{order_id}/detail", response_model=schemas.OrderDetail)
+def get_order_detail(order_id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """
+    Order with its items, payer and splits (each with its user) in one response,
+    instead of fetching the order, its splits and every user separately.
+    Three queries whatever the number of splits: order + payer, items, splits + users.
+    """
+    def build() -> bytes:
+        order = (
+            db.query(models.Order)
+            .options(
+                joinedload(models.Order.payer),
+                selectinload(models.Order.items),
+                selectinload(models.Order.splits).joinedload(models.Split.user),
+            )
+            .filter(models.Order.id == order_id)
+            .first()
+        )
+        if order is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        return schemas.OrderDetail.model_validate(order).model_dump_json().encode()
+
+    return cached_json_response(order_detail_key(order_id), if_none_match, build)
 
 @router.delete("/{order_id}")
 def delete_order(order_id: int, db: Session = Depends(get_db)):
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+    # Locked so a concurrent bulk replace (which locks it too) can't add splits meanwhile
+    order = db.query(models.Order).filter(models.Order.id == order_id).with_for_update().first()
     if order is None:
         raise HTTPException(status_code=404, detail="Order not found")
     
+    # Reversed from the splits as they were deleted, not an earlier read that a
+    # concurrent mark-paid could have made stale
+    removed = db.execute(
+        delete(models.Split)
+        .where(models.Split.order_id == order_id)
+        .returning(models.Split.user_id, models.Split.amount_owed, models.Split.paid_status)
+        .execution_options(synchronize_session=False)
+    ).all()
+    apply_balance_deltas(db, split_deltas(removed, order.paid_by_user_id, sign=-1))
     db.delete(order)
     db.commit()
+    response_cache.invalidate_order(order_id)
     return {"message": "Order deleted successfully"}
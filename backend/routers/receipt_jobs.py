@@ -0,0 +1,98 @@
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from typing import Optional
+import asyncio
+import json
+import schemas
+from database import engine, get_db
+from services.receipt_job_service import TERMINAL_STATUSES, callback_url_error, create_job, get_job
+
+router = APIRouter()
+
+# SSE: how often a subscriber's job is re-read, and how often an idle stream sends a keep-alive
+EVENTS_POLL_SECONDS = 1.0
+EVENTS_KEEPALIVE_SECONDS = 15.0
+
+
+@router.post("/", status_code=202, response_model=schemas.ReceiptJobAccepted)
+async def create_receipt_job(
+    request: Request,
+    file: UploadFile = File(...),
+    callback_url: Optional[str] = Form(None),
+    db: Session = Depends(get_db),
+):
+    """Accept a receipt for background processing and return the job id right away"""
+    if callback_url:
+        # Resolves the host, so it runs off the event loop
+        error = await run_in_threadpool(callback_url_error, callback_url)
+        if error is not None:
+            raise HTTPException(status_code=400, detail=error)
+    contents = await file.read()
+    if not contents:
+        raise HTTPException(status_code=400, detail="Empty file")
+
+    job = create_job(db, contents, file.filename, file.content_type, callback_url)
+    print(f"📥 Queued receipt job {job.id} ({len(contents)} bytes)")
+    return {
+        "id": job.id,
+        "status": job.status,
+        "status_url": str(request.url_for("get_receipt_job", job_id=job.id)),
+        "events_url": str(request.url_for("receipt_job_events", job_id=job.id)),
+    }
+
+
+@router.get("/{job_id}", response_model=schemas.ReceiptJob)
+def get_receipt_job(job_id: str):
+    """Current state of a job; result is set once it has succeeded"""
+    job = get_job(engine, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Receipt job not found")
+    return job
+
+
+def _sse(event: str, job: dict) -> bytes:
+    data = schemas.ReceiptJob.model_validate(job).model_dump_json()
+    return f"event: {event}\ndata: {data}\n\n".encode()
+
+
+@router.get("/{job_id}/events")
+async def receipt_job_events(job_id: str, request: Request):
+    """
+    Server-sent events for a job: a "status" event whenever its status
+    changes, ending with "succeeded" or "failed" carrying the full job.
+    """
+    job = await run_in_threadpool(get_job, engine, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Receipt job not found")
+
+    async def events(job):
+        last_status = None
+        idle = 0.0
+        while True:
+            if job["status"] != last_status:
+                last_status = job["status"]
+                idle = 0.0
+                if last_status in TERMINAL_STATUSES:
+                    yield _sse(last_status, job)
+                    return
+                yield _sse("status", job)
+            elif idle >= EVENTS_KEEPALIVE_SECONDS:
+                idle = 0.0
+                yield b": keep-alive\n\n"
+
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+            idle += EVENTS_POLL_SECONDS
+            if await request.is_disconnected():
+                return
+            job = await run_in_threadpool(get_job, engine, job_id)
+            if job is None:
+                yield f"event: error\ndata: {json.dumps({'detail': 'Receipt job not found'})}\n\n".encode()
+                return
+
+    return StreamingResponse(
+        events(job),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
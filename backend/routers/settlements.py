@@ -0,0 +1,94 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from datetime import datetime
+import models
+import schemas
+from database import get_db
+from services.settlement_service import build_settlement_plan
+from services.sms_service import send_settlement_reminder
+from services.cache_service import response_cache
+
+router = APIRouter()
+
+
+@router.get("/plan", response_model=schemas.SettlementPlan)
+def get_settlement_plan(user_ids: Optional[List[int]] = Query(None), db: Session = Depends(get_db)):
+    """Net all unpaid splits within a group of users into a minimal set of transfers"""
+    return build_settlement_plan(db, user_ids)
+
+
+@router.post("/send-reminders")
+async def send_settlement_reminders(request: schemas.SettlementRequest, db: Session = Depends(get_db)):
+    """Send one consolidated reminder per debtor instead of one per split"""
+    plan = build_settlement_plan(db, request.user_ids)
+    if not plan["transfers"]:
+        return {
+            "message": "Nothing to settle",
+            "plan": plan,
+            "results": []
+        }
+
+    # Group transfers by debtor so each person gets a single message
+    payments_by_debtor: dict[int, list[dict]] = {}
+    for transfer in plan["transfers"]:
+        payments_by_debtor.setdefault(transfer["from_user_id"], []).append(transfer)
+
+    involved = set(payments_by_debtor) | {t["to_user_id"] for t in plan["transfers"]}
+    users = {u.id: u for u in db.query(models.User).filter(models.User.id.in_(involved)).all()}
+
+    results = []
+    touched_orders = set()
+    for debtor_id, transfers in payments_by_debtor.items():
+        debtor = users.get(debtor_id)
+        if not debtor:
+            continue
+
+        payments = [
+            {
+                "payee_name": t["to_name"],
+                "amount": t["amount"],
+                "payment_method": users[t["to_user_id"]].payment_handle if t["to_user_id"] in users else None,
+            }
+            for t in transfers
+        ]
+        result = await send_settlement_reminder(
+            recipient_name=debtor.name,
+            recipient_phone=debtor.whatsapp_number if debtor.whatsapp_number else debtor.phone,
+            payments=payments
+        )
+        result["user_id"] = debtor_id
+
+        if result["status"] == "sent":
+            # The message covers the debtor's unpaid splits on orders paid by someone else in the group
+            group_orders = select(models.Order.id).where(models.Order.paid_by_user_id != debtor_id)
+            if request.user_ids is not None:
+                group_orders = group_orders.where(models.Order.paid_by_user_id.in_(request.user_ids))
+            touched = db.execute(
+                update(models.Split)
+                .where(
+                    models.Split.user_id == debtor_id,
+                    models.Split.paid_status.is_not(True),
+                    models.Split.order_id.in_(group_orders),
+                )
+                .values(
+                    reminder_sent=True,
+                    reminder_sent_at=datetime.utcnow(),
+                    message_sid=result.get("message_sid"),
+                )
+                .returning(models.Split.order_id)
+                .execution_options(synchronize_session=False)
+            ).scalars().all()
+            touched_orders.update(touched)
+        results.append(result)
+
+    db.commit()
+    for order_id in touched_orders:
+        response_cache.invalidate_order(order_id, splits_only=True)
+
+    return {
+        "message": f"Sent {len(results)} consolidated reminders",
+        "plan": plan,
+        "results": results
+    }
@@ -1,101 +1,246 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Header, Response
+from sqlalchemy import ARRAY, Integer, String, any_, bindparam, delete, text, update
+from sqlalchemy.orm import Session, aliased, selectinload
+from collections import defaultdict
+from typing import Dict, List, Optional
 from datetime import datetime
 import models
 import schemas
 from database import get_db
 from services.sms_service import send_payment_reminder, send_bulk_reminders
+from services.balance_service import apply_balance_deltas, split_deltas
+from services.cache_service import cached_json_response, order_splits_key, response_cache
+from services.listing_service import dumps, split_rows
 
 router = APIRouter()
 
+Payer = aliased(models.User)
+
+
+def _reminder_rows(db: Session, *criteria) -> list:
+    """(split, user, order, payer) rows for building reminders, in one query"""
+    return (
+        db.query(models.Split, models.User, models.Order, Payer)
+        .join(models.User, models.User.id == models.Split.user_id)
+        .join(models.Order, models.Order.id == models.Split.order_id)
+        .join(Payer, Payer.id == models.Order.paid_by_user_id)
+        .filter(*criteria)
+        .order_by(models.Split.id)
+        .all()
+    )
+
+
+def _reminder_for(db: Session, split: models.Split, user: models.User, order: models.Order, payer: models.User) -> dict:
+    """Build the send_payment_reminder arguments for a split"""
+    payload = split.reminder_payload or {}
+    item_names = payload.get("items")
+    if item_names is None:
+        # Split written without a payload (e.g. bulk-loaded); fall back to the association table
+        item_names = [
+            name for (name,) in db.query(models.Item.name)
+            .join(models.SplitItem, models.SplitItem.item_id == models.Item.id)
+            .filter(models.SplitItem.split_id == split.id)
+            .order_by(models.Item.id)
+        ]
+    
+    return {
+        # Prefer whatsapp_number, fallback to phone
+        "recipient_name": user.name,
+        "recipient_phone": user.whatsapp_number if user.whatsapp_number else user.phone,
+        "payer_name": payer.name,
+        "restaurant": payload.get("restaurant", order.restaurant),
+        "amount": split.amount_owed,
+        "items": item_names,
+        "payment_method": payer.payment_handle if payer.payment_handle else "Cliq"
+    }
+
 
 @router.post("/", response_model=schemas.Split)
-def create_split(split: schemas.SplitCreate, db: Session = Depends(get_db)):
-    """Create a new split for an order"""
-    # Verify order exists
+def create_split(split: schemas.SplitCreate, response: Response, db: Session = Depends(get_db)):
+    """Create a new split for an order; 409 if the user already has one on it"""
+    # Raises 404 for a missing order, and holds the order lock until commit
+    version = _bump_splits_version(db, split.order_id, None)
+    response.headers["Splits-Version"] = str(version)
     order = db.query(models.Order).filter(models.Order.id == split.order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
     
     # Verify user exists
     user = db.query(models.User).filter(models.User.id == split.user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
+    # One split per user and order; the PATCH and balance ledger assume it
+    exists = db.query(models.Split.id).filter(
+        models.Split.order_id == split.order_id,
+        models.Split.user_id == split.user_id,
+    ).first()
+    if exists:
+        raise HTTPException(status_code=409, detail="User already has a split on this order")
+    
+    # Only keep item ids that belong to this order
+    items = db.query(models.Item).filter(
+        models.Item.order_id == split.order_id,
+        models.Item.id.in_(split.item_ids),
+    ).order_by(models.Item.id).all()
+    
     # Create split
-    db_split = models.Split(**split.model_dump())
+    db_split = models.Split(
+        **split.model_dump(exclude={"item_ids"}),
+        item_ids=[item.id for item in items],
+        reminder_payload={"restaurant": order.restaurant, "items": [item.name for item in items]},
+        split_items=[models.SplitItem(item_id=item.id, share=1.0) for item in items],
+    )
     db.add(db_split)
+    apply_balance_deltas(db, split_deltas([db_split], order.paid_by_user_id))
     db.commit()
     db.refresh(db_split)
+    response_cache.invalidate_order(db_split.order_id, splits_only=True)
     return db_split
 
 
 @router.get("/order/{order_id}", response_model=List[schemas.Split])
-def get_order_splits(order_id: int, db: Session = Depends(get_db)):
+def get_order_splits(order_id: int, if_none_match: Optional[str] = Header(None), db: Session = Depends(get_db)):
     """Get all splits for a specific order"""
-    splits = db.query(models.Split).filter(models.Split.order_id == order_id).all()
-    return splits
+    def build() -> bytes:
+        return dumps(split_rows(db, order_id))
+
+    return cached_json_response(order_splits_key(order_id), if_none_match, build)
+
+
+def _ids_any(column, ids: List[int]):
+    """column = ANY(:ids) with the whole list bound as one array parameter"""
+    return column == any_(bindparam(f"{column.key}_list", value=list(ids), type_=ARRAY(Integer)))
+
+
+def _record_reminders_sent(db: Session, sent: List[tuple]):
+    """Mark splits as reminded, each with its own message sid, in one UPDATE"""
+    if not sent:
+        return
+    split_ids, message_sids = zip(*sent)
+    db.execute(
+        text("""
+            UPDATE splits
+            SET reminder_sent = true, reminder_sent_at = :sent_at, message_sid = v.message_sid
+            FROM unnest(:split_ids, :message_sids) AS v(id, message_sid)
+            WHERE splits.id = v.id
+        """).bindparams(
+            bindparam("split_ids", type_=ARRAY(Integer)),
+            bindparam("message_sids", type_=ARRAY(String)),
+        ),
+        {"sent_at": datetime.utcnow(), "split_ids": list(split_ids), "message_sids": list(message_sids)},
+    )
+
+
+def _set_paid(db: Session, paid: bool, *criteria) -> list:
+    """
+    Set paid_status on the matching splits in a single UPDATE and move the
+    balance ledger for the rows that changed. Rows already in that state are
+    left out, so of two concurrent calls only one sees (and counts) each row.
+    """
+    changed = db.execute(
+        update(models.Split)
+        .where(models.Split.order_id == models.Order.id, *criteria)
+        # Only rows that actually change, so repeating the call is a no-op
+        .where(models.Split.paid_status.is_distinct_from(paid))
+        .values(paid_status=paid)
+        .returning(
+            models.Split.id,
+            models.Split.order_id,
+            models.Split.user_id,
+            models.Split.amount_owed,
+            models.Order.paid_by_user_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).all()
+
+    # Keep the balance ledger in step: paying removes debt, un-paying restores it
+    sign = -1 if paid else 1
+    deltas: dict = {}
+    for row in changed:
+        if row.paid_by_user_id is None or row.user_id == row.paid_by_user_id:
+            continue
+        key = (row.user_id, row.paid_by_user_id)
+        deltas[key] = deltas.get(key, 0.0) + sign * row.amount_owed
+    apply_balance_deltas(db, deltas)
+    return changed
+
+
+@router.put("/bulk/paid", response_model=schemas.BulkUpdateResult)
+def bulk_mark_paid(data: schemas.BulkPaidUpdate, db: Session = Depends(get_db)):
+    """Mark many splits paid or unpaid by id list and/or order/user filter in a single UPDATE"""
+    if data.split_ids is None and data.order_id is None and data.user_id is None:
+        raise HTTPException(status_code=400, detail="Provide split_ids, order_id or user_id")
+
+    criteria = []
+    if data.split_ids is not None:
+        criteria.append(_ids_any(models.Split.id, data.split_ids))
+    if data.order_id is not None:
+        criteria.append(models.Split.order_id == data.order_id)
+    if data.user_id is not None:
+        criteria.append(models.Split.user_id == data.user_id)
+
+    changed = _set_paid(db, data.paid, *criteria)
+    db.commit()
+
+    for order_id in {row.order_id for row in changed}:
+        response_cache.invalidate_order(order_id, splits_only=True)
+    return {"updated": len(changed), "split_ids": sorted(row.id for row in changed)}
+
+
+@router.put("/bulk/reminder-status", response_model=schemas.BulkUpdateResult)
+def bulk_update_reminder_status(data: schemas.BulkReminderStatusUpdate, db: Session = Depends(get_db)):
+    """Set or clear reminder status on many splits in a single UPDATE"""
+    if data.reminder_sent:
+        values = {"reminder_sent": True, "reminder_sent_at": datetime.utcnow(), "message_sid": data.message_sid}
+        changed_filter = (
+            models.Split.reminder_sent.is_distinct_from(True)
+            | models.Split.message_sid.is_distinct_from(data.message_sid)
+        )
+    else:
+        values = {"reminder_sent": False, "reminder_sent_at": None, "message_sid": None}
+        changed_filter = models.Split.reminder_sent.is_distinct_from(False)
+
+    changed = db.execute(
+        update(models.Split)
+        .where(_ids_any(models.Split.id, data.split_ids), changed_filter)
+        .values(**values)
+        .returning(models.Split.id, models.Split.order_id)
+        .execution_options(synchronize_session=False)
+    ).all()
+    db.commit()
+
+    for order_id in {row.order_id for row in changed}:
+        response_cache.invalidate_order(order_id, splits_only=True)
+    return {"updated": len(changed), "split_ids": sorted(row.id for row in changed)}
 
 
 @router.put("/{split_id}/paid", response_model=schemas.Split)
 def mark_split_paid(split_id: int, paid: bool, db: Session = Depends(get_db)):
     """Mark a split as paid or unpaid"""
+    # Flipped with a conditional UPDATE, so concurrent calls can't both move the ledger
+    changed = _set_paid(db, paid, models.Split.id == split_id)
+    db.commit()
+
     split = db.query(models.Split).filter(models.Split.id == split_id).first()
     if not split:
         raise HTTPException(status_code=404, detail="Split not found")
-    
-    split.paid_status = paid
-    db.commit()
-    db.refresh(split)
+    if changed:
+        response_cache.invalidate_order(split.order_id, splits_only=True)
     return split
 
 
 @router.post("/{split_id}/send-reminder")
 async def send_reminder_for_split(split_id: int, db: Session = Depends(get_db)):
     """Send a payment reminder SMS for a specific split"""
-    # Get split with related data
-    split = db.query(models.Split).filter(models.Split.id == split_id).first()
-    if not split:
-        raise HTTPException(status_code=404, detail="Split not found")
-    
-    # Get user
-    user = db.query(models.User).filter(models.User.id == split.user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="User not found")
-    
-    # Get order
-    order = db.query(models.Order).filter(models.Order.id == split.order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Get payer
-    payer = db.query(models.User).filter(models.User.id == order.paid_by_user_id).first()
-    if not payer:
-        raise HTTPException(status_code=404, detail="Payer not found")
-    
-    # Get items for this split
-    items = db.query(models.Item).filter(
-        models.Item.id.in_(split.item_ids if split.item_ids else [])
-    ).all()
-    item_names = [item.name for item in items]
-    
-    # Determine phone number (prefer whatsapp_number, fallback to phone)
-    recipient_phone = user.whatsapp_number if user.whatsapp_number else user.phone
-    
-    # Determine payment method
-    payment_method = payer.payment_handle if payer.payment_handle else "Cliq"
+    # Get split with its user, order and payer
+    rows = _reminder_rows(db, models.Split.id == split_id)
+    if not rows:
+        if not db.query(models.Split.id).filter(models.Split.id == split_id).first():
+            raise HTTPException(status_code=404, detail="Split not found")
+        raise HTTPException(status_code=404, detail="User, order or payer not found")
+    split, user, order, payer = rows[0]
     
     # Send reminder
-    result = await send_payment_reminder(
-        recipient_name=user.name,
-        recipient_phone=recipient_phone,
-        payer_name=payer.name,
-        restaurant=order.restaurant,
-        amount=split.amount_owed,
-        items=item_names,
-        payment_method=payment_method
-    )
+    result = await send_payment_reminder(**_reminder_for(db, split, user, order, payer))
     
     # Update split with reminder status
     if result["status"] == "sent":
@@ -104,6 +249,7 @@ async def send_reminder_for_split(split_id: int, db: Session = Depends(get_db)):
         split.message_sid = result.get("message_sid")
         db.commit()
         db.refresh(split)
+        response_cache.invalidate_order(split.order_id, splits_only=True)
     
     return {
         "split_id": split_id,
@@ -115,58 +261,25 @@ async def send_reminder_for_split(split_id: int, db: Session = Depends(get_db)):
 @router.post("/order/{order_id}/send-all-reminders")
 async def send_all_reminders_for_order(order_id: int, db: Session = Depends(get_db)):
     """Send payment reminders to all users in an order"""
-    # Get order
-    order = db.query(models.Order).filter(models.Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-    
-    # Get payer
-    payer = db.query(models.User).filter(models.User.id == order.paid_by_user_id).first()
-    if not payer:
-        raise HTTPException(status_code=404, detail="Payer not found")
-    
-    # Get all splits for this order
-    splits = db.query(models.Split).filter(models.Split.order_id == order_id).all()
-    if not splits:
+    # Get all splits for this order with their users, the order and the payer
+    rows = _reminder_rows(db, models.Split.order_id == order_id)
+    if not rows:
+        order = db.query(models.Order).filter(models.Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if not db.query(models.User.id).filter(models.User.id == order.paid_by_user_id).first():
+            raise HTTPException(status_code=404, detail="Payer not found")
         raise HTTPException(status_code=404, detail="No splits found for this order")
     
-    # Prepare reminders
+    # Prepare reminders, skipping splits that are already paid
     reminders = []
-    split_map = {}
+    reminder_split_ids = []
     
-    for split in splits:
-        # Skip if already paid
+    for split, user, order, payer in rows:
         if split.paid_status:
             continue
-        
-        # Get user
-        user = db.query(models.User).filter(models.User.id == split.user_id).first()
-        if not user:
-            continue
-        
-        # Get items for this split
-        items = db.query(models.Item).filter(
-            models.Item.id.in_(split.item_ids if split.item_ids else [])
-        ).all()
-        item_names = [item.name for item in items]
-        
-        # Determine phone number
-        recipient_phone = user.whatsapp_number if user.whatsapp_number else user.phone
-        
-        # Determine payment method
-        payment_method = payer.payment_handle if payer.payment_handle else "Cliq"
-        
-        reminder = {
-            "recipient_name": user.name,
-            "recipient_phone": recipient_phone,
-            "payer_name": payer.name,
-            "restaurant": order.restaurant,
-            "amount": split.amount_owed,
-            "items": item_names,
-            "payment_method": payment_method
-        }
-        reminders.append(reminder)
-        split_map[recipient_phone] = split
+        reminders.append(_reminder_for(db, split, user, order, payer))
+        reminder_split_ids.append(split.id)
     
     if not reminders:
         return {
@@ -177,16 +290,15 @@ async def send_all_reminders_for_order(order_id: int, db: Session = Depends(get_
     # Send all reminders
     results = await send_bulk_reminders(reminders)
     
-    # Update splits with reminder status
-    for result in results:
-        if result["status"] == "sent":
-            split = split_map.get(result["recipient"])
-            if split:
-                split.reminder_sent = True
-                split.reminder_sent_at = datetime.utcnow()
-                split.message_sid = result.get("message_sid")
-    
+    # Update splits with reminder status (results come back in the same order as reminders)
+    sent = [
+        (split_id, result.get("message_sid"))
+        for split_id, result in zip(reminder_split_ids, results)
+        if result["status"] == "sent"
+    ]
+    _record_reminders_sent(db, sent)
     db.commit()
+    response_cache.invalidate_order(order_id, splits_only=True)
     
     return {
         "message": f"Sent {len(results)} reminders",
@@ -194,71 +306,281 @@ async def send_all_reminders_for_order(order_id: int, db: Session = Depends(get_
     }
 
 
+def _bump_splits_version(db: Session, order_id: int, expected: Optional[int]) -> int:
+    """
+    Increment the order's splits_version and return it, or raise 409 if it no
+    longer matches expected. The row stays locked until commit, so concurrent
+    edits of one order's splits run one at a time.
+    """
+    stmt = (
+        update(models.Order)
+        .where(models.Order.id == order_id)
+        .values(splits_version=models.Order.splits_version + 1)
+        .returning(models.Order.splits_version)
+    )
+    if expected is not None:
+        stmt = stmt.where(models.Order.splits_version == expected)
+    version = db.execute(stmt).scalar()
+    if version is None:
+        current = db.query(models.Order.splits_version).filter(models.Order.id == order_id).scalar()
+        if current is None:
+            raise HTTPException(status_code=404, detail="Order not found")
+        raise HTTPException(
+            status_code=409,
+            detail=f"Splits were changed by someone else (version {current}, not {expected}); reload and retry",
+        )
+    return version
+
+
+def _split_amounts(order: models.Order, item_map: dict, user_item_shares: Dict[int, Dict[int, float]]) -> Dict[int, float]:
+    """Each user's amount owed: their share of the items plus the same fraction of tax, delivery, tip and discount"""
+    user_subtotals = {
+        uid: sum(item_map[i].price * item_map[i].quantity * share for i, share in shares.items())
+        for uid, shares in user_item_shares.items()
+        if shares
+    }
+    total_subtotal = sum(user_subtotals.values())
+    fees = (order.tax or 0) + (order.delivery_fee or 0) + (order.tip or 0) - (order.discount or 0)
+    return {
+        uid: round(subtotal + (fees * (subtotal / total_subtotal) if total_subtotal > 0 else 0), 2)
+        for uid, subtotal in user_subtotals.items()
+    }
+
+
 @router.post("/bulk", response_model=List[schemas.Split])
-def create_bulk_splits(data: schemas.BulkSplitCreate, db: Session = Depends(get_db)):
-    """Create splits for all users based on item assignments. Replaces any existing splits for the order."""
+def create_bulk_splits(data: schemas.BulkSplitCreate, response: Response, db: Session = Depends(get_db)):
+    """
+    Create splits for all users based on item assignments. Replaces any existing splits for the order.
+    With version set, fails with 409 if the splits changed since that version.
+    """
+    version = _bump_splits_version(db, data.order_id, data.version)
+    response.headers["Splits-Version"] = str(version)
     order = db.query(models.Order).filter(models.Order.id == data.order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
-
-    # Clear existing splits so this is idempotent (e.g. user goes back and re-assigns)
-    db.query(models.Split).filter(models.Split.order_id == data.order_id).delete()
-    db.commit()
 
     items = db.query(models.Item).filter(models.Item.order_id == data.order_id).all()
     item_map = {item.id: item for item in items}
 
-    # Accumulate each user's item subtotal and which item ids they're assigned
-    user_subtotals: dict[int, float] = {}
-    user_item_ids: dict[int, list[int]] = {}
+    # Each user's share of each assigned item
+    user_item_shares: dict[int, dict[int, float]] = {}
 
     for assignment in data.assignments:
         item = item_map.get(assignment.item_id)
         if not item or not assignment.user_ids:
             continue
-        per_user_cost = (item.price * item.quantity) / len(assignment.user_ids)
+        share = 1 / len(assignment.user_ids)
         for uid in assignment.user_ids:
-            user_subtotals.setdefault(uid, 0.0)
-            user_item_ids.setdefault(uid, [])
-            user_subtotals[uid] += per_user_cost
-            if assignment.item_id not in user_item_ids[uid]:
-                user_item_ids[uid].append(assignment.item_id)
+            shares = user_item_shares.setdefault(uid, {})
+            shares[assignment.item_id] = shares.get(assignment.item_id, 0.0) + share
+
+    found = {uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(user_item_shares))}
+    user_item_shares = {uid: shares for uid, shares in user_item_shares.items() if uid in found}
 
-    if not user_subtotals:
+    # Checked before anything is deleted, so a bad request leaves the existing splits alone
+    if not user_item_shares:
         raise HTTPException(status_code=400, detail="No valid assignments provided")
 
-    total_subtotal = sum(user_subtotals.values())
-    fees = (order.tax or 0) + (order.delivery_fee or 0) + (order.tip or 0) - (order.discount or 0)
+    # Clear existing splits so this is idempotent (e.g. user goes back and re-assigns).
+    # The ledger is reversed from the rows as they were deleted, so a concurrent
+    # mark-paid can't leave it reversing a stale paid status
+    removed = db.execute(
+        delete(models.Split)
+        .where(models.Split.order_id == data.order_id)
+        .returning(models.Split.user_id, models.Split.amount_owed, models.Split.paid_status)
+        .execution_options(synchronize_session=False)
+    ).all()
+    apply_balance_deltas(db, split_deltas(removed, order.paid_by_user_id, sign=-1))
+    # Flushed, not committed: the order row locked by the version bump stays locked until
+    # the new splits are in, so concurrent replaces of one order run one at a time
+    db.flush()
+
+    amounts = _split_amounts(order, item_map, user_item_shares)
 
     created: list[models.Split] = []
-    for uid, subtotal in user_subtotals.items():
-        user = db.query(models.User).filter(models.User.id == uid).first()
-        if not user:
-            continue
-        proportional_fees = fees * (subtotal / total_subtotal) if total_subtotal > 0 else 0
+    for uid, shares in user_item_shares.items():
         db_split = models.Split(
             order_id=data.order_id,
             user_id=uid,
-            item_ids=user_item_ids[uid],
-            amount_owed=round(subtotal + proportional_fees, 2),
+            item_ids=list(shares),
+            amount_owed=amounts[uid],
             paid_status=False,
+            reminder_payload={"restaurant": order.restaurant, "items": [item_map[i].name for i in shares]},
+            split_items=[models.SplitItem(item_id=i, share=share) for i, share in shares.items()],
         )
         db.add(db_split)
         created.append(db_split)
 
+    apply_balance_deltas(db, split_deltas(created, order.paid_by_user_id))
     db.commit()
     for s in created:
         db.refresh(s)
+    response_cache.invalidate_order(data.order_id, splits_only=True)
     return created
 
 
+def _current_shares(splits: List[models.Split]) -> Dict[int, Dict[int, float]]:
+    """user_id -> {item_id: share} from split_items; splits written without them share their items evenly"""
+    holders = defaultdict(int)
+    for split in splits:
+        if not split.split_items:
+            for item_id in split.item_ids or []:
+                holders[item_id] += 1
+    return {
+        split.user_id: (
+            {si.item_id: si.share for si in split.split_items}
+            if split.split_items
+            else {item_id: 1 / holders[item_id] for item_id in split.item_ids or []}
+        )
+        for split in splits
+    }
+
+
+def _add_deltas(total: dict, deltas: dict):
+    for key, amount in deltas.items():
+        total[key] += amount
+
+
+@router.patch("/order/{order_id}", response_model=schemas.SplitPatchResult)
+def patch_order_splits(order_id: int, data: schemas.SplitPatch, db: Session = Depends(get_db)):
+    """
+    Change who shares individual items without resending every assignment.
+
+    Only splits whose items or amount actually change are written; the rest
+    keep their rows, paid status and reminder state. A split whose amount
+    changes has its reminder state cleared, since a sent reminder quoted the old
+    amount, and goes back to unpaid if it was paid: what was paid no longer
+    matches what is owed. Fails with 409 if the order's splits_version isn't data.version.
+    """
+    if not data.changes:
+        raise HTTPException(status_code=400, detail="No changes provided")
+    version = _bump_splits_version(db, order_id, data.version)
+    order = db.query(models.Order).filter(models.Order.id == order_id).first()
+
+    item_map = {item.id: item for item in db.query(models.Item).filter(models.Item.order_id == order_id)}
+    unknown_items = {c.item_id for c in data.changes} - set(item_map)
+    if unknown_items:
+        raise HTTPException(status_code=400, detail=f"Items not in this order: {sorted(unknown_items)}")
+    new_user_ids = {uid for c in data.changes for uid in c.user_ids}
+    found = {uid for (uid,) in db.query(models.User.id).filter(models.User.id.in_(new_user_ids))}
+    if new_user_ids - found:
+        raise HTTPException(status_code=404, detail=f"Users not found: {sorted(new_user_ids - found)}")
+
+    # Row-locked: a concurrent mark-paid waits, rather than flipping paid_status
+    # after it was read here and leaving the ledger counting the wrong state
+    splits = (
+        db.query(models.Split)
+        .options(selectinload(models.Split.split_items))
+        .filter(models.Split.order_id == order_id)
+        .with_for_update()
+        .all()
+    )
+    by_user = {split.user_id: split for split in splits}
+    user_item_shares = _current_shares(splits)
+
+    for change in data.changes:
+        for shares in user_item_shares.values():
+            shares.pop(change.item_id, None)
+        user_ids = set(change.user_ids)
+        for uid in user_ids:
+            user_item_shares.setdefault(uid, {})[change.item_id] = 1 / len(user_ids)
+
+    # Recomputed for everyone, but a user's amount only moves if their items changed
+    # or the assigned total did (which shifts everyone's share of the fees)
+    amounts = _split_amounts(order, item_map, user_item_shares)
+    deltas = defaultdict(float)
+    inserted = updated = deleted = 0
+
+    for uid, shares in user_item_shares.items():
+        split = by_user.get(uid)
+        if not shares:
+            if split is not None:
+                _add_deltas(deltas, split_deltas([split], order.paid_by_user_id, sign=-1))
+                db.delete(split)
+                deleted += 1
+            continue
+
+        item_ids = sorted(shares)
+        if split is None:
+            split = models.Split(
+                order_id=order_id,
+                user_id=uid,
+                item_ids=item_ids,
+                amount_owed=amounts[uid],
+                paid_status=False,
+                reminder_payload={"restaurant": order.restaurant, "items": [item_map[i].name for i in item_ids]},
+                split_items=[models.SplitItem(item_id=i, share=shares[i]) for i in item_ids],
+            )
+            db.add(split)
+            _add_deltas(deltas, split_deltas([split], order.paid_by_user_id))
+            inserted += 1
+            continue
+
+        existing = {si.item_id: si for si in split.split_items}
+        items_changed = {i: si.share for i, si in existing.items()} != shares or (split.item_ids or []) != item_ids
+        amount_changed = abs((split.amount_owed or 0) - amounts[uid]) >= 0.005
+        if not items_changed and not amount_changed:
+            continue
+
+        _add_deltas(deltas, split_deltas([split], order.paid_by_user_id, sign=-1))
+        if items_changed:
+            for item_id, split_item in existing.items():
+                if item_id not in shares:
+                    split.split_items.remove(split_item)
+                elif split_item.share != shares[item_id]:
+                    split_item.share = shares[item_id]
+            for item_id in item_ids:
+                if item_id not in existing:
+                    split.split_items.append(models.SplitItem(item_id=item_id, share=shares[item_id]))
+            split.item_ids = item_ids
+            split.reminder_payload = {"restaurant": order.restaurant, "items": [item_map[i].name for i in item_ids]}
+        if amount_changed:
+            split.amount_owed = amounts[uid]
+            # Counted in the ledger again below, at the new amount
+            split.paid_status = False
+            split.reminder_sent = False
+            split.reminder_sent_at = None
+            split.message_sid = None
+        _add_deltas(deltas, split_deltas([split], order.paid_by_user_id))
+        updated += 1
+
+    apply_balance_deltas(db, deltas)
+    db.commit()
+    response_cache.invalidate_order(order_id, splits_only=True)
+    print(f"✏️  Splits for order {order_id} at version {version}: "
+          f"{inserted} inserted, {updated} updated, {deleted} deleted")
+    return {
+        "version": version,
+        "inserted": inserted,
+        "updated": updated,
+        "deleted": deleted,
+        "splits": split_rows(db, order_id),
+    }
+
+
 @router.delete("/{split_id}")
 def delete_split(split_id: int, db: Session = Depends(get_db)):
     """Delete a split"""
-    split = db.query(models.Split).filter(models.Split.id == split_id).first()
-    if not split:
+    order_id = db.query(models.Split.order_id).filter(models.Split.id == split_id).scalar()
+    if order_id is None:
         raise HTTPException(status_code=404, detail="Split not found")
     
-    db.delete(split)
+    _bump_splits_version(db, order_id, None)
+    # The ledger change comes from the row as it was deleted, not an earlier read
+    # that a concurrent mark-paid could have made stale
+    split = db.execute(
+        delete(models.Split)
+        .where(models.Split.id == split_id, models.Split.order_id == models.Order.id)
+        .returning(
+            models.Split.user_id,
+            models.Split.amount_owed,
+            models.Split.paid_status,
+            models.Order.paid_by_user_id,
+        )
+        .execution_options(synchronize_session=False)
+    ).first()
+    if split is None:
+        db.rollback()
+        raise HTTPException(status_code=404, detail="Split not found")
+    apply_balance_deltas(db, split_deltas([split], split.paid_by_user_id, sign=-1))
     db.commit()
+    response_cache.invalidate_order(order_id, splits_only=True)
     return {"message": "Split deleted successfully"}
@@ -1,9 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, union
 from sqlalchemy.orm import Session
 from typing import List
 import models
 import schemas
 from database import get_db
+from services.cache_service import order_detail_key, response_cache
+from services.listing_service import json_response, user_rows
 
 router = APIRouter()
 
@@ -17,8 +20,7 @@ def create_user(user: schemas.UserCreate, db: Session = Depends(get_db)):
 
 @router.get("/", response_model=List[schemas.User])
 def list_users(skip: int = 0, limit: int = 100, db: Session = Depends(get_db)):
-    users = db.query(models.User).offset(skip).limit(limit).all()
-    return users
+    return json_response(user_rows(db, skip, limit))
 
 @router.get("/{user_id}", response_model=schemas.User)
 def get_user(user_id: int, db: Session = Depends(get_db)):
@@ -39,8 +41,20 @@ def update_user(user_id: int, user_update: schemas.UserUpdate, db: Session = Dep
     
     db.commit()
     db.refresh(user)
+    if update_data:
+        invalidate_user_order_details(db, user_id)
     return user
 
+
+def invalidate_user_order_details(db: Session, user_id: int):
+    """Order detail payloads embed the payer and split users, so drop the ones this user appears in"""
+    order_ids = db.execute(union(
+        select(models.Order.id).where(models.Order.paid_by_user_id == user_id),
+        select(models.Split.order_id).where(models.Split.user_id == user_id),
+    )).scalars().all()
+    if order_ids:
+        response_cache.invalidate(*(order_detail_key(order_id) for order_id in order_ids))
+
 @router.delete("/{user_id}")
 def delete_user(user_id: int, db: Session = Depends(get_db)):
     user = db.query(models.User).filter(models.User.id == user_id).first()
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Optional, List
 from datetime import datetime
 
 # User schemas
@@ -59,8 +59,11 @@ class Order(OrderBase):
     id: int
     date: datetime
     image_url: Optional[str] = None
+    thumbnail_url: Optional[str] = None
+    medium_url: Optional[str] = None
     ocr_raw_text: Optional[str] = None
-    parsed_data: Optional[str] = None
+    parsed_data: Optional[Dict[str, Any]] = None
+    splits_version: int = 0
     items: List[Item] = []
     
     class Config:
@@ -113,8 +116,12 @@ class OrderCreateWithItems(BaseModel):
     paid_by_user_id: int
     image_url: Optional[str] = None
     ocr_raw_text: Optional[str] = None
+    parsed_data: Optional[Dict[str, Any]] = None
     items: List[ItemCreate]
 
+class OrderBulkCreate(BaseModel):
+    orders: List[OrderCreateWithItems]
+
 # Item-to-user assignment for bulk split creation
 class ItemAssignment(BaseModel):
     item_id: int
@@ -123,9 +130,181 @@ class ItemAssignment(BaseModel):
 class BulkSplitCreate(BaseModel):
     order_id: int
     assignments: List[ItemAssignment]
+    # The order's splits_version the assignments were made against; omit to replace unconditionally
+    version: Optional[int] = None
+
+# Incremental split edit: each change sets who shares one item (empty user_ids unassigns it)
+class SplitPatch(BaseModel):
+    version: int
+    changes: List[ItemAssignment]
+
+class SplitPatchResult(BaseModel):
+    version: int
+    inserted: int
+    updated: int
+    deleted: int
+    splits: List[Split]
 
 class SplitWithUser(Split):
     user: Optional[User] = None
 
     class Config:
         from_attributes = True
+
+# Everything the split review needs for one order (GET /api/orders/{id}/detail)
+class OrderDetail(Order):
+    payer: Optional[User] = None
+    splits: List[SplitWithUser] = []
+
+# Balance schemas
+class BalanceEntry(BaseModel):
+    user_id: int
+    name: str
+    amount: float
+
+class UserBalances(BaseModel):
+    user_id: int
+    owes: List[BalanceEntry]
+    owed_by: List[BalanceEntry]
+    total_owes: float
+    total_owed: float
+    net: float
+
+class BalanceSummary(BaseModel):
+    user_id: int
+    name: str
+    total_owes: float
+    total_owed: float
+    net: float
+
+class PairBalance(BaseModel):
+    debtor_id: int
+    creditor_id: int
+    amount: float
+    reverse_amount: float
+    net: float
+
+class BalanceMismatch(BaseModel):
+    debtor_id: int
+    creditor_id: int
+    expected: float
+    actual: float
+
+class BalanceRebuildReport(BaseModel):
+    pairs_checked: int
+    mismatches: List[BalanceMismatch]
+    applied: bool
+
+# Settlement schemas
+class SettlementBalance(BaseModel):
+    user_id: int
+    name: str
+    net: float
+
+class SettlementTransfer(BaseModel):
+    from_user_id: int
+    from_name: str
+    to_user_id: int
+    to_name: str
+    amount: float
+
+class SettlementPlan(BaseModel):
+    balances: List[SettlementBalance]
+    transfers: List[SettlementTransfer]
+    original_debt_count: int
+    transfer_count: int
+
+class SettlementRequest(BaseModel):
+    user_ids: Optional[List[int]] = None  # None = everyone
+
+# Bulk split updates
+class BulkPaidUpdate(BaseModel):
+    paid: bool
+    split_ids: Optional[List[int]] = None
+    order_id: Optional[int] = None
+    user_id: Optional[int] = None
+
+class BulkReminderStatusUpdate(BaseModel):
+    split_ids: List[int]
+    reminder_sent: bool = True
+    message_sid: Optional[str] = None
+
+class BulkUpdateResult(BaseModel):
+    updated: int
+    split_ids: List[int]
+
+# Order import
+class ImportItem(BaseModel):
+    name: str = Field(min_length=1)
+    price: float = Field(ge=0)
+    quantity: int = Field(1, ge=1)
+    user_ids: List[int] = []  # Who shared the item; empty = unassigned
+
+class ImportOrder(BaseModel):
+    order_ref: Optional[str] = None  # Caller's id for the order; re-imports with the same ref are skipped
+    date: Optional[datetime] = None
+    restaurant: str = Field(min_length=1)
+    total: float
+    subtotal: Optional[float] = None
+    tax: Optional[float] = None
+    delivery_fee: Optional[float] = None
+    tip: Optional[float] = None
+    discount: Optional[float] = 0
+    paid_by_user_id: int
+    settled: bool = False  # Create the splits already marked paid
+    items: List[ImportItem] = []
+
+class ImportRowError(BaseModel):
+    line: int
+    order_ref: Optional[str] = None
+    error: str
+
+class ImportReport(BaseModel):
+    rows_read: int
+    orders_created: int
+    orders_existing: int
+    orders_rejected: int
+    items_created: int
+    splits_created: int
+    error_count: int
+    errors: List[ImportRowError]
+    seconds: float
+    timings: Dict[str, float] = {}  # Seconds per phase
+
+# Receipt job schemas
+class ReceiptJob(BaseModel):
+    id: str
+    status: str
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_status: Optional[str] = None
+
+    class Config:
+        from_attributes = True
+
+class ReceiptJobAccepted(BaseModel):
+    id: str
+    status: str
+    status_url: str
+    events_url: str
+
+# Presigned upload schemas
+class ReceiptUploadRequest(BaseModel):
+    filename: Optional[str] = None
+    content_type: str = "image/jpeg"
+
+class ReceiptUploadURL(BaseModel):
+    key: str
+    url: str  # POST target; send `fields` plus the file as multipart form data
+    fields: Dict[str, str]
+    put_url: str  # Alternative: PUT the raw bytes with the same Content-Type
+    expires_in: int
+    max_bytes: int
+
+class ProcessReceiptRequest(BaseModel):
+    key: str
@@ -0,0 +1,209 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import Numeric, cast, func, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+import models
+
+# Differences below half a cent are rounding noise, not debt
+EPSILON = 0.005
+
+# Outstanding (debtor, creditor) -> amount, computed straight from splits and orders.
+# Used by the rebuild job and as the baseline the ledger is benchmarked against.
+AGGREGATE_SQL = text("""
+    SELECT s.user_id AS debtor_id, o.paid_by_user_id AS creditor_id, SUM(s.amount_owed) AS amount
+    FROM splits s
+    JOIN orders o ON o.id = s.order_id
+    WHERE COALESCE(s.paid_status, false) = false
+      AND o.paid_by_user_id IS NOT NULL
+      AND s.user_id <> o.paid_by_user_id
+    GROUP BY s.user_id, o.paid_by_user_id
+""")
+
+
+def split_deltas(
+    splits: Iterable[models.Split],
+    payer_id: Optional[int],
+    sign: int = 1,
+    include_paid: bool = False,
+) -> Dict[Tuple[int, int], float]:
+    """
+    Turn splits into (debtor, creditor) balance changes.
+
+    Args:
+        splits: Splits belonging to orders paid by payer_id
+        payer_id: The order's payer (creditor)
+        sign: +1 when the splits start counting as debt, -1 when they stop
+        include_paid: Count splits already marked paid (used when flipping paid status)
+
+    Returns:
+        Dict of (debtor_id, creditor_id) -> signed amount
+    """
+    deltas: Dict[Tuple[int, int], float] = defaultdict(float)
+    if payer_id is None:
+        return deltas
+
+    for split in splits:
+        if split.user_id == payer_id:
+            continue
+        if split.paid_status and not include_paid:
+            continue
+        deltas[(split.user_id, payer_id)] += sign * (split.amount_owed or 0)
+    return deltas
+
+
+def apply_balance_deltas(db: Session, deltas: Dict[Tuple[int, int], float]):
+    """
+    Add deltas to the ledger with a single upsert. Does not commit, so the
+    change lands in the same transaction as the split write that caused it.
+    """
+    rows = [
+        {"debtor_id": debtor_id, "creditor_id": creditor_id, "amount": round(amount, 2)}
+        # Sorted so concurrent transactions lock rows in the same order
+        for (debtor_id, creditor_id), amount in sorted(deltas.items())
+        if abs(amount) >= EPSILON
+    ]
+    if not rows:
+        return
+
+    stmt = insert(models.Balance).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[models.Balance.debtor_id, models.Balance.creditor_id],
+        set_={
+            "amount": func.round(cast(models.Balance.amount + stmt.excluded.amount, Numeric), 2),
+            "updated_at": datetime.utcnow(),
+        },
+    )
+    db.execute(stmt)
+
+
+def get_pair_balance(db: Session, debtor_id: int, creditor_id: int) -> float:
+    """Amount debtor owes creditor (primary key lookup)"""
+    balance = db.get(models.Balance, (debtor_id, creditor_id))
+    return round(balance.amount, 2) if balance and balance.amount >= EPSILON else 0.0
+
+
+def get_user_balances(db: Session, user_id: int) -> dict:
+    """Everyone user_id owes and everyone who owes user_id, with names"""
+    owes = (
+        db.query(models.Balance.creditor_id, models.User.name, models.Balance.amount)
+        .join(models.User, models.User.id == models.Balance.creditor_id)
+        .filter(models.Balance.debtor_id == user_id, models.Balance.amount >= EPSILON)
+        .all()
+    )
+    owed_by = (
+        db.query(models.Balance.debtor_id, models.User.name, models.Balance.amount)
+        .join(models.User, models.User.id == models.Balance.debtor_id)
+        .filter(models.Balance.creditor_id == user_id, models.Balance.amount >= EPSILON)
+        .all()
+    )
+    total_owes = round(sum(row.amount for row in owes), 2)
+    total_owed = round(sum(row.amount for row in owed_by), 2)
+    return {
+        "user_id": user_id,
+        "owes": [{"user_id": uid, "name": name, "amount": round(amount, 2)} for uid, name, amount in owes],
+        "owed_by": [{"user_id": uid, "name": name, "amount": round(amount, 2)} for uid, name, amount in owed_by],
+        "total_owes": total_owes,
+        "total_owed": total_owed,
+        "net": round(total_owed - total_owes, 2),
+    }
+
+
+def get_balance_summary(db: Session) -> List[dict]:
+    """Per-user totals (owes, owed, net) for every user with an open balance"""
+    owes = dict(
+        db.query(models.Balance.debtor_id, func.sum(models.Balance.amount))
+        .filter(models.Balance.amount >= EPSILON)
+        .group_by(models.Balance.debtor_id)
+        .all()
+    )
+    owed = dict(
+        db.query(models.Balance.creditor_id, func.sum(models.Balance.amount))
+        .filter(models.Balance.amount >= EPSILON)
+        .group_by(models.Balance.creditor_id)
+        .all()
+    )
+    user_ids = set(owes) | set(owed)
+    if not user_ids:
+        return []
+
+    names = dict(db.query(models.User.id, models.User.name).filter(models.User.id.in_(user_ids)).all())
+    summary = []
+    for uid in sorted(user_ids):
+        total_owes = round(owes.get(uid, 0.0), 2)
+        total_owed = round(owed.get(uid, 0.0), 2)
+        summary.append({
+            "user_id": uid,
+            "name": names.get(uid, ""),
+            "total_owes": total_owes,
+            "total_owed": total_owed,
+            "net": round(total_owed - total_owes, 2),
+        })
+    return summary
+
+
+def compute_balances(db: Session) -> Dict[Tuple[int, int], float]:
+    """Aggregate outstanding balances on the fly from splits (full scan)"""
+    return {
+        (row.debtor_id, row.creditor_id): round(row.amount, 2)
+        for row in db.execute(AGGREGATE_SQL)
+    }
+
+
+def rebuild_balances(db: Session, apply: bool = False) -> dict:
+    """
+    Recompute every balance from splits and compare it with the ledger.
+
+    With apply=True the ledger is replaced by the recomputed values. The table
+    is locked for the duration so incremental updates can't interleave.
+    """
+    if apply:
+        db.execute(text("LOCK TABLE balances IN EXCLUSIVE MODE"))
+
+    expected = compute_balances(db)
+    actual = {
+        (b.debtor_id, b.creditor_id): round(b.amount, 2)
+        for b in db.query(models.Balance).all()
+    }
+
+    mismatches = []
+    for key in sorted(set(expected) | set(actual)):
+        want = expected.get(key, 0.0)
+        have = actual.get(key, 0.0)
+        if abs(want - have) >= EPSILON:
+            mismatches.append({"debtor_id": key[0], "creditor_id": key[1], "expected": want, "actual": have})
+
+    if apply:
+        db.query(models.Balance).delete()
+        db.execute(text(
+            "INSERT INTO balances (debtor_id, creditor_id, amount, updated_at) "
+            "SELECT debtor_id, creditor_id, ROUND(amount::numeric, 2), now() AT TIME ZONE 'utc' "
+            f"FROM ({AGGREGATE_SQL.text}) agg"
+        ))
+        db.commit()
+    else:
+        db.rollback()
+
+    return {"pairs_checked": len(set(expected) | set(actual)), "mismatches": mismatches, "applied": apply}
+
+
+if __name__ == "__main__":
+    # Consistency check / rebuild job: python -m services.balance_service [--apply]
+    import sys
+    from database import SessionLocal
+
+    session = SessionLocal()
+    try:
+        report = rebuild_balances(session, apply="--apply" in sys.argv)
+    finally:
+        session.close()
+
+    print(f"Checked {report['pairs_checked']} pairs, {len(report['mismatches'])} mismatches")
+    for m in report["mismatches"][:50]:
+        print(f"  {m['debtor_id']} -> {m['creditor_id']}: expected {m['expected']:.2f}, ledger {m['actual']:.2f}")
+    if report["applied"]:
+        print("✓ Ledger rebuilt")
+    sys.exit(1 if report["mismatches"] and not report["applied"] else 0)
@@ -0,0 +1,208 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional, Tuple
+
+from dotenv import load_dotenv
+from fastapi import Response
+
+load_dotenv()
+
+# Optional shared tier so several API workers see each other's invalidations
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    redis = None  # type: ignore
+    REDIS_AVAILABLE = False
+
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", "300"))
+REDIS_URL = os.getenv("REDIS_URL", "")
+REDIS_KEY_PREFIX = "billsplitter:cache:"
+
+
+def make_etag(body: bytes) -> str:
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def order_key(order_id: int) -> str:
+    return f"order:{order_id}"
+
+
+def order_splits_key(order_id: int) -> str:
+    return f"order_splits:{order_id}"
+
+
+def order_detail_key(order_id: int) -> str:
+    return f"order_detail:{order_id}"
+
+
+class LRUCache:
+    """Thread-safe in-process LRU of key -> (etag, body) with a TTL"""
+
+    def __init__(self, max_entries: int, ttl_seconds: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str, bytes]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def set(self, key: str, etag: str, body: bytes):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, etag, body)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class ResponseCache:
+    """
+    Read-through cache for serialized JSON payloads.
+
+    Entries live in a per-process LRU. When REDIS_URL is set they are also
+    written to Redis, and a local hit is only served after checking its etag
+    against Redis, so an invalidation in one worker is seen by all of them.
+    Redis errors fall back to the local tier.
+
+    Each key has a generation that invalidate() bumps. A fill started before
+    an invalidation is dropped instead of caching data that is already stale.
+    """
+
+    def __init__(self, max_entries: int = CACHE_MAX_ENTRIES, ttl_seconds: float = CACHE_TTL_SECONDS,
+                 redis_url: str = REDIS_URL):
+        self.local = LRUCache(max_entries, ttl_seconds)
+        self.ttl_seconds = ttl_seconds
+        self.shared = None
+        self._generations: dict[str, int] = {}
+        self._generation_lock = threading.Lock()
+        if redis_url:
+            if not REDIS_AVAILABLE:
+                print("WARNING: REDIS_URL set but redis package not installed - using in-process cache only")
+            else:
+                self.shared = redis.Redis.from_url(redis_url)
+
+    def get(self, key: str) -> Optional[Tuple[str, bytes]]:
+        """Return (etag, body) or None"""
+        local = self.local.get(key)
+        if self.shared is None:
+            return local
+
+        try:
+            if local is not None:
+                shared_etag = self.shared.hget(REDIS_KEY_PREFIX + key, "etag")
+                if shared_etag is not None and shared_etag.decode() == local[0]:
+                    return local
+                self.local.delete(key)
+                if shared_etag is None:
+                    return None
+
+            fields = self.shared.hgetall(REDIS_KEY_PREFIX + key)
+            if not fields:
+                return None
+            etag, body = fields[b"etag"].decode(), fields[b"body"]
+            self.local.set(key, etag, body)
+            return etag, body
+        except Exception as e:
+            print(f"WARNING: shared cache read failed: {e}")
+            return local
+
+    def generation(self, key: str) -> int:
+        with self._generation_lock:
+            return self._generations.get(key, 0)
+
+    def set(self, key: str, body: bytes, generation: Optional[int] = None) -> str:
+        """Store a payload and return its etag; skipped if key was invalidated since `generation`"""
+        etag = make_etag(body)
+        if generation is not None and generation != self.generation(key):
+            return etag
+        self.local.set(key, etag, body)
+        if self.shared is not None:
+            try:
+                pipe = self.shared.pipeline()
+                pipe.hset(REDIS_KEY_PREFIX + key, mapping={"etag": etag, "body": body})
+                pipe.expire(REDIS_KEY_PREFIX + key, int(self.ttl_seconds))
+                pipe.execute()
+            except Exception as e:
+                print(f"WARNING: shared cache write failed: {e}")
+        return etag
+
+    def invalidate(self, *keys: str):
+        with self._generation_lock:
+            for key in keys:
+                self._generations[key] = self._generations.get(key, 0) + 1
+        self.local.delete(*keys)
+        if self.shared is not None and keys:
+            try:
+                self.shared.delete(*(REDIS_KEY_PREFIX + k for k in keys))
+            except Exception as e:
+                print(f"WARNING: shared cache invalidation failed: {e}")
+
+    def invalidate_order(self, order_id: int, splits_only: bool = False):
+        """Drop cached payloads for an order (or just its splits); the detail payload embeds both"""
+        if splits_only:
+            self.invalidate(order_splits_key(order_id), order_detail_key(order_id))
+        else:
+            self.invalidate(order_key(order_id), order_splits_key(order_id), order_detail_key(order_id))
+
+    def clear(self):
+        self.local.clear()
+
+
+response_cache = ResponseCache()
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """True when an If-None-Match header covers etag"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [c.strip().removeprefix("W/") for c in if_none_match.split(",")]
+    return etag in candidates
+
+
+def cached_json_response(key: str, if_none_match: Optional[str], build: Callable[[], bytes]) -> Response:
+    """
+    Serve a JSON payload through the cache.
+
+    build() loads and serializes the payload on a miss (and may raise
+    HTTPException). When the client's If-None-Match matches, a bodyless 304
+    is returned, without touching the database on a hit.
+    """
+    cached = response_cache.get(key)
+    if cached is None:
+        generation = response_cache.generation(key)
+        body = build()
+        etag = response_cache.set(key, body, generation)
+    else:
+        etag, body = cached
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
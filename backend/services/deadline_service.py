@@ -0,0 +1,87 @@
+"""
+Request deadlines and client-disconnect cancellation.
+
+run_cancellable runs a request's work as a task and cancels it when the
+client goes away or the deadline passes. The cancellation reaches whatever
+the work is waiting on: queued LLM requests leave the dispatcher queue,
+in-flight httpx calls to the LLM, Ollama or the OCR service are closed, and
+OCR that hasn't got the models yet is skipped. Work that finishes after its
+client has gone is counted as wasted.
+"""
+import asyncio
+import os
+import time
+from typing import Awaitable
+
+from dotenv import load_dotenv
+from fastapi import HTTPException, Request
+
+load_dotenv()
+
+# Longest upload-receipt may spend on OCR, parsing and storage before giving up with 504
+UPLOAD_DEADLINE_SECONDS = float(os.getenv("UPLOAD_DEADLINE_SECONDS", "120"))
+# How often a running request checks whether its client is still connected
+DISCONNECT_POLL_SECONDS = 0.25
+
+# nginx's code for "client closed request"; never reaches the client, but shows in access logs
+CLIENT_CLOSED_REQUEST = 499
+
+_stats: dict = {}
+
+
+async def run_cancellable(request: Request, work: Awaitable, name: str,
+                          deadline_seconds: float = UPLOAD_DEADLINE_SECONDS):
+    """
+    Await work, cancelling it when the client disconnects (499) or after
+    deadline_seconds (504). The request body must already have been read.
+    """
+    stats = _stats.setdefault(name, {"completed": 0, "failed": 0, "cancelled_disconnect": 0,
+                                     "cancelled_deadline": 0, "wasted": 0, "cancelled_seconds": 0.0,
+                                     "wasted_seconds": 0.0})
+    task = asyncio.ensure_future(work)
+    started = time.monotonic()
+    reason = None
+    try:
+        while not task.done():
+            remaining = deadline_seconds - (time.monotonic() - started)
+            if remaining <= 0:
+                reason = "deadline"
+                break
+            await asyncio.wait({task}, timeout=min(DISCONNECT_POLL_SECONDS, remaining))
+            if not task.done() and await request.is_disconnected():
+                reason = "disconnect"
+                break
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    elapsed = time.monotonic() - started
+    if reason is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+        stats[f"cancelled_{reason}"] += 1
+        stats["cancelled_seconds"] += elapsed
+        if reason == "deadline":
+            print(f"⏱️  {name} cancelled after the {deadline_seconds:g}s deadline")
+            raise HTTPException(status_code=504, detail=f"Processing took longer than {deadline_seconds:g}s")
+        print(f"🔌 {name} cancelled: client disconnected after {elapsed:.1f}s")
+        raise HTTPException(status_code=CLIENT_CLOSED_REQUEST, detail="Client closed request")
+
+    if task.exception() is not None:
+        stats["failed"] += 1
+        return task.result()
+    if await request.is_disconnected():
+        stats["wasted"] += 1
+        stats["wasted_seconds"] += elapsed
+    else:
+        stats["completed"] += 1
+    return task.result()
+
+
+def request_metrics() -> dict:
+    """Per endpoint: completed, cancelled (by reason) and wasted requests, with seconds spent"""
+    return {
+        name: {**s, "cancelled_seconds": round(s["cancelled_seconds"], 2),
+               "wasted_seconds": round(s["wasted_seconds"], 2)}
+        for name, s in _stats.items()
+    }
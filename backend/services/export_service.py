@@ -0,0 +1,117 @@
+import csv
+import io
+import json
+from datetime import datetime
+from typing import Iterator, Optional
+
+from sqlalchemy import Select, select
+from sqlalchemy.engine import Engine
+
+import models
+
+# Rows fetched from the server-side cursor per round trip (and per chunk sent)
+EXPORT_BATCH_SIZE = 5000
+
+Payer = models.User.__table__.alias("payer")
+
+
+def orders_select() -> Select:
+    o = models.Order.__table__
+    return (
+        select(
+            o.c.id, o.c.date, o.c.restaurant, o.c.total, o.c.subtotal, o.c.tax,
+            o.c.delivery_fee, o.c.tip, o.c.discount, o.c.paid_by_user_id,
+            Payer.c.name.label("paid_by_name"),
+        )
+        .select_from(o.outerjoin(Payer, Payer.c.id == o.c.paid_by_user_id))
+        .order_by(o.c.id)
+    )
+
+
+def items_select() -> Select:
+    o, i = models.Order.__table__, models.Item.__table__
+    return (
+        select(i.c.id, i.c.order_id, o.c.date.label("order_date"), i.c.name, i.c.price, i.c.quantity)
+        .select_from(i.join(o, o.c.id == i.c.order_id))
+        .order_by(i.c.order_id, i.c.id)
+    )
+
+
+def splits_select() -> Select:
+    o, s, u = models.Order.__table__, models.Split.__table__, models.User.__table__
+    return (
+        select(
+            s.c.id, s.c.order_id, o.c.date.label("order_date"), o.c.paid_by_user_id,
+            s.c.user_id, u.c.name.label("user_name"), s.c.amount_owed, s.c.paid_status,
+            s.c.reminder_sent, s.c.reminder_sent_at,
+        )
+        .select_from(s.join(o, o.c.id == s.c.order_id).outerjoin(u, u.c.id == s.c.user_id))
+        .order_by(s.c.order_id, s.c.id)
+    )
+
+
+EXPORTS = {
+    "orders": orders_select,
+    "items": items_select,
+    "splits": splits_select,
+}
+
+
+def build_export(
+    kind: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    paid_by_user_id: Optional[int] = None,
+) -> Select:
+    """Export query for kind, filtered on the order's date range [start, end) and payer"""
+    o = models.Order.__table__
+    stmt = EXPORTS[kind]()
+    if start is not None:
+        stmt = stmt.where(o.c.date >= start)
+    if end is not None:
+        stmt = stmt.where(o.c.date < end)
+    if paid_by_user_id is not None:
+        stmt = stmt.where(o.c.paid_by_user_id == paid_by_user_id)
+    return stmt
+
+
+def _csv_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _json_value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Can't export {type(value).__name__}")
+
+
+def stream_export(engine: Engine, stmt: Select, fmt: str, batch_size: int = EXPORT_BATCH_SIZE) -> Iterator[bytes]:
+    """
+    Run stmt on a server-side cursor and yield it encoded as CSV or NDJSON.
+
+    Rows arrive batch_size at a time and each batch is encoded into one chunk,
+    so memory stays flat however large the export is. Uses its own
+    connection because the response outlives the request's session.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(stmt)
+        columns = list(result.keys())
+
+        if fmt == "csv":
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for partition in result.partitions():
+                writer.writerows([_csv_value(v) for v in row] for row in partition)
+                yield buffer.getvalue().encode()
+                buffer.seek(0)
+                buffer.truncate()
+            if buffer.tell():
+                yield buffer.getvalue().encode()
+        else:
+            for partition in result.partitions():
+                yield "".join(
+                    json.dumps(dict(zip(columns, row)), default=_json_value) + "\n" for row in partition
+                ).encode()
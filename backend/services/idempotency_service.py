@@ -0,0 +1,318 @@
+"""
+Idempotency-Key handling for retried writes.
+
+A client that retries a request with the same Idempotency-Key header gets
+the response of the first attempt instead of a second OCR/LLM run or a
+duplicate order. Keys are stored in the idempotency_keys table:
+
+- The first request claims the key (INSERT ... ON CONFLICT) and runs.
+- A duplicate that arrives while it is running waits for it to finish,
+  then gets its stored response replayed (Idempotent-Replayed: true).
+- A duplicate that arrives later gets the stored response straight away.
+- The same key with a different request body is refused with 422.
+
+Responses below 500 are stored until IDEMPOTENCY_TTL_SECONDS. Server errors,
+exceptions and requests cancelled because the client left (499) release the
+key so the retry runs again. A claim whose request died without releasing
+it is taken over after IDEMPOTENCY_LOCK_SECONDS.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+from sqlalchemy import delete, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+import models
+from services.deadline_service import CLIENT_CLOSED_REQUEST
+
+load_dotenv()
+
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# Longer than the slowest receipt upload (OCR + LLM)
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "300"))
+# How long a duplicate waits for the in-flight request before giving up with 409
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "60"))
+
+# (method, path) pairs the middleware applies to; everything else passes straight through
+IDEMPOTENT_ROUTES = {
+    ("POST", "/api/orders/"),
+    ("POST", "/api/orders/bulk"),
+    ("POST", "/api/orders/upload-receipt"),
+    ("POST", "/api/orders/process-receipt"),
+    ("POST", "/api/receipt-jobs/"),
+}
+
+MAX_KEY_LENGTH = 255
+# Response headers kept with the stored body
+STORED_HEADERS = {"content-type", "location", "etag"}
+# Expired keys deleted per purge, and how many claims between purges
+PURGE_BATCH_SIZE = 1000
+PURGE_EVERY_CLAIMS = 100
+
+IdempotencyKey = models.IdempotencyKey.__table__
+
+
+def _utcnow():
+    return func.timezone("utc", func.now())
+
+
+def _utc_in(seconds: int):
+    return literal_column(f"timezone('utc', now()) + interval '{int(seconds)} seconds'")
+
+
+def request_fingerprint(method: str, path: str, query: bytes, content_type: str, body: bytes) -> str:
+    """
+    Hash of what the request asks for. The multipart boundary is dropped
+    from both the content type and the body, since a client may pick a new
+    one when it resends the same upload.
+    """
+    media_type, _, params = content_type.partition(";")
+    boundary = None
+    for param in params.split(";"):
+        name, _, value = param.strip().partition("=")
+        if name.lower() == "boundary" and value:
+            boundary = value.strip('"').encode()
+    if boundary:
+        body = body.replace(boundary, b"")
+
+    digest = hashlib.sha256()
+    for part in (method.encode(), path.encode(), query, media_type.strip().lower().encode()):
+        digest.update(part + b"\n")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def claim_key(engine: Engine, key: str, method: str, path: str, fingerprint: str, owner: str) -> Optional[dict]:
+    """
+    Claim key for this request. Returns None when claimed, otherwise the
+    row that holds it. Expired rows are reused, and so are in-progress
+    rows of an identical request whose lock has run out.
+    """
+    values = {
+        "key": key,
+        "method": method,
+        "path": path,
+        "fingerprint": fingerprint,
+        "status": "in_progress",
+        "owner": owner,
+        "locked_until": _utc_in(IDEMPOTENCY_LOCK_SECONDS),
+        "response_status": None,
+        "response_headers": None,
+        "response_body": None,
+        "created_at": _utcnow(),
+        "expires_at": _utc_in(IDEMPOTENCY_TTL_SECONDS),
+    }
+    stmt = insert(IdempotencyKey).values(values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[IdempotencyKey.c.key],
+        set_={k: stmt.excluded[k] for k in values if k != "key"},
+        where=(IdempotencyKey.c.expires_at < _utcnow())
+        | ((IdempotencyKey.c.status == "in_progress")
+           & (IdempotencyKey.c.locked_until < _utcnow())
+           & (IdempotencyKey.c.fingerprint == fingerprint)),
+    ).returning(IdempotencyKey.c.key)
+
+    with engine.begin() as conn:
+        if conn.execute(stmt).first() is not None:
+            return None
+        row = conn.execute(
+            select(IdempotencyKey.c.fingerprint, IdempotencyKey.c.status, IdempotencyKey.c.response_status,
+                   IdempotencyKey.c.response_headers, IdempotencyKey.c.response_body)
+            .where(IdempotencyKey.c.key == key)
+        ).mappings().first()
+    # The holder may have released it in between; the caller just tries again
+    return dict(row) if row is not None else {"status": "released"}
+
+
+def complete_key(engine: Engine, key: str, owner: str, status: int, headers: Dict[str, str], body: bytes):
+    """Store the response for a claimed key"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(IdempotencyKey)
+            .where(IdempotencyKey.c.key == key, IdempotencyKey.c.owner == owner)
+            .values(status="completed", locked_until=None, response_status=status,
+                    response_headers=headers, response_body=body)
+        )
+
+
+def release_key(engine: Engine, key: str, owner: str):
+    """Give up a claimed key so the next attempt runs the request again"""
+    with engine.begin() as conn:
+        conn.execute(
+            delete(IdempotencyKey)
+            .where(IdempotencyKey.c.key == key, IdempotencyKey.c.owner == owner,
+                   IdempotencyKey.c.status == "in_progress")
+        )
+
+
+def purge_expired(engine: Engine, batch_size: int = PURGE_BATCH_SIZE) -> int:
+    """Delete up to batch_size expired keys; returns how many"""
+    expired = (
+        select(IdempotencyKey.c.key)
+        .where(IdempotencyKey.c.expires_at < _utcnow())
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    with engine.begin() as conn:
+        return conn.execute(delete(IdempotencyKey).where(IdempotencyKey.c.key.in_(expired))).rowcount
+
+
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+async def _send_json(send, status: int, detail: str, headers: Optional[Dict[str, str]] = None):
+    body = json.dumps({"detail": detail}).encode()
+    raw_headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+    raw_headers += [(k.encode(), v.encode()) for k, v in (headers or {}).items()]
+    await send({"type": "http.response.start", "status": status, "headers": raw_headers})
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """
+    ASGI middleware applying Idempotency-Key handling to IDEMPOTENT_ROUTES.
+
+    Requests without the header are untouched. The request body is read up
+    front to fingerprint it and then handed to the app unchanged.
+    """
+
+    def __init__(self, app, engine: Optional[Engine] = None, routes=IDEMPOTENT_ROUTES,
+                 wait_seconds: float = IDEMPOTENCY_WAIT_SECONDS):
+        self.app = app
+        self.engine = engine
+        self.routes = routes
+        self.wait_seconds = wait_seconds
+        # Keys being run by this process, so local duplicates wake as soon as they finish
+        self._inflight: Dict[str, asyncio.Event] = {}
+        self._claims = 0
+
+    def _engine(self) -> Engine:
+        if self.engine is None:
+            from database import engine
+            self.engine = engine
+        return self.engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (scope["method"], scope["path"]) not in self.routes:
+            return await self.app(scope, receive, send)
+        key = _header(scope, b"idempotency-key")
+        if key is None:
+            return await self.app(scope, receive, send)
+        key = key.strip()
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await _send_json(send, 400, f"Idempotency-Key must be 1-{MAX_KEY_LENGTH} characters")
+
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        engine = self._engine()
+        method, path = scope["method"], scope["path"]
+        fingerprint = request_fingerprint(method, path, scope.get("query_string", b""),
+                                          _header(scope, b"content-type") or "", body)
+        owner = uuid.uuid4().hex
+        deadline = time.monotonic() + self.wait_seconds
+        delay = 0.05
+
+        while True:
+            existing = await run_in_threadpool(claim_key, engine, key, method, path, fingerprint, owner)
+            if existing is None:
+                break
+            if existing["status"] == "released":
+                continue
+            if existing["fingerprint"] != fingerprint:
+                return await _send_json(send, 422, "Idempotency-Key was already used for a different request")
+            if existing["status"] == "completed":
+                print(f"🔁 Replaying response for Idempotency-Key {key}")
+                return await self._replay(send, existing)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return await _send_json(send, 409, "A request with this Idempotency-Key is still in progress",
+                                        {"Retry-After": "1"})
+            event = self._inflight.get(key)
+            try:
+                if event is not None:
+                    await asyncio.wait_for(event.wait(), timeout=remaining)
+                else:
+                    await asyncio.sleep(min(delay, remaining))
+                    delay = min(delay * 2, 1.0)
+            except asyncio.TimeoutError:
+                pass
+
+        await self._run(scope, receive, send, engine, key, owner, body)
+
+    async def _run(self, scope, receive, send, engine, key, owner, body):
+        event = self._inflight[key] = asyncio.Event()
+        response = {"status": 500, "headers": {}, "body": []}
+        body_sent = False
+
+        async def replay_receive():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture_send(message):
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = {
+                    k.decode("latin-1").lower(): v.decode("latin-1")
+                    for k, v in message.get("headers", [])
+                    if k.decode("latin-1").lower() in STORED_HEADERS
+                }
+            elif message["type"] == "http.response.body":
+                response["body"].append(message.get("body", b""))
+            await send(message)
+
+        completed = False
+        try:
+            await self.app(scope, replay_receive, capture_send)
+            # A 499 means the client left and the work was cancelled; its retry must run again
+            if response["status"] < 500 and response["status"] != CLIENT_CLOSED_REQUEST:
+                await run_in_threadpool(complete_key, engine, key, owner, response["status"],
+                                        response["headers"], b"".join(response["body"]))
+                completed = True
+        finally:
+            if not completed:
+                await run_in_threadpool(release_key, engine, key, owner)
+            self._inflight.pop(key, None)
+            event.set()
+            await self._maybe_purge(engine)
+
+    async def _replay(self, send, stored: dict):
+        body = stored["response_body"] or b""
+        headers = [(k.encode(), v.encode()) for k, v in (stored["response_headers"] or {}).items()]
+        headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": stored["response_status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def _maybe_purge(self, engine):
+        self._claims += 1
+        if self._claims % PURGE_EVERY_CLAIMS:
+            return
+        try:
+            purged = await run_in_threadpool(purge_expired, engine)
+            if purged:
+                print(f"🧹 Purged {purged} expired idempotency keys")
+        except Exception as e:
+            print(f"WARNING: idempotency key purge failed: {e}")
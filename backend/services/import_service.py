@@ -0,0 +1,417 @@
+"""
+Bulk import of historical orders.
+
+Input is NDJSON (one order per line, items nested) or CSV (one item per row,
+order columns repeated, grouped by order_ref). Rows are validated as they
+are read and COPY'd into a temporary staging table; everything after that is
+a handful of set-based statements:
+
+    staging -> reject unknown users -> orders -> items -> splits/split_items -> balances
+
+Each order gets an import_key (its order_ref, or a hash of its content) with
+a unique index, so re-running an import only creates what is missing. The
+whole import runs in one transaction.
+"""
+import csv
+import hashlib
+import json
+import time
+from datetime import timezone
+from typing import IO, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.orm import Session
+
+import schemas
+
+# Errors listed in the report; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+
+CSV_ORDER_COLUMNS = ["order_ref", "date", "restaurant", "total", "subtotal", "tax", "delivery_fee", "tip",
+                     "discount", "paid_by_user_id", "settled"]
+
+STAGING_COLUMNS = ["line", "import_key", "order_ref", "restaurant", "date", "total", "subtotal", "tax",
+                   "delivery_fee", "tip", "discount", "paid_by_user_id", "settled",
+                   "position", "item_name", "price", "quantity", "user_ids"]
+STAGING_TYPES = ["int4", "text", "text", "text", "timestamp", "float8", "float8", "float8",
+                 "float8", "float8", "float8", "int4", "bool",
+                 "int4", "text", "float8", "int4", "int4[]"]
+
+CREATE_STAGING_SQL = """
+CREATE TEMP TABLE import_rows (
+    line INTEGER, import_key TEXT, order_ref TEXT, restaurant TEXT, date TIMESTAMP,
+    total FLOAT8, subtotal FLOAT8, tax FLOAT8, delivery_fee FLOAT8, tip FLOAT8, discount FLOAT8,
+    paid_by_user_id INTEGER, settled BOOLEAN,
+    position INTEGER, item_name TEXT, price FLOAT8, quantity INTEGER, user_ids INTEGER[]
+) ON COMMIT DROP;
+CREATE TEMP TABLE import_rejected (import_key TEXT PRIMARY KEY) ON COMMIT DROP;
+"""
+
+# Orders whose payer or assigned users don't exist: (line, order_ref, import_key, error)
+REJECT_UNKNOWN_USERS_SQL = """
+WITH missing AS (
+    SELECT r.import_key, min(r.line) AS line, min(r.order_ref) AS order_ref,
+           'paid_by_user_id ' || r.paid_by_user_id || ' not found' AS error
+    FROM import_rows r
+    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = r.paid_by_user_id)
+    GROUP BY r.import_key, r.paid_by_user_id
+    UNION ALL
+    SELECT r.import_key, min(r.line), min(r.order_ref), 'user ' || a.user_id || ' not found'
+    FROM import_rows r CROSS JOIN LATERAL unnest(r.user_ids) AS a (user_id)
+    WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.id = a.user_id)
+    GROUP BY r.import_key, a.user_id
+),
+rejected AS (
+    INSERT INTO import_rejected (import_key)
+    SELECT DISTINCT import_key FROM missing
+    ON CONFLICT DO NOTHING
+)
+SELECT line, order_ref, error FROM missing ORDER BY line
+"""
+
+# New orders only: first line's order fields, items rolled into parsed_data.
+# Candidates get their own analyzed table because Postgres assumes nearly
+# every key exists in orders for the anti-join, and plans the rest as if
+# there were one row.
+INSERT_ORDERS_SQL = """
+CREATE TEMP TABLE import_candidates ON COMMIT DROP AS
+SELECT DISTINCT ON (r.import_key) r.*
+FROM import_rows r
+WHERE NOT EXISTS (SELECT 1 FROM import_rejected x WHERE x.import_key = r.import_key)
+  AND NOT EXISTS (SELECT 1 FROM orders o WHERE o.import_key = r.import_key)
+ORDER BY r.import_key, r.line;
+CREATE INDEX ON import_candidates (import_key);
+ANALYZE import_candidates;
+
+CREATE TEMP TABLE import_orders ON COMMIT DROP AS
+WITH item_json AS (
+    SELECT r.import_key,
+           jsonb_agg(jsonb_build_object('name', r.item_name, 'price', r.price, 'quantity', r.quantity)
+                     ORDER BY r.position) AS items
+    FROM import_rows r
+    JOIN import_candidates c ON c.import_key = r.import_key
+    WHERE r.item_name IS NOT NULL
+    GROUP BY r.import_key
+),
+inserted AS (
+    INSERT INTO orders (restaurant, total, subtotal, tax, delivery_fee, tip, discount, date,
+                        paid_by_user_id, parsed_data, import_key)
+    SELECT c.restaurant, c.total, c.subtotal, c.tax, c.delivery_fee, c.tip, c.discount,
+           COALESCE(c.date, now() AT TIME ZONE 'utc'), c.paid_by_user_id,
+           jsonb_build_object('restaurant', c.restaurant, 'total', c.total, 'subtotal', c.subtotal,
+                              'tax', c.tax, 'delivery_fee', c.delivery_fee, 'tip', c.tip,
+                              'discount', c.discount, 'items', COALESCE(j.items, '[]'::jsonb)),
+           c.import_key
+    FROM import_candidates c
+    LEFT JOIN item_json j ON j.import_key = c.import_key
+    ON CONFLICT (import_key) DO NOTHING
+    RETURNING id, import_key, restaurant, paid_by_user_id,
+              COALESCE(tax, 0) + COALESCE(delivery_fee, 0) + COALESCE(tip, 0) - COALESCE(discount, 0) AS fees
+)
+SELECT i.*, c.settled FROM inserted i JOIN import_candidates c ON c.import_key = i.import_key;
+CREATE INDEX ON import_orders (import_key);
+ANALYZE import_orders;
+"""
+
+# Item ids are drawn up front so splits can reference them without a round trip
+INSERT_ITEMS_SQL = """
+CREATE TEMP TABLE import_items ON COMMIT DROP AS
+SELECT nextval(pg_get_serial_sequence('items', 'id'))::int AS item_id, o.id AS order_id,
+       r.item_name, r.price, r.quantity, r.user_ids
+FROM import_rows r
+JOIN import_orders o ON o.import_key = r.import_key
+WHERE r.item_name IS NOT NULL;
+ANALYZE import_items;
+
+INSERT INTO items (id, order_id, name, price, quantity)
+SELECT item_id, order_id, item_name, price, quantity FROM import_items;
+"""
+
+# Same rule as create_bulk_splits: an item's cost is shared evenly by its users,
+# fees are spread in proportion to each user's subtotal
+INSERT_SPLITS_SQL = """
+CREATE TEMP TABLE import_split_items ON COMMIT DROP AS
+SELECT i.order_id, a.user_id, i.item_id, min(i.item_name) AS item_name,
+       sum(1.0 / cardinality(i.user_ids)) AS share,
+       sum(i.price * i.quantity / cardinality(i.user_ids)) AS cost
+FROM import_items i
+CROSS JOIN LATERAL unnest(i.user_ids) AS a (user_id)
+GROUP BY i.order_id, a.user_id, i.item_id;
+ANALYZE import_split_items;
+
+CREATE TEMP TABLE import_splits ON COMMIT DROP AS
+WITH per_user AS (
+    SELECT order_id, user_id, sum(cost) AS subtotal,
+           array_agg(item_id ORDER BY item_id) AS item_ids,
+           jsonb_agg(item_name ORDER BY item_id) AS item_names
+    FROM import_split_items
+    GROUP BY order_id, user_id
+),
+per_order AS (
+    SELECT order_id, sum(subtotal) AS subtotal FROM per_user GROUP BY order_id
+)
+SELECT nextval(pg_get_serial_sequence('splits', 'id'))::int AS split_id, u.order_id, u.user_id, u.item_ids,
+       ROUND((u.subtotal + CASE WHEN t.subtotal > 0 THEN o.fees * u.subtotal / t.subtotal ELSE 0 END)::numeric, 2)
+           ::float8 AS amount_owed,
+       o.settled AS paid_status,
+       jsonb_build_object('restaurant', o.restaurant, 'items', u.item_names) AS reminder_payload,
+       o.paid_by_user_id
+FROM per_user u
+JOIN per_order t ON t.order_id = u.order_id
+JOIN import_orders o ON o.id = u.order_id;
+CREATE INDEX ON import_splits (order_id, user_id);
+ANALYZE import_splits;
+
+INSERT INTO splits (id, order_id, user_id, item_ids, amount_owed, paid_status, reminder_sent, reminder_payload)
+SELECT split_id, order_id, user_id, item_ids, amount_owed, paid_status, false, reminder_payload
+FROM import_splits;
+
+INSERT INTO split_items (split_id, item_id, share)
+SELECT s.split_id, si.item_id, si.share
+FROM import_split_items si
+JOIN import_splits s ON s.order_id = si.order_id AND s.user_id = si.user_id;
+"""
+
+# Unpaid splits add to the ledger exactly like apply_balance_deltas
+APPLY_BALANCES_SQL = """
+INSERT INTO balances (debtor_id, creditor_id, amount, updated_at)
+SELECT user_id, paid_by_user_id, ROUND(SUM(amount_owed)::numeric, 2), now() AT TIME ZONE 'utc'
+FROM import_splits
+WHERE NOT paid_status AND user_id <> paid_by_user_id
+GROUP BY user_id, paid_by_user_id
+ORDER BY user_id, paid_by_user_id
+ON CONFLICT (debtor_id, creditor_id) DO UPDATE
+SET amount = ROUND((balances.amount + excluded.amount)::numeric, 2), updated_at = excluded.updated_at
+"""
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+def content_key(order: schemas.ImportOrder) -> str:
+    """import_key for orders without an order_ref: a hash of what was imported"""
+    payload = json.dumps(order.model_dump(mode="json"), sort_keys=True, separators=(",", ":"))
+    return "sha1:" + hashlib.sha1(payload.encode()).hexdigest()
+
+
+# (line, order_ref, order, error): order is None when error is set
+ImportRow = Tuple[int, Optional[str], Optional[schemas.ImportOrder], Optional[str]]
+
+
+def _ndjson_order_ref(line: str) -> Optional[str]:
+    try:
+        ref = json.loads(line).get("order_ref")
+    except (ValueError, AttributeError):
+        return None
+    return str(ref) if ref is not None else None
+
+
+def read_ndjson(stream: IO[str]) -> Iterator[ImportRow]:
+    """Yield one row per non-empty line"""
+    for line_no, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            order = schemas.ImportOrder.model_validate_json(line)
+            yield line_no, order.order_ref, order, None
+        except ValidationError as e:
+            yield line_no, _ndjson_order_ref(line), None, _validation_message(e)
+
+
+def read_csv(stream: IO[str]) -> Iterator[ImportRow]:
+    """
+    Yield one row per CSV row. Each row is one item of the order
+    named in order_ref; rows without item_name add an order with no items.
+    user_ids is a ';'-separated list.
+    """
+    reader = csv.DictReader(stream)
+    missing = [c for c in ("order_ref", "restaurant", "total", "paid_by_user_id") if c not in (reader.fieldnames or [])]
+    if missing:
+        yield 1, None, None, f"missing columns: {', '.join(missing)}"
+        return
+
+    for row in reader:
+        line_no = reader.line_num
+        values = {k: (v.strip() if v and v.strip() else None) for k, v in row.items() if k}
+        if not values.get("order_ref"):
+            yield line_no, None, None, "order_ref: required for CSV imports"
+            continue
+
+        data = {k: values.get(k) for k in CSV_ORDER_COLUMNS if values.get(k) is not None}
+        data["items"] = []
+        if values.get("item_name"):
+            data["items"].append({
+                "name": values["item_name"],
+                "price": values.get("item_price"),
+                "quantity": values.get("item_quantity") or 1,
+                "user_ids": [u for u in (values.get("user_ids") or "").split(";") if u.strip()],
+            })
+        try:
+            yield line_no, values["order_ref"], schemas.ImportOrder.model_validate(data), None
+        except ValidationError as e:
+            yield line_no, values["order_ref"], None, _validation_message(e)
+
+
+def _staging_rows(line: int, key: str, order: schemas.ImportOrder, position_base: int):
+    date = order.date
+    if date is not None and date.tzinfo is not None:
+        # orders.date is naive UTC
+        date = date.astimezone(timezone.utc).replace(tzinfo=None)
+    order_values = (line, key, order.order_ref, order.restaurant, date, order.total, order.subtotal,
+                    order.tax, order.delivery_fee, order.tip, order.discount, order.paid_by_user_id, order.settled)
+    if not order.items:
+        yield order_values + (None, None, None, None, None)
+    for position, item in enumerate(order.items):
+        yield order_values + (position_base + position, item.name, item.price, item.quantity, item.user_ids)
+
+
+def import_orders(db: Session, stream: IO[str], fmt: str) -> dict:
+    """
+    Import orders from a text stream in "ndjson" or "csv" format and commit.
+
+    Returns a dict shaped like schemas.ImportReport. Invalid rows, and every
+    other row of the same order, are skipped and reported by line number, as
+    are NDJSON lines repeating an earlier line's order_ref (or content).
+    """
+    started = time.perf_counter()
+    reader = read_csv if fmt == "csv" else read_ndjson
+
+    errors: List[dict] = []
+    error_count = 0
+    rejected_keys = set()
+    # NDJSON import_key -> line it was first seen on (CSV repeats keys for each item row)
+    first_lines = {}
+    unkeyed_rejections = 0
+    rows_read = 0
+    timings = {}
+    last = started
+
+    def mark(phase: str):
+        nonlocal last
+        now = time.perf_counter()
+        timings[phase] = round(now - last, 2)
+        last = now
+
+    def add_error(line: int, order_ref: Optional[str], message: str):
+        nonlocal error_count
+        error_count += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line, "order_ref": order_ref, "error": message})
+
+    raw = db.connection().connection.driver_connection
+    with raw.cursor() as cur:
+        cur.execute(CREATE_STAGING_SQL)
+
+        # Stream validated rows into staging
+        columns = ", ".join(STAGING_COLUMNS)
+        with cur.copy(f"COPY import_rows ({columns}) FROM STDIN") as copy:
+            copy.set_types(STAGING_TYPES)
+            for line, order_ref, order, error in reader(stream):
+                rows_read += 1
+                if error is not None:
+                    add_error(line, order_ref, error)
+                    # Drop the rest of the order too
+                    if order_ref:
+                        rejected_keys.add(order_ref)
+                    else:
+                        unkeyed_rejections += 1
+                    continue
+                key = order.order_ref or content_key(order)
+                if fmt != "csv":
+                    # Later stages join rows by import_key, so a repeat would add its items
+                    # and splits to the first order; keep the first and reject the rest
+                    first = first_lines.setdefault(key, line)
+                    if first != line:
+                        add_error(line, order_ref, f"order_ref: already used on line {first}" if order_ref
+                                  else f"duplicate of the order on line {first}")
+                        unkeyed_rejections += 1
+                        continue
+                # CSV rows are one item each; the line number keeps them in file order
+                for row in _staging_rows(line, key, order, line if fmt == "csv" else 0):
+                    copy.write_row(row)
+
+        if rejected_keys:
+            with cur.copy("COPY import_rejected (import_key) FROM STDIN") as copy:
+                for key in rejected_keys:
+                    copy.write_row((key,))
+        cur.execute("CREATE INDEX ON import_rows (import_key); ANALYZE import_rows")
+        mark("stage")
+
+        for line, order_ref, message in cur.execute(REJECT_UNKNOWN_USERS_SQL).fetchall():
+            add_error(line, order_ref, message)
+
+        cur.execute("SELECT count(*) FROM import_rejected")
+        orders_rejected = cur.fetchone()[0] + unkeyed_rejections
+        cur.execute(
+            "SELECT count(DISTINCT r.import_key) FROM import_rows r "
+            "WHERE EXISTS (SELECT 1 FROM orders o WHERE o.import_key = r.import_key) "
+            "AND NOT EXISTS (SELECT 1 FROM import_rejected x WHERE x.import_key = r.import_key)"
+        )
+        orders_existing = cur.fetchone()[0]
+        mark("validate")
+
+        cur.execute(INSERT_ORDERS_SQL)
+        cur.execute("SELECT count(*) FROM import_orders")
+        orders_created = cur.fetchone()[0]
+        mark("orders")
+
+        cur.execute(INSERT_ITEMS_SQL)
+        cur.execute("SELECT count(*) FROM import_items")
+        items_created = cur.fetchone()[0]
+        mark("items")
+
+        cur.execute(INSERT_SPLITS_SQL)
+        cur.execute("SELECT count(*) FROM import_splits")
+        splits_created = cur.fetchone()[0]
+        mark("splits")
+
+        cur.execute(APPLY_BALANCES_SQL)
+        mark("balances")
+
+    db.commit()
+    mark("commit")
+
+    errors.sort(key=lambda e: e["line"])
+    return {
+        "rows_read": rows_read,
+        "orders_created": orders_created,
+        "orders_existing": orders_existing,
+        "orders_rejected": orders_rejected,
+        "items_created": items_created,
+        "splits_created": splits_created,
+        "error_count": error_count,
+        "errors": errors,
+        "seconds": round(time.perf_counter() - started, 2),
+        "timings": timings,
+    }
+
+
+if __name__ == "__main__":
+    # python -m services.import_service orders.ndjson [--format csv|ndjson]
+    import argparse
+    from database import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Import historical orders")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=["csv", "ndjson"], help="Default: from the file extension")
+    args = parser.parse_args()
+    fmt = args.format or ("csv" if args.path.endswith(".csv") else "ndjson")
+
+    session = SessionLocal()
+    try:
+        with open(args.path, newline="", encoding="utf-8") as f:
+            report = import_orders(session, f, fmt)
+    finally:
+        session.close()
+
+    print(f"✓ {report['orders_created']} orders, {report['items_created']} items, "
+          f"{report['splits_created']} splits created in {report['seconds']}s "
+          f"({report['orders_existing']} already imported, {report['orders_rejected']} rejected)")
+    for e in report["errors"][:50]:
+        print(f"  line {e['line']}{' (' + e['order_ref'] + ')' if e['order_ref'] else ''}: {e['error']}")
+    if report["error_count"] > 50:
+        print(f"  ... {report['error_count'] - 50} more errors")
@@ -1,12 +1,57 @@
+import asyncio
+import heapq
 import httpx
+import itertools
 import json
 import os
+import re
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, field_validator
 
 load_dotenv()
 
 LLM_API_URL = os.getenv("LLM_API_URL", "http://localhost:1234/v1/chat/completions")
+LLM_MODEL = os.getenv("LLM_MODEL", "liquid/lfm2.5-1.2b")
+
+# Requests sent to the model server at once. LM Studio / Ollama run one model,
+# so more than a couple in flight only makes every request slower.
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+# Timeout of the HTTP call itself, once a request has left the queue
+LLM_REQUEST_TIMEOUT_SECONDS = float(os.getenv("LLM_REQUEST_TIMEOUT_SECONDS", "30"))
+# Longest a request may wait in the queue, per priority
+LLM_MAX_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_QUEUE_WAIT_SECONDS", "60"))
+LLM_MAX_BATCH_QUEUE_WAIT_SECONDS = float(os.getenv("LLM_MAX_BATCH_QUEUE_WAIT_SECONDS", "600"))
+# Receipts per batched completion; 1 disables batching. Only for servers whose
+# /v1/completions accepts a list of prompts (vLLM, llama.cpp server).
+LLM_BATCH_SIZE = int(os.getenv("LLM_BATCH_SIZE", "1"))
+LLM_BATCH_WAIT_MS = float(os.getenv("LLM_BATCH_WAIT_MS", "20"))
+LLM_BATCH_API_URL = os.getenv("LLM_BATCH_API_URL", "")
+# Strip OCR noise before prompting (see preprocess_ocr_text)
+LLM_PREPROCESS = os.getenv("LLM_PREPROCESS", "true").lower() == "true"
+# Upper bound on completion tokens; each request asks for less, sized by max_tokens_for
+LLM_MAX_TOKENS = int(os.getenv("LLM_MAX_TOKENS", "2000"))
+# Ask the server to keep the KV cache of the static prompt prefix (llama.cpp's cache_prompt;
+# vLLM and Ollama cache prefixes on their own). Turn off for servers that reject unknown fields.
+LLM_PROMPT_CACHE = os.getenv("LLM_PROMPT_CACHE", "true").lower() == "true"
+
+# Lower runs first
+PRIORITY_INTERACTIVE = 0  # A user waiting on upload-receipt
+PRIORITY_BATCH = 10  # Background receipt jobs and imports
+
+# Queue timeouts allow this multiple of the expected wait before giving up
+QUEUE_WAIT_HEADROOM = 3.0
+# Starting estimate of one completion, until real ones have been timed
+INITIAL_SERVICE_SECONDS = 5.0
+# Samples kept for the queue-wait percentiles
+METRICS_WINDOW = 1000
+# Completion budget: the JSON scaffolding plus room for one item (or fee) per kept line
+MIN_COMPLETION_TOKENS = 256
+COMPLETION_TOKENS_BASE = 128
+COMPLETION_TOKENS_PER_LINE = 40
 
 
 class ReceiptItem(BaseModel):
@@ -33,6 +78,10 @@ class ParsedReceipt(BaseModel):
         return v
 
 
+class LLMQueueTimeout(Exception):
+    """The request waited too long for a free LLM slot (or would have)"""
+
+
 FILL_INVOICE_TOOL = {
     "type": "function",
     "function": {
@@ -71,65 +120,429 @@ FILL_INVOICE_TOOL = {
 }
 
 
-async def parse_receipt_text(ocr_text: str) -> dict:
-    """Parse OCR text using local LLM tool calling to extract structured receipt data."""
+# Lines worth sending to the LLM contain an amount: 12.50, 12,50, $3, 4 €, -1.00, or a number
+# ending the line ("Fries 4", "Cheeseburger 12.5")
+AMOUNT = r"-?\d+(?:[.,]\d{1,2})?"
+PRICE_RE = re.compile(rf"(\d+[.,]\d{{2}}\b)|([$€£]\s?{AMOUNT})|({AMOUNT}\s?[$€£])|({AMOUNT}\s*$)")
+# A line that is only an amount: OCR engines that return one line per text box (Surya)
+# put an item's price on its own line, after the line with its name
+PRICE_ONLY_RE = re.compile(rf"^[$€£]?\s?{AMOUNT}\s?[$€£]?$")
+TABLE_SEPARATOR_RE = re.compile(r"^\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?$")
+RULE_RE = re.compile(r"^[\s\-=_*#~.|]+$")
+MARKDOWN_RE = re.compile(r"(\*\*|__|`|^#+\s*|^>\s*)")
+# Non-price lines kept from the top of the receipt (the restaurant name)
+HEADER_LINES = 1
 
-    print(f"📨 Sending {len(ocr_text)} characters to LLM at {LLM_API_URL}")
 
-    try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            print("⏳ Waiting for LLM response...")
-            response = await client.post(
-                LLM_API_URL,
-                json={
-                    "model": "liquid/lfm2.5-1.2b",
-                    "messages": [
-                        {
-                            "role": "system",
-                            "content": (
-                                "You are a receipt parsing assistant. "
-                                "Extract all information from the receipt and call the fill_invoice tool "
-                                "with the structured data. Always call the tool — never reply with plain text."
-                            )
-                        },
-                        {
-                            "role": "user",
-                            "content": f"Parse this receipt:\n\n{ocr_text}"
-                        }
-                    ],
-                    "tools": [FILL_INVOICE_TOOL],
-                    "tool_choice": "required", # force tool choice
-                    "temperature": 0.1,
-                    "max_tokens": 2000
-                }
-            )
+def _clean_line(line: str) -> str:
+    line = MARKDOWN_RE.sub("", line.strip())
+    if line.startswith("|") or line.endswith("|"):
+        # Table row -> cells separated by " | "
+        line = " | ".join(cell.strip() for cell in line.strip("|").split("|"))
+    return " ".join(line.split())
+
+
+def preprocess_ocr_text(text: str) -> str:
+    """
+    Shrink OCR output to what the LLM needs: markdown and table syntax
+    removed, whitespace collapsed, and only lines with an amount kept, plus
+    the first line (the restaurant name), table header rows (column
+    meaning) and any line followed by a line holding just an amount (an item
+    name whose price OCR put on the next line). When no line has an amount,
+    the cleaned text is returned whole rather than dropping everything.
+    """
+    raw_lines = text.splitlines()
+    cleaned = []
+    for i, raw in enumerate(raw_lines):
+        stripped = raw.strip()
+        if not stripped or TABLE_SEPARATOR_RE.match(stripped) or RULE_RE.match(stripped):
+            continue
+        is_table_header = (stripped.startswith("|") and i + 1 < len(raw_lines)
+                           and TABLE_SEPARATOR_RE.match(raw_lines[i + 1].strip() or "x") is not None)
+        line = _clean_line(stripped)
+        if line:
+            cleaned.append((line, is_table_header))
+
+    if not any(PRICE_RE.search(line) for line, _ in cleaned):
+        return "\n".join(line for line, _ in cleaned)
+
+    kept = []
+    header_budget = HEADER_LINES
+    for i, (line, is_table_header) in enumerate(cleaned):
+        next_is_price = i + 1 < len(cleaned) and PRICE_ONLY_RE.match(cleaned[i + 1][0]) is not None
+        if PRICE_RE.search(line) or is_table_header or next_is_price:
+            kept.append(line)
+        elif header_budget > 0 and not kept:
+            kept.append(line)
+            header_budget -= 1
+    return "\n".join(kept)
+
+
+def max_tokens_for(text: str) -> int:
+    """Completion budget for a (preprocessed) receipt, from its line count"""
+    lines = text.count("\n") + 1
+    return max(MIN_COMPLETION_TOKENS, min(LLM_MAX_TOKENS, COMPLETION_TOKENS_BASE + COMPLETION_TOKENS_PER_LINE * lines))
+
+
+SYSTEM_PROMPT = (
+    "You are a receipt parsing assistant. "
+    "Extract all information from the receipt and call the fill_invoice tool "
+    "with the structured data. Always call the tool — never reply with plain text."
+)
+
+# Plain completions have no tools, so batched prompts ask for the tool's arguments as JSON.
+# Everything before the receipt is identical across requests so the server can reuse its KV cache.
+BATCH_PROMPT_PREFIX = (
+    "You are a receipt parsing assistant. Extract all information from the receipt below and "
+    "reply with only a JSON object matching this schema:\n"
+    + json.dumps(FILL_INVOICE_TOOL["function"]["parameters"], separators=(",", ":"))
+    + "\n\nReceipt:\n"
+)
+
+
+def batch_prompt(text: str) -> str:
+    return f"{BATCH_PROMPT_PREFIX}{text}\n\nJSON:"
+
+
+def chat_payload(ocr_text: str, max_tokens: int) -> dict:
+    """Chat completion request; the system prompt and tool come first and never change"""
+    payload = {
+        "model": LLM_MODEL,
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": f"Parse this receipt:\n\n{ocr_text}"},
+        ],
+        "tools": [FILL_INVOICE_TOOL],
+        "tool_choice": "required", # force tool choice
+        "temperature": 0.1,
+        "max_tokens": max_tokens,
+    }
+    if LLM_PROMPT_CACHE:
+        payload["cache_prompt"] = True
+    return payload
+
+
+def _parse_tool_arguments(raw_args) -> dict:
+    args = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
+    return ParsedReceipt(**args).model_dump()
+
+
+def _parse_json_reply(text: str) -> dict:
+    """First {...} object in a plain-completion reply"""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise Exception(f"LLM reply has no JSON object: {text[:200]}")
+    return _parse_tool_arguments(text[start:end + 1])
+
+
+def batch_api_url() -> str:
+    return LLM_BATCH_API_URL or LLM_API_URL.replace("/chat/completions", "/completions")
+
+
+@dataclass(order=True)
+class _Request:
+    priority: int
+    seq: int
+    ocr_text: str = field(compare=False)
+    future: asyncio.Future = field(compare=False)
+    enqueued_at: float = field(compare=False)
+    # The _execute task serving this request (and any batched with it), once dispatched
+    task: Optional[asyncio.Task] = field(default=None, compare=False)
+    batch: list = field(default_factory=list, compare=False)
+
+
+class LLMDispatcher:
+    """
+    Gatekeeper in front of the model server.
 
+    At most `concurrency` completions are in flight; the rest wait in a
+    priority queue, interactive requests ahead of batch work. When a request
+    is queued, its wait limit is derived from its position: the requests
+    ahead of it, in rounds of `concurrency`, times the average completion
+    time, with headroom. A request that is already expected to wait longer than the
+    maximum for its priority is refused straight away instead of timing out
+    later. With batch_size > 1, queued requests are sent together as one
+    batched completion.
+    """
+
+    def __init__(self, concurrency: int = LLM_CONCURRENCY, batch_size: int = LLM_BATCH_SIZE,
+                 batch_wait_ms: float = LLM_BATCH_WAIT_MS):
+        self.concurrency = max(1, concurrency)
+        self.batch_size = max(1, batch_size)
+        self.batch_wait = batch_wait_ms / 1000.0
+        self._queue: list[_Request] = []
+        self._seq = itertools.count()
+        self._active = 0
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._client: Optional[httpx.AsyncClient] = None
+        self.avg_service_seconds = INITIAL_SERVICE_SECONDS
+        self.stats = {"completed": 0, "failed": 0, "queue_timeouts": 0, "rejected": 0, "batches": 0,
+                      "batched_requests": 0, "prompt_tokens": 0, "cached_prompt_tokens": 0,
+                      "completion_tokens": 0, "truncated_retries": 0, "cancelled_queued": 0,
+                      "cancelled_in_flight": 0, "wasted": 0, "service_seconds": 0.0}
+        self._queue_waits = {PRIORITY_INTERACTIVE: deque(maxlen=METRICS_WINDOW),
+                             PRIORITY_BATCH: deque(maxlen=METRICS_WINDOW)}
+        self._tokens_per_second = deque(maxlen=METRICS_WINDOW)
+
+    def queue_timeout(self, priority: int) -> float:
+        """Queue wait allowed for a request enqueued now, or raise LLMQueueTimeout"""
+        ahead = self._active + sum(1 for r in self._queue if r.priority <= priority)
+        rounds = ahead // (self.concurrency * self.batch_size) + 1
+        expected = rounds * self.avg_service_seconds
+        limit = LLM_MAX_QUEUE_WAIT_SECONDS if priority <= PRIORITY_INTERACTIVE else LLM_MAX_BATCH_QUEUE_WAIT_SECONDS
+        if ahead >= self.concurrency and expected > limit:
+            self.stats["rejected"] += 1
+            raise LLMQueueTimeout(f"LLM busy: {ahead} requests ahead, ~{expected:.0f}s expected wait")
+        return min(limit, max(expected * QUEUE_WAIT_HEADROOM, LLM_REQUEST_TIMEOUT_SECONDS))
+
+    async def submit(self, ocr_text: str, priority: int = PRIORITY_INTERACTIVE) -> dict:
+        timeout = self.queue_timeout(priority)
+        loop = asyncio.get_running_loop()
+        request = _Request(priority, next(self._seq), ocr_text, loop.create_future(), time.monotonic())
+        heapq.heappush(self._queue, request)
+        self._ensure_running()
+        self._wakeup.set()
+
+        try:
+            try:
+                # The future only resolves once the completion is done; the timeout covers the queue part
+                await asyncio.wait_for(asyncio.shield(request.future), timeout=timeout)
+            except asyncio.TimeoutError:
+                if self._dequeue(request):
+                    self.stats["queue_timeouts"] += 1
+                    raise LLMQueueTimeout(f"LLM request waited {timeout:.0f}s in the queue")
+                # Already being served: the HTTP timeout bounds the rest
+                await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            self._cancel(request)
+            raise
+        return request.future.result()
+
+    def _dequeue(self, request: _Request) -> bool:
+        if request not in self._queue:
+            return False
+        self._queue.remove(request)
+        heapq.heapify(self._queue)
+        return True
+
+    def _cancel(self, request: _Request):
+        """The caller gave up: drop a queued request, or abort the HTTP call once nobody in its batch waits"""
+        if self._dequeue(request):
+            self.stats["cancelled_queued"] += 1
+            return
+        if request.future.done():
+            return
+        request.future.cancel()
+        if request.task is not None and all(r.future.cancelled() for r in request.batch):
+            self.stats["cancelled_in_flight"] += 1
+            request.task.cancel()
+
+    def _ensure_running(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._dispatch())
+
+    async def _dispatch(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._queue and self._active < self.concurrency:
+                if self.batch_size > 1 and len(self._queue) < self.batch_size and self.batch_wait:
+                    # Give concurrent arrivals a moment to join the batch
+                    await asyncio.sleep(self.batch_wait)
+                    if not self._queue:
+                        break
+                batch = [heapq.heappop(self._queue) for _ in range(min(self.batch_size, len(self._queue)))]
+                self._active += 1
+                task = asyncio.get_running_loop().create_task(self._execute(batch))
+                for request in batch:
+                    request.task, request.batch = task, batch
+
+    def _http(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=LLM_REQUEST_TIMEOUT_SECONDS)
+        return self._client
+
+    async def _execute(self, batch: list):
+        started = time.monotonic()
+        for request in batch:
+            self._queue_waits.setdefault(request.priority, deque(maxlen=METRICS_WINDOW)).append(
+                started - request.enqueued_at)
+        try:
+            if len(batch) == 1:
+                results, usage = await self._complete_one(batch[0].ocr_text)
+            else:
+                results, usage = await self._complete_batch([r.ocr_text for r in batch])
+            elapsed = time.monotonic() - started
+            self._record(elapsed, usage, len(batch))
+            for request, result in zip(batch, results):
+                if request.future.done():
+                    # Its caller gave up while the rest of the batch was still wanted
+                    self.stats["wasted"] += 1
+                elif isinstance(result, Exception):
+                    self.stats["failed"] += 1
+                    request.future.set_exception(result)
+                else:
+                    self.stats["completed"] += 1
+                    request.future.set_result(result)
+        except Exception as e:
+            self.stats["failed"] += len(batch)
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_exception(e)
+        finally:
+            self._active -= 1
+            self._wakeup.set()
+
+    def _record(self, elapsed: float, usage: dict, size: int):
+        # Moving average of the time one slot is busy
+        self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * elapsed
+        self.stats["service_seconds"] += elapsed
+        if size > 1:
+            self.stats["batches"] += 1
+            self.stats["batched_requests"] += size
+        self.stats["prompt_tokens"] += usage.get("prompt_tokens") or 0
+        # OpenAI-style usage; llama.cpp and vLLM report prefix-cache hits here
+        self.stats["cached_prompt_tokens"] += (usage.get("prompt_tokens_details") or {}).get("cached_tokens") or 0
+        tokens = usage.get("completion_tokens")
+        if tokens:
+            self.stats["completion_tokens"] += tokens
+            if elapsed > 0:
+                self._tokens_per_second.append(tokens / elapsed)
+
+    async def _complete_one(self, ocr_text: str):
+        max_tokens = max_tokens_for(ocr_text)
+        print(f"📨 Sending {len(ocr_text)} characters to LLM at {LLM_API_URL} (max_tokens={max_tokens})")
+        print("⏳ Waiting for LLM response...")
+        response = await self._http().post(LLM_API_URL, json=chat_payload(ocr_text, max_tokens))
+
+        if response.status_code != 200:
+            print(f"❌ LLM API returned status {response.status_code}")
+            raise Exception(f"LLM API error: {response.status_code} - {response.text}")
+
+        result = response.json()
+        choice = result["choices"][0]
+        message = choice["message"]
+        usage = result.get("usage") or {}
+        print("📬 Received LLM response")
+
+        if choice.get("finish_reason") == "length" and max_tokens < LLM_MAX_TOKENS:
+            # The budget was too small for this receipt; try once more with the full one
+            print(f"✂️  LLM reply cut off at {max_tokens} tokens, retrying with {LLM_MAX_TOKENS}")
+            self.stats["truncated_retries"] += 1
+            response = await self._http().post(LLM_API_URL, json=chat_payload(ocr_text, LLM_MAX_TOKENS))
             if response.status_code != 200:
-                print(f"❌ LLM API returned status {response.status_code}")
                 raise Exception(f"LLM API error: {response.status_code} - {response.text}")
-
             result = response.json()
             message = result["choices"][0]["message"]
-            print("📬 Received LLM response")
+            retry_usage = result.get("usage") or {}
+            usage = {k: (usage.get(k) or 0) + (retry_usage.get(k) or 0)
+                     for k in ("prompt_tokens", "completion_tokens")}
+
+        tool_calls = message.get("tool_calls")
+        if not tool_calls:
+            raise Exception(
+                "LLM did not call the fill_invoice tool. "
+                f"Response content: {(message.get('content') or '')[:200]}"
+            )
+
+        tool_call = tool_calls[0]
+        if tool_call["function"]["name"] != "fill_invoice":
+            raise Exception(f"Unexpected tool called: {tool_call['function']['name']}")
+
+        parsed = _parse_tool_arguments(tool_call["function"]["arguments"])
+        print("✅ Receipt validated successfully via fill_invoice tool")
+        return [parsed], usage
+
+    async def _complete_batch(self, texts: list):
+        url = batch_api_url()
+        print(f"📨 Sending a batch of {len(texts)} receipts to LLM at {url}")
+        payload = {
+            "model": LLM_MODEL,
+            "prompt": [batch_prompt(text) for text in texts],
+            "temperature": 0.1,
+            # Per prompt, so the longest receipt decides
+            "max_tokens": max(max_tokens_for(text) for text in texts),
+        }
+        if LLM_PROMPT_CACHE:
+            payload["cache_prompt"] = True
+        response = await self._http().post(url, json=payload)
+        if response.status_code != 200:
+            print(f"❌ LLM API returned status {response.status_code}")
+            raise Exception(f"LLM API error: {response.status_code} - {response.text}")
+
+        result = response.json()
+        results: list = [Exception("LLM batch reply is missing this receipt")] * len(texts)
+        for choice in result.get("choices", []):
+            index = choice.get("index", 0)
+            if 0 <= index < len(texts):
+                try:
+                    results[index] = _parse_json_reply(choice.get("text", ""))
+                except Exception as e:
+                    results[index] = e
+        print(f"📬 Received LLM batch response ({len(texts)} receipts)")
+        return results, result.get("usage") or {}
+
+    def metrics(self) -> dict:
+        def waits(priority):
+            ordered = sorted(self._queue_waits.get(priority, []))
+            if not ordered:
+                return {"samples": 0, "p50_ms": 0.0, "p95_ms": 0.0, "max_ms": 0.0}
+            pick = lambda pct: ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+            return {"samples": len(ordered), "p50_ms": round(pick(50) * 1000, 1),
+                    "p95_ms": round(pick(95) * 1000, 1), "max_ms": round(ordered[-1] * 1000, 1)}
+
+        recent_tps = list(self._tokens_per_second)
+        return {
+            "concurrency": self.concurrency,
+            "batch_size": self.batch_size,
+            "active": self._active,
+            "queued": {"interactive": sum(1 for r in self._queue if r.priority <= PRIORITY_INTERACTIVE),
+                       "batch": sum(1 for r in self._queue if r.priority > PRIORITY_INTERACTIVE)},
+            "queue_wait": {"interactive": waits(PRIORITY_INTERACTIVE), "batch": waits(PRIORITY_BATCH)},
+            "avg_service_ms": round(self.avg_service_seconds * 1000, 1),
+            "tokens_per_second": round(sum(recent_tps) / len(recent_tps), 1) if recent_tps else 0.0,
+            **self.stats,
+            "service_seconds": round(self.stats["service_seconds"], 2),
+        }
+
+
+# One dispatcher per event loop (the API has one; scripts may start several)
+_dispatchers: dict = {}
 
-            tool_calls = message.get("tool_calls")
-            if not tool_calls:
-                raise Exception(
-                    "LLM did not call the fill_invoice tool. "
-                    f"Response content: {message.get('content', '')[:200]}"
-                )
 
-            tool_call = tool_calls[0]
-            if tool_call["function"]["name"] != "fill_invoice":
-                raise Exception(f"Unexpected tool called: {tool_call['function']['name']}")
+def get_dispatcher() -> LLMDispatcher:
+    loop = asyncio.get_running_loop()
+    dispatcher = _dispatchers.get(loop)
+    if dispatcher is None:
+        for stale in [l for l in _dispatchers if l.is_closed()]:
+            del _dispatchers[stale]
+        dispatcher = _dispatchers[loop] = LLMDispatcher()
+    return dispatcher
 
-            raw_args = tool_call["function"]["arguments"]
-            args = json.loads(raw_args) if isinstance(raw_args, str) else raw_args
 
-            parsed = ParsedReceipt(**args)
-            print("✅ Receipt validated successfully via fill_invoice tool")
-            return parsed.model_dump()
+def llm_metrics() -> dict:
+    """Queue, wait time and throughput figures of this process's dispatcher"""
+    try:
+        return get_dispatcher().metrics()
+    except RuntimeError:  # No running loop
+        return LLMDispatcher().metrics()
+
 
+async def parse_receipt_text(ocr_text: str, priority: int = PRIORITY_INTERACTIVE) -> dict:
+    """
+    Parse OCR text using local LLM tool calling to extract structured receipt data.
+
+    Goes through the dispatcher, so it may wait for a free slot first;
+    batch work should pass priority=PRIORITY_BATCH.
+    """
+    if LLM_PREPROCESS:
+        ocr_text = preprocess_ocr_text(ocr_text)
+    try:
+        return await get_dispatcher().submit(ocr_text, priority)
+    except LLMQueueTimeout as e:
+        print(f"⏱️  {e}")
+        raise Exception(f"LLM parsing failed: {e}")
     except httpx.TimeoutException:
         error_msg = "LLM API timeout - is LM Studio running on localhost:1234?"
         print(f"⏱️  {error_msg}")
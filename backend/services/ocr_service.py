@@ -1,9 +1,28 @@
 from fastapi import UploadFile
 from PIL import Image, ImageDraw
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import io
 import os
 import base64
-from typing import Optional
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+# CPU inference profile. Read before torch/onnxruntime are imported below, since the OpenMP
+# pools size themselves at import. 0 / empty keeps the library defaults (every core).
+OCR_THREADS = int(os.getenv("OCR_THREADS", "0"))
+OCR_INTEROP_THREADS = int(os.getenv("OCR_INTEROP_THREADS", "0"))
+# Cores the OCR process is pinned to, e.g. "0-3" or "0,2,4,6"
+OCR_CPU_CORES = os.getenv("OCR_CPU_CORES", "")
+# int8 dynamic quantization of Surya's linear layers (CPU only)
+OCR_QUANTIZE = os.getenv("OCR_QUANTIZE", "false").lower() in ("1", "true", "yes")
+
+if OCR_THREADS:
+    for _var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ.setdefault(_var, str(OCR_THREADS))
 
 # Surya OCR v0.17+ API
 try:
@@ -14,6 +33,7 @@ try:
     SURYA_AVAILABLE = True
 except ImportError as e:
     SURYA_AVAILABLE = False
+    FoundationPredictor = DetectionPredictor = RecognitionPredictor = None  # type: ignore
     print(f"WARNING: Surya OCR not available - {str(e)}")
 
 # Docling OCR
@@ -21,16 +41,42 @@ try:
     from docling.document_converter import DocumentConverter, PdfFormatOption
     from docling.datamodel.base_models import InputFormat
     from docling.datamodel.pipeline_options import PdfPipelineOptions, RapidOcrOptions
+    try:
+        from docling.datamodel.accelerator_options import AcceleratorDevice, AcceleratorOptions
+    except ImportError:  # older docling
+        from docling.datamodel.pipeline_options import AcceleratorDevice, AcceleratorOptions
     DOCLING_AVAILABLE = True
 except ImportError as e:
     DOCLING_AVAILABLE = False
     DocumentConverter = None  # type: ignore
     print(f"WARNING: Docling OCR not available - {str(e)}")
 
-# Get OCR engine from environment (default: docling)
+# RapidOCR on its own (ships with Docling): fast, with a confidence score per line
+try:
+    from rapidocr import RapidOCR
+    RAPIDOCR_AVAILABLE = True
+except ImportError as e:
+    RAPIDOCR_AVAILABLE = False
+    RapidOCR = None  # type: ignore
+    print(f"WARNING: RapidOCR not available - {str(e)}")
+
+# Get OCR engine from environment (default: docling). "tiered" runs OCR_TIERS in order.
 OCR_ENGINE = os.getenv("OCR_ENGINE", "docling").lower()
 GLM_OCR_OLLAMA_URL = os.getenv("GLM_OCR_OLLAMA_URL", "http://localhost:11434")
 
+# Tiered mode: cheapest engine first, the next one only when the result looks wrong
+OCR_TIERS = [t.strip().lower() for t in os.getenv("OCR_TIERS", "rapidocr,surya").split(",") if t.strip()]
+# Escalate when any line with an amount on it was read with less confidence than this
+OCR_TIER_MIN_CONFIDENCE = float(os.getenv("OCR_TIER_MIN_CONFIDENCE", "0.8"))
+
+# OCR inference service (ocr_server.py). Unset runs OCR in this process, loading the models here.
+OCR_SERVICE_URL = os.getenv("OCR_SERVICE_URL", "").rstrip("/")
+# Must outlast the slowest engine (GLM-OCR allows 180s) plus time queued behind other workers' images
+OCR_SERVICE_TIMEOUT_SECONDS = float(os.getenv("OCR_SERVICE_TIMEOUT_SECONDS", "240"))
+OCR_SERVICE_CONNECT_TIMEOUT_SECONDS = float(os.getenv("OCR_SERVICE_CONNECT_TIMEOUT_SECONDS", "2"))
+# Retries when the service is unreachable, restarting or full (503); a timed out OCR is not retried
+OCR_SERVICE_RETRIES = int(os.getenv("OCR_SERVICE_RETRIES", "2"))
+
 # Global predictor instances for Surya
 foundation_predictor: Optional[FoundationPredictor] = None
 detection_predictor: Optional[DetectionPredictor] = None
@@ -39,6 +85,112 @@ recognition_predictor: Optional[RecognitionPredictor] = None
 # Global converter instance for Docling
 docling_converter: Optional = None
 
+# Global engine instance for RapidOCR
+rapidocr_engine: Optional = None
+
+# Predictor and converter calls run in worker threads; one at a time, since they share the models
+_model_lock = threading.Lock()
+# OCR calls whose caller had gone before they got the models (skipped) or while they ran (wasted)
+_cancel_stats = {"skipped": 0, "wasted": 0}
+
+
+class OCRCancelled(Exception):
+    """The caller stopped waiting before the OCR call got the models"""
+
+
+@contextmanager
+def _models(cancelled: Optional[threading.Event] = None):
+    """Hold the models for one OCR call, unless its caller has already given up"""
+    with _model_lock:
+        if cancelled is not None and cancelled.is_set():
+            _cancel_stats["skipped"] += 1
+            raise OCRCancelled("OCR request cancelled while waiting for the models")
+        yield
+        if cancelled is not None and cancelled.is_set():
+            _cancel_stats["wasted"] += 1
+
+
+async def _in_thread(func, *args):
+    """
+    Run a blocking OCR call in a worker thread. A running model call can't
+    be interrupted, but if the caller is cancelled while the call is still
+    waiting for the models, it is skipped.
+    """
+    cancelled = threading.Event()
+    try:
+        return await run_in_threadpool(func, *args, cancelled=cancelled)
+    except asyncio.CancelledError:
+        cancelled.set()
+        raise
+
+
+# Cores the process is currently pinned to by pin_to_cores
+_pinned_cores = ""
+
+
+def parse_cpu_list(spec: str) -> List[int]:
+    """"0-3,8" -> [0, 1, 2, 3, 8]"""
+    cores = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        first, _, last = part.partition("-")
+        cores.extend(range(int(first), int(last or first) + 1))
+    return cores
+
+
+def pin_to_cores(cores: str = OCR_CPU_CORES):
+    """
+    Pin every thread of this process to cores. On Linux sched_setaffinity(0)
+    only moves the calling thread, so each existing thread is pinned by id;
+    threads started afterwards (torch/OpenMP pools, threadpool workers)
+    inherit the mask of the thread that starts them.
+    """
+    global _pinned_cores
+    if not cores or not hasattr(os, "sched_setaffinity") or _pinned_cores == cores:
+        return
+    cpus = parse_cpu_list(cores)
+    try:
+        thread_ids = [int(tid) for tid in os.listdir("/proc/self/task")]
+    except OSError:
+        thread_ids = [0]
+    for tid in thread_ids:
+        try:
+            os.sched_setaffinity(tid, cpus)
+        except ProcessLookupError:
+            pass  # Thread exited in the meantime
+    _pinned_cores = cores
+    print(f"📌 OCR pinned to cores {cores}")
+
+
+def apply_cpu_profile(threads: int = OCR_THREADS, interop_threads: int = OCR_INTEROP_THREADS,
+                      cores: str = OCR_CPU_CORES):
+    """Pin this process to cores and size torch's thread pools; called before the models load"""
+    pin_to_cores(cores)
+    if not (threads or interop_threads):
+        return
+    try:
+        import torch
+    except ImportError:
+        return
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # Only allowed once, before any parallel work has run
+            print(f"WARNING: could not set OCR inter-op threads - {e}")
+    print(f"🧵 OCR torch threads: {torch.get_num_threads()} intra-op, {torch.get_num_interop_threads()} inter-op")
+
+
+def quantize_model(model):
+    """int8 dynamic quantization of a torch model's Linear layers; returns the model unchanged on failure"""
+    try:
+        import torch
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    except Exception as e:
+        print(f"WARNING: OCR quantization failed, keeping fp32 weights - {e}")
+        return model
+
 
 def initialize_surya_models():
     """Initialize Surya OCR predictors"""
@@ -51,8 +203,13 @@ def initialize_surya_models():
         print("Loading Surya OCR models... This may take a while on first run.")
         print("Models will be downloaded from Hugging Face (~2GB)...")
         try:
+            apply_cpu_profile()
             foundation_predictor = FoundationPredictor()
             detection_predictor = DetectionPredictor()
+            if OCR_QUANTIZE:
+                print("Quantizing Surya models to int8...")
+                foundation_predictor.model = quantize_model(foundation_predictor.model)
+                detection_predictor.model = quantize_model(detection_predictor.model)
             recognition_predictor = RecognitionPredictor(foundation_predictor)
             print("✓ Surya OCR models loaded successfully!")
         except Exception as e:
@@ -73,6 +230,12 @@ def initialize_docling_converter():
             pipeline_options = PdfPipelineOptions()
             pipeline_options.do_ocr = True
             pipeline_options.ocr_options = RapidOcrOptions(force_full_page_ocr=True)
+            apply_cpu_profile()
+            if OCR_THREADS:
+                # Docling also passes this to RapidOCR's onnxruntime session (intra_op_num_threads)
+                pipeline_options.accelerator_options = AcceleratorOptions(
+                    num_threads=OCR_THREADS, device=AcceleratorDevice.CPU
+                )
 
             docling_converter = DocumentConverter(
                 format_options={
@@ -86,6 +249,21 @@ def initialize_docling_converter():
             raise
 
 
+def initialize_rapidocr():
+    """Initialize the standalone RapidOCR engine"""
+    global rapidocr_engine
+
+    if not RAPIDOCR_AVAILABLE:
+        return
+
+    if rapidocr_engine is None:
+        print("Initializing RapidOCR...")
+        apply_cpu_profile()
+        params = {"EngineConfig.onnxruntime.intra_op_num_threads": OCR_THREADS} if OCR_THREADS else None
+        rapidocr_engine = RapidOCR(params=params)
+        print("✓ RapidOCR initialized successfully!")
+
+
 def generate_annotated_image(image: Image.Image, bboxes: list) -> str:
     """Draw bounding boxes on image and return as base64 JPEG data URL"""
     # Resize if too large to keep response payload manageable
@@ -117,46 +295,24 @@ def generate_annotated_image(image: Image.Image, bboxes: list) -> str:
     return f"data:image/jpeg;base64,{img_b64}"
 
 
-async def process_receipt_with_surya(image: Image.Image) -> dict:
-    """Process receipt image with Surya OCR, returning text and bounding boxes"""
-    if not SURYA_AVAILABLE:
-        raise RuntimeError("Surya OCR not available")
-
-    initialize_surya_models()
-
-    if image.mode != "RGB":
-        image = image.convert("RGB")
-
-    print("Running Surya OCR on image...")
-    task_names = [TaskNames.ocr_with_boxes]
-
-    predictions_by_image = recognition_predictor(
-        [image],
-        task_names=task_names,
-        det_predictor=detection_predictor,
-        math_mode=False,
-    )
-
+def _surya_result(image: Image.Image, prediction) -> dict:
     raw_text = ""
     total_confidence = 0.0
     line_count = 0
     bboxes = []
 
-    if predictions_by_image and len(predictions_by_image) > 0:
-        prediction = predictions_by_image[0]
-
-        if hasattr(prediction, "text_lines"):
-            for text_line in prediction.text_lines:
-                if hasattr(text_line, "text"):
-                    raw_text += text_line.text + "\n"
-                    line_count += 1
-                    if hasattr(text_line, "confidence"):
-                        total_confidence += text_line.confidence
-                    # Extract polygon points for visualization
-                    if hasattr(text_line, "polygon") and text_line.polygon:
-                        bboxes.append({"polygon": [[p[0], p[1]] for p in text_line.polygon]})
-                    elif hasattr(text_line, "bbox") and text_line.bbox:
-                        bboxes.append({"bbox": list(text_line.bbox)})
+    if hasattr(prediction, "text_lines"):
+        for text_line in prediction.text_lines:
+            if hasattr(text_line, "text"):
+                raw_text += text_line.text + "\n"
+                line_count += 1
+                if hasattr(text_line, "confidence"):
+                    total_confidence += text_line.confidence
+                # Extract polygon points for visualization
+                if hasattr(text_line, "polygon") and text_line.polygon:
+                    bboxes.append({"polygon": [[p[0], p[1]] for p in text_line.polygon]})
+                elif hasattr(text_line, "bbox") and text_line.bbox:
+                    bboxes.append({"bbox": list(text_line.bbox)})
 
     avg_confidence = total_confidence / line_count if line_count > 0 else 0.9
     result_text = raw_text.strip() if raw_text.strip() else "No text detected"
@@ -176,17 +332,95 @@ async def process_receipt_with_surya(image: Image.Image) -> dict:
     }
 
 
+def ocr_images_with_surya(images: List[Image.Image], cancelled: Optional[threading.Event] = None) -> List[dict]:
+    """Run Surya OCR on several images in one predictor call (blocking)"""
+    if not SURYA_AVAILABLE:
+        raise RuntimeError("Surya OCR not available")
+
+    images = [image.convert("RGB") if image.mode != "RGB" else image for image in images]
+
+    with _models(cancelled):
+        initialize_surya_models()
+        print(f"Running Surya OCR on {len(images)} image(s)...")
+        predictions_by_image = recognition_predictor(
+            images,
+            task_names=[TaskNames.ocr_with_boxes] * len(images),
+            det_predictor=detection_predictor,
+            math_mode=False,
+        )
+
+    predictions_by_image = list(predictions_by_image or [])
+    predictions_by_image += [None] * (len(images) - len(predictions_by_image))
+    return [_surya_result(image, prediction) for image, prediction in zip(images, predictions_by_image)]
+
+
+async def process_receipt_with_surya(image: Image.Image) -> dict:
+    """Process receipt image with Surya OCR, returning text and bounding boxes"""
+    results = await _in_thread(ocr_images_with_surya, [image])
+    return results[0]
+
+
+def _rows(boxes: list, texts: list, scores: list) -> List[tuple]:
+    """Group detected text boxes into rows (top to bottom, left to right) as (text, min score)"""
+    lines = []
+    for box, text, score in zip(boxes, texts, scores):
+        ys = [p[1] for p in box]
+        lines.append(((min(ys) + max(ys)) / 2, max(ys) - min(ys), min(p[0] for p in box), text, float(score)))
+    lines.sort()
+
+    rows = []
+    for y, height, x, text, score in lines:
+        if rows and abs(y - rows[-1]["y"]) <= max(height, rows[-1]["height"]) / 2:
+            rows[-1]["cells"].append((x, text, score))
+        else:
+            rows.append({"y": y, "height": height, "cells": [(x, text, score)]})
+    return [
+        ("  ".join(text for _, text, _ in sorted(row["cells"])), min(score for _, _, score in row["cells"]))
+        for row in rows
+    ]
+
+
+def ocr_image_with_rapidocr(contents: bytes, cancelled: Optional[threading.Event] = None) -> dict:
+    """Run RapidOCR on image bytes (blocking); confidence is the mean line score"""
+    if not RAPIDOCR_AVAILABLE:
+        raise RuntimeError("RapidOCR not available")
+
+    with _models(cancelled):
+        initialize_rapidocr()
+        print("Running RapidOCR on image...")
+        output = rapidocr_engine(contents)
+
+    boxes = [[[float(x), float(y)] for x, y in box] for box in (output.boxes if output.boxes is not None else [])]
+    rows = _rows(boxes, list(output.txts or []), list(output.scores or []))
+    raw_text = "\n".join(text for text, _ in rows)
+    confidence = sum(score for _, score in rows) / len(rows) if rows else 0.0
+
+    print(f"✓ RapidOCR completed. {len(rows)} lines, avg confidence: {confidence:.2f}")
+
+    return {
+        "raw_text": raw_text or "No text detected",
+        "confidence": confidence,
+        "line_confidences": [round(score, 4) for _, score in rows],
+        "fallback": False,
+        "lines_detected": len(rows),
+        "engine": "rapidocr",
+        "bboxes": [{"polygon": box} for box in boxes],
+        "annotated_image": None,
+    }
+
+
 async def process_receipt_with_docling(file_path: str) -> dict:
     """Process receipt image with Docling OCR"""
     if not DOCLING_AVAILABLE:
         raise RuntimeError("Docling OCR not available")
 
-    initialize_docling_converter()
-
-    print("Running Docling OCR on image...")
+    def convert(cancelled=None):
+        with _models(cancelled):
+            initialize_docling_converter()
+            print("Running Docling OCR on image...")
+            return docling_converter.convert(file_path).document.export_to_markdown()
 
-    result = docling_converter.convert(file_path)
-    raw_text = result.document.export_to_markdown()
+    raw_text = await _in_thread(convert)
 
     confidence = 0.95 if raw_text and len(raw_text.strip()) > 0 else 0.0
     result_text = raw_text.strip() if raw_text.strip() else "No text detected"
@@ -240,41 +474,23 @@ async def process_receipt_with_glm_ocr(image_bytes: bytes) -> dict:
 
 
 async def process_receipt_image(file: UploadFile) -> dict:
-    """Process receipt image with the configured OCR engine"""
-    try:
-        contents = await file.read()
-
-        if OCR_ENGINE == "surya":
-            if not SURYA_AVAILABLE:
-                print("WARNING: Surya OCR requested but not available, using fallback")
-                return get_fallback_result()
-            image = Image.open(io.BytesIO(contents))
-            return await process_receipt_with_surya(image)
+    """Process receipt image with the OCR service when configured, otherwise in this process"""
+    return await process_receipt_contents(await file.read(), getattr(file, "content_type", None))
 
-        elif OCR_ENGINE == "glm-ocr":
-            return await process_receipt_with_glm_ocr(contents)
 
-        elif OCR_ENGINE == "docling":
-            if not DOCLING_AVAILABLE:
-                print("WARNING: Docling OCR requested but not available, using fallback")
-                return get_fallback_result()
+async def process_receipt_contents(contents: bytes, content_type: Optional[str] = None) -> dict:
+    """Process receipt image bytes with the OCR service when configured, otherwise in this process"""
+    if OCR_SERVICE_URL:
+        return await process_receipt_with_service(contents, content_type)
+    return await process_receipt_bytes(contents)
 
-            import tempfile
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
-                tmp_file.write(contents)
-                tmp_path = tmp_file.name
-
-            try:
-                return await process_receipt_with_docling(tmp_path)
-            finally:
-                try:
-                    os.unlink(tmp_path)
-                except Exception:
-                    pass
 
-        else:
-            print(f"WARNING: Unknown OCR engine '{OCR_ENGINE}', using fallback")
-            return get_fallback_result()
+async def process_receipt_bytes(contents: bytes) -> dict:
+    """Process receipt image bytes with the configured OCR engine, in this process"""
+    try:
+        if OCR_ENGINE == "tiered":
+            return await process_receipt_tiered(contents)
+        return await run_engine(OCR_ENGINE, contents)
 
     except Exception as e:
         error_msg = f"OCR processing failed: {str(e)}"
@@ -282,14 +498,242 @@ async def process_receipt_image(file: UploadFile) -> dict:
         import traceback
         traceback.print_exc()
 
-        return {
-            "raw_text": "Error processing image. Please try again or enter receipt details manually.",
-            "confidence": 0.0,
-            "fallback": True,
-            "error": str(e),
-            "bboxes": [],
-            "annotated_image": None,
-        }
+        return get_error_result(str(e))
+
+
+async def run_engine(engine: str, contents: bytes) -> dict:
+    """Run one OCR engine on image bytes"""
+    if engine == "surya":
+        if not SURYA_AVAILABLE:
+            print("WARNING: Surya OCR requested but not available, using fallback")
+            return get_fallback_result()
+        image = Image.open(io.BytesIO(contents))
+        return await process_receipt_with_surya(image)
+
+    elif engine == "glm-ocr":
+        return await process_receipt_with_glm_ocr(contents)
+
+    elif engine == "rapidocr":
+        if not RAPIDOCR_AVAILABLE:
+            print("WARNING: RapidOCR requested but not available, using fallback")
+            return get_fallback_result()
+        return await _in_thread(ocr_image_with_rapidocr, contents)
+
+    elif engine == "docling":
+        if not DOCLING_AVAILABLE:
+            print("WARNING: Docling OCR requested but not available, using fallback")
+            return get_fallback_result()
+
+        import tempfile
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as tmp_file:
+            tmp_file.write(contents)
+            tmp_path = tmp_file.name
+
+        try:
+            return await process_receipt_with_docling(tmp_path)
+        finally:
+            try:
+                os.unlink(tmp_path)
+            except Exception:
+                pass
+
+    else:
+        print(f"WARNING: Unknown OCR engine '{engine}', using fallback")
+        return get_fallback_result()
+
+
+# Two decimals, with or without thousands separators: 12.50, 1234,50, 1,234.56, 1.234,56
+AMOUNT_RE = re.compile(r"(-?)\s*[$€£]?\s*(?<!\d)(\d{1,3}(?:[.,]\d{3})+[.,]\d{2}|\d{1,6}[.,]\d{2})(?!\d)")
+# Summary lines by label; checked in this order, so "subtotal" wins over "total"
+SUMMARY_LABELS = [
+    ("subtotal", re.compile(r"sub\s*-?\s*total", re.I)),
+    ("total", re.compile(r"total|amount due|balance due", re.I)),
+    ("discount", re.compile(r"discount|promo|coupon|voucher", re.I)),
+    ("tax", re.compile(r"\btax|\bvat\b|\bgst\b", re.I)),
+    ("tip", re.compile(r"\btip\b|gratuity", re.I)),
+    ("fee", re.compile(r"\bfee\b|delivery|service charge", re.I)),
+]
+# Rounding slack when comparing sums, per amount added up
+ARITHMETIC_TOLERANCE = 0.01
+
+
+def parse_amount(value: str) -> float:
+    """An AMOUNT_RE amount as a number; the last separator is the decimal point"""
+    return float(re.sub(r"[.,]", "", value[:-3]) + "." + value[-2:])
+
+
+def receipt_arithmetic_ok(text: str) -> bool:
+    """
+    Whether the amounts in OCR text add up: item lines (every line with an
+    amount before the first summary line) sum to the subtotal, and subtotal
+    + tax + fees + tip - discount equals the total. A receipt without a
+    readable total fails.
+    """
+    items, summary = [], {}
+    for line in text.splitlines():
+        amounts = AMOUNT_RE.findall(line)
+        if not amounts:
+            continue
+        sign, value = amounts[-1]
+        amount = parse_amount(value)
+        label = next((name for name, pattern in SUMMARY_LABELS if pattern.search(line)), None)
+        if label is None:
+            if not summary:
+                items.append(-amount if sign else amount)
+        elif label not in summary:
+            summary[label] = amount
+            if label == "total":
+                break
+
+    if "total" not in summary or not (items or "subtotal" in summary):
+        return False
+    subtotal = summary.get("subtotal", sum(items))
+    if items and "subtotal" in summary and abs(sum(items) - subtotal) > ARITHMETIC_TOLERANCE * len(items) + 0.005:
+        return False
+    charges = [subtotal] + [summary.get(k, 0.0) for k in ("tax", "fee", "tip")] + [-summary.get("discount", 0.0)]
+    return abs(sum(charges) - summary["total"]) <= ARITHMETIC_TOLERANCE * len(charges) + 0.005
+
+
+def escalation_reason(result: dict) -> Optional[str]:
+    """Why a tier's result shouldn't be trusted, or None if it looks right"""
+    if result.get("fallback") or result.get("error"):
+        return "failed"
+    scores = result.get("line_confidences")
+    if scores:
+        lines = result["raw_text"].splitlines()
+        priced = [score for line, score in zip(lines, scores) if AMOUNT_RE.search(line)] or scores
+        if min(priced) < OCR_TIER_MIN_CONFIDENCE:
+            return "low_confidence"
+    elif result.get("confidence", 0.0) < OCR_TIER_MIN_CONFIDENCE:
+        return "low_confidence"
+    if not receipt_arithmetic_ok(result.get("raw_text", "")):
+        return "arithmetic"
+    return None
+
+
+_tier_stats = {"receipts": 0, "escalated": 0, "seconds": 0.0, "reasons": {}, "engines": {}}
+
+
+async def process_receipt_tiered(contents: bytes) -> dict:
+    """
+    Run OCR_TIERS in order and return the first result that passes
+    escalation_reason. The last tier's result is returned as is, unless it
+    failed outright and an earlier tier produced text.
+    """
+    tiers, best = [], None
+    for index, engine in enumerate(OCR_TIERS):
+        started = time.perf_counter()
+        try:
+            result = await run_engine(engine, contents)
+        except Exception as e:
+            print(f"WARNING: {engine} OCR failed in tiered mode - {e}")
+            result = get_error_result(str(e))
+        elapsed = time.perf_counter() - started
+
+        engine_stats = _tier_stats["engines"].setdefault(engine, {"runs": 0, "seconds": 0.0})
+        engine_stats["runs"] += 1
+        engine_stats["seconds"] += elapsed
+        _tier_stats["seconds"] += elapsed
+
+        reason = escalation_reason(result)
+        tiers.append({"engine": engine, "seconds": round(elapsed, 3), "issue": reason})
+        if reason != "failed":
+            best = result
+        if reason is None or index == len(OCR_TIERS) - 1:
+            break
+        print(f"⤴️  OCR escalating from {engine} ({reason})")
+        _tier_stats["reasons"][reason] = _tier_stats["reasons"].get(reason, 0) + 1
+
+    _tier_stats["receipts"] += 1
+    if len(tiers) > 1:
+        _tier_stats["escalated"] += 1
+    result = best or result
+    return {**result, "tiers": tiers}
+
+
+def ocr_metrics() -> dict:
+    """Tiered OCR counts (escalation rate, reasons, engine seconds per receipt) and cancelled OCR calls"""
+    receipts = _tier_stats["receipts"]
+    return {
+        "engine": OCR_ENGINE,
+        "tiers": OCR_TIERS if OCR_ENGINE == "tiered" else [OCR_ENGINE],
+        "receipts": receipts,
+        "escalated": _tier_stats["escalated"],
+        "escalation_rate": round(_tier_stats["escalated"] / receipts, 4) if receipts else 0.0,
+        "escalation_reasons": dict(_tier_stats["reasons"]),
+        "avg_seconds_per_receipt": round(_tier_stats["seconds"] / receipts, 3) if receipts else 0.0,
+        "engines": {
+            engine: {"runs": s["runs"], "avg_seconds": round(s["seconds"] / s["runs"], 3)}
+            for engine, s in _tier_stats["engines"].items()
+        },
+        "cancelled_before_run": _cancel_stats["skipped"],
+        "wasted_runs": _cancel_stats["wasted"],
+    }
+
+
+async def get_ocr_metrics() -> dict:
+    """ocr_metrics() of whichever process runs OCR: the OCR service when configured, else this one"""
+    if not OCR_SERVICE_URL:
+        return ocr_metrics()
+    import httpx
+
+    async with httpx.AsyncClient(timeout=OCR_SERVICE_CONNECT_TIMEOUT_SECONDS) as client:
+        response = await client.get(f"{OCR_SERVICE_URL}/metrics")
+        response.raise_for_status()
+        return response.json()
+
+
+async def process_receipt_with_service(contents: bytes, content_type: Optional[str] = None) -> dict:
+    """Send the image to the OCR inference service (ocr_server.py), retrying while it is unavailable"""
+    import httpx
+
+    timeout = httpx.Timeout(OCR_SERVICE_TIMEOUT_SECONDS, connect=OCR_SERVICE_CONNECT_TIMEOUT_SECONDS)
+    headers = {"content-type": content_type or "application/octet-stream"}
+    error = None
+    async with httpx.AsyncClient(timeout=timeout) as client:
+        for attempt in range(OCR_SERVICE_RETRIES + 1):
+            delay = 0.5 * 2 ** attempt
+            try:
+                response = await client.post(f"{OCR_SERVICE_URL}/ocr", content=contents, headers=headers)
+            except (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError) as e:
+                error = f"OCR service unreachable: {type(e).__name__}: {e}"
+            except httpx.TimeoutException:
+                error = f"OCR service timed out after {OCR_SERVICE_TIMEOUT_SECONDS:.0f}s"
+                break
+            except httpx.TransportError as e:
+                # Connection dropped mid-request (ReadError, WriteError, ...), e.g. the service restarted
+                error = f"OCR service connection failed: {type(e).__name__}: {e}"
+            else:
+                if response.status_code == 200:
+                    try:
+                        return response.json()
+                    except ValueError:
+                        error = f"OCR service returned invalid JSON: {response.text[:200]}"
+                        break
+                if response.status_code not in (502, 503, 504):
+                    error = f"OCR service error: HTTP {response.status_code} {response.text[:200]}"
+                    break
+                error = f"OCR service unavailable: HTTP {response.status_code}"
+                delay = max(delay, float(response.headers.get("retry-after") or 0))
+
+            if attempt < OCR_SERVICE_RETRIES:
+                print(f"WARNING: {error}, retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    print(f"❌ {error}")
+    return get_error_result(error)
+
+
+def get_error_result(error: str) -> dict:
+    """Result returned when OCR fails, so the upload can continue with manual entry"""
+    return {
+        "raw_text": "Error processing image. Please try again or enter receipt details manually.",
+        "confidence": 0.0,
+        "fallback": True,
+        "error": error,
+        "bboxes": [],
+        "annotated_image": None,
+    }
 
 
 def get_fallback_result() -> dict:
@@ -0,0 +1,319 @@
+"""
+Background receipt processing.
+
+POST /api/receipt-jobs stores the upload in receipt_jobs and returns at once.
+Workers (RECEIPT_JOB_WORKERS per API process, or standalone with
+`python -m services.receipt_job_service`) claim queued jobs with
+FOR UPDATE SKIP LOCKED, run the same upload -> OCR -> LLM steps as
+upload-receipt and store the result on the job. A job holds a lease while it
+runs; if its worker dies the lease runs out and another worker retries it,
+up to RECEIPT_JOB_MAX_ATTEMPTS. A job still running shortly before its lease
+ends is cancelled and fails, so a slow job is never run twice at once. When a
+job has a callback_url the final state is POSTed there, if the URL's host is
+in RECEIPT_CALLBACK_ALLOWED_HOSTS or (with no allowlist) only resolves to
+public addresses.
+"""
+import asyncio
+import io
+import ipaddress
+import json
+import os
+import socket
+import uuid
+from typing import Optional
+from urllib.parse import urlparse
+
+import httpx
+from dotenv import load_dotenv
+from fastapi import UploadFile
+from sqlalchemy import func, literal_column, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers
+
+import models
+from services.llm_service import PRIORITY_BATCH, parse_receipt_text
+from services.ocr_service import process_receipt_image
+from services.storage_service import upload_image
+
+load_dotenv()
+
+# Concurrent jobs per process; 0 disables the in-process workers (run them separately)
+RECEIPT_JOB_WORKERS = int(os.getenv("RECEIPT_JOB_WORKERS", "2"))
+# Must outlast OCR (up to 180s with GLM-OCR) plus the LLM call (30s)
+RECEIPT_JOB_LEASE_SECONDS = int(os.getenv("RECEIPT_JOB_LEASE_SECONDS", "600"))
+RECEIPT_JOB_MAX_ATTEMPTS = int(os.getenv("RECEIPT_JOB_MAX_ATTEMPTS", "3"))
+# How often idle workers look for jobs enqueued by other processes
+RECEIPT_JOB_POLL_SECONDS = float(os.getenv("RECEIPT_JOB_POLL_SECONDS", "1"))
+# Comma-separated callback hosts; when set, only these are called (private ones included)
+RECEIPT_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv("RECEIPT_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+
+# Time left on the lease when a still-running job is cancelled, to record its failure
+LEASE_MARGIN_SECONDS = 30
+
+CALLBACK_TIMEOUT_SECONDS = 10.0
+CALLBACK_ATTEMPTS = 3
+
+TERMINAL_STATUSES = {"succeeded", "failed"}
+
+Job = models.ReceiptJob.__table__
+
+# Set when a job is enqueued in this process so idle workers don't wait for the next poll
+_wakeup = asyncio.Event()
+
+
+def _utcnow():
+    return func.timezone("utc", func.now())
+
+
+def create_job(db: Session, contents: bytes, filename: Optional[str], content_type: Optional[str],
+               callback_url: Optional[str] = None) -> models.ReceiptJob:
+    """Store an uploaded receipt as a queued job and commit"""
+    job = models.ReceiptJob(
+        id=uuid.uuid4().hex,
+        status="queued",
+        filename=filename,
+        content_type=content_type,
+        image_data=contents,
+        callback_url=callback_url,
+        attempts=0,
+    )
+    db.add(job)
+    db.commit()
+    _wakeup.set()
+    return job
+
+
+def get_job(engine: Engine, job_id: str) -> Optional[dict]:
+    """Job row without the image, or None"""
+    columns = [c for c in Job.c if c.name != "image_data"]
+    with engine.connect() as conn:
+        row = conn.execute(select(*columns).where(Job.c.id == job_id)).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def claim_next_job(engine: Engine) -> Optional[dict]:
+    """Lease the oldest queued job (or one whose lease ran out) to this worker"""
+    candidate = (
+        select(Job.c.id)
+        .where(Job.c.status.in_(["queued", "running"]),
+               (Job.c.status == "queued") | (Job.c.locked_until < _utcnow()))
+        .order_by(Job.c.created_at)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    stmt = (
+        update(Job)
+        .where(Job.c.id == candidate)
+        .values(status="running", attempts=Job.c.attempts + 1, started_at=_utcnow(),
+                locked_until=literal_column(f"timezone('utc', now()) + interval '{RECEIPT_JOB_LEASE_SECONDS} seconds'"))
+        .returning(Job.c.id, Job.c.filename, Job.c.content_type, Job.c.image_data, Job.c.attempts,
+                   Job.c.callback_url)
+    )
+    with engine.begin() as conn:
+        row = conn.execute(stmt).mappings().first()
+    return dict(row) if row is not None else None
+
+
+def _leased(job: dict):
+    """
+    The job is still running under this claim. Every claim bumps attempts, so
+    a worker whose lease ran out (and was reclaimed) no longer matches.
+    """
+    return (Job.c.id == job["id"]) & (Job.c.status == "running") & (Job.c.attempts == job["attempts"])
+
+
+def finish_job(engine: Engine, job: dict, status: str, result: Optional[dict] = None,
+               error: Optional[str] = None) -> bool:
+    """Record the outcome and drop the stored image; False if the lease was lost to another worker"""
+    with engine.begin() as conn:
+        finished = conn.execute(
+            update(Job).where(_leased(job))
+            .values(status=status, result=result, error=error, finished_at=_utcnow(),
+                    locked_until=None, image_data=None)
+        ).rowcount
+    return bool(finished)
+
+
+def requeue_job(engine: Engine, job: dict):
+    """Put a job back in the queue (worker shutting down mid-job); the attempt isn't counted"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(Job).where(_leased(job))
+            .values(status="queued", locked_until=None, attempts=func.greatest(Job.c.attempts - 1, 0))
+        )
+
+
+def set_callback_status(engine: Engine, job_id: str, callback_status: str):
+    with engine.begin() as conn:
+        conn.execute(update(Job).where(Job.c.id == job_id).values(callback_status=callback_status))
+
+
+def callback_url_error(url: str) -> Optional[str]:
+    """
+    Why a callback URL may not be called, or None if it may. Without an
+    allowlist, every address the host resolves to must be public, so a job
+    can't make the server POST to itself or its internal network.
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        return "callback_url must be an http(s) URL"
+    host = parsed.hostname.lower()
+    if RECEIPT_CALLBACK_ALLOWED_HOSTS:
+        return None if host in RECEIPT_CALLBACK_ALLOWED_HOSTS else f"callback host {host} is not allowed"
+    try:
+        infos = socket.getaddrinfo(host, parsed.port or 0, proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError, ValueError):
+        return f"callback host {host} does not resolve"
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if isinstance(address, ipaddress.IPv6Address) and address.ipv4_mapped:
+            address = address.ipv4_mapped
+        # Loopback, private, link-local (cloud metadata), shared and reserved ranges are all non-global
+        if not address.is_global or address.is_multicast:
+            return f"callback host {host} resolves to a non-public address"
+    return None
+
+
+async def process_job(job: dict) -> dict:
+    """Run OCR, LLM parsing and upload for a claimed job; same result as upload-receipt"""
+    def as_upload():
+        return UploadFile(io.BytesIO(job["image_data"]), filename=job["filename"] or "receipt.jpg",
+                          headers=Headers({"content-type": job["content_type"] or "image/jpeg"}))
+
+    ocr_result = await process_receipt_image(as_upload())
+    # Nobody is waiting on the response, so interactive uploads go first
+    parsed_data = await parse_receipt_text(ocr_result["raw_text"], priority=PRIORITY_BATCH)
+    # Uploaded last, so a job that fails or is cancelled never stores it
+    image_url = await upload_image(as_upload())
+    return {
+        "image_url": image_url,
+        "ocr_raw_text": ocr_result["raw_text"],
+        "ocr_confidence": ocr_result.get("confidence", 0),
+        "ocr_engine": ocr_result.get("engine", "unknown"),
+        "ocr_annotated_image": ocr_result.get("annotated_image"),
+        "ocr_bboxes": ocr_result.get("bboxes", []),
+        "parsed_data": parsed_data,
+    }
+
+
+async def deliver_callback(engine: Engine, job_id: str, callback_url: str):
+    """POST the job's final state to its callback URL, retrying with backoff"""
+    job = await run_in_threadpool(get_job, engine, job_id)
+    payload = json.loads(json.dumps({k: job[k] for k in ("id", "status", "result", "error")}, default=str))
+    # Checked again here: the host may resolve differently than when the job was created
+    error = await run_in_threadpool(callback_url_error, callback_url)
+    if error is not None:
+        print(f"❌ Callback for receipt job {job_id} refused: {error}")
+        await run_in_threadpool(set_callback_status, engine, job_id, error)
+        return
+    # Redirects aren't followed, so a checked host can't bounce the POST somewhere internal
+    async with httpx.AsyncClient(timeout=CALLBACK_TIMEOUT_SECONDS, follow_redirects=False) as client:
+        for attempt in range(CALLBACK_ATTEMPTS):
+            try:
+                response = await client.post(callback_url, json=payload)
+                if response.status_code < 300:
+                    await run_in_threadpool(set_callback_status, engine, job_id, "delivered")
+                    return
+                error = f"HTTP {response.status_code}"
+            except httpx.HTTPError as e:
+                error = f"{type(e).__name__}: {e}"
+            await asyncio.sleep(2 ** attempt)
+    print(f"❌ Callback for receipt job {job_id} failed: {error}")
+    await run_in_threadpool(set_callback_status, engine, job_id, error)
+
+
+async def run_job(engine: Engine, job: dict):
+    job_id = job["id"]
+    if job["attempts"] > RECEIPT_JOB_MAX_ATTEMPTS:
+        print(f"❌ Receipt job {job_id} gave up after {RECEIPT_JOB_MAX_ATTEMPTS} attempts")
+        finished = await run_in_threadpool(finish_job, engine, job, "failed",
+                                           error=f"Worker stopped while processing ({RECEIPT_JOB_MAX_ATTEMPTS} attempts)")
+    else:
+        print(f"⚙️  Processing receipt job {job_id} (attempt {job['attempts']})")
+        # Must end while the lease is still ours, or another worker would start the job again
+        timeout = max(RECEIPT_JOB_LEASE_SECONDS - LEASE_MARGIN_SECONDS, RECEIPT_JOB_LEASE_SECONDS / 2)
+        try:
+            result = await asyncio.wait_for(process_job(job), timeout)
+        except asyncio.CancelledError:
+            await run_in_threadpool(requeue_job, engine, job)
+            raise
+        except asyncio.TimeoutError:
+            print(f"❌ Receipt job {job_id} cancelled after {timeout:g}s")
+            finished = await run_in_threadpool(finish_job, engine, job, "failed",
+                                               error=f"Processing took longer than {timeout:g}s")
+        except Exception as e:
+            print(f"❌ Receipt job {job_id} failed: {e}")
+            finished = await run_in_threadpool(finish_job, engine, job, "failed", error=str(e))
+        else:
+            finished = await run_in_threadpool(finish_job, engine, job, "succeeded", result=result)
+            if finished:
+                print(f"✅ Receipt job {job_id} done")
+
+    if not finished:
+        # Another worker reclaimed the job after our lease ran out; its outcome (and callback) wins
+        print(f"WARNING: receipt job {job_id} lease expired before it finished, result discarded")
+        return
+    if job["callback_url"]:
+        await deliver_callback(engine, job_id, job["callback_url"])
+
+
+async def worker_loop(engine: Engine):
+    """Claim and run jobs one at a time until cancelled"""
+    while True:
+        try:
+            job = await run_in_threadpool(claim_next_job, engine)
+        except Exception as e:
+            print(f"WARNING: receipt job claim failed: {e}")
+            job = None
+        if job is None:
+            try:
+                await asyncio.wait_for(_wakeup.wait(), timeout=RECEIPT_JOB_POLL_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+            _wakeup.clear()
+            continue
+        try:
+            await run_job(engine, job)
+        except Exception as e:
+            # Keep the worker alive; the job's lease runs out and it is claimed again
+            print(f"WARNING: receipt job {job['id']} failed in its worker: {e}")
+
+
+def start_workers(engine: Engine, count: int = RECEIPT_JOB_WORKERS) -> list:
+    if count:
+        print(f"👷 Starting {count} receipt job workers")
+    return [asyncio.create_task(worker_loop(engine)) for _ in range(count)]
+
+
+async def stop_workers(tasks: list):
+    """Cancel workers; jobs they were running go back to the queue"""
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    # python -m services.receipt_job_service [--workers N]
+    import argparse
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Run receipt job workers")
+    parser.add_argument("--workers", type=int, default=RECEIPT_JOB_WORKERS or 1)
+    args = parser.parse_args()
+
+    async def main():
+        tasks = start_workers(engine, args.workers)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            await stop_workers(tasks)
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,250 @@
+"""
+Scheduled payment reminder sweeps.
+
+Every REMINDER_SWEEP_INTERVAL_SECONDS the scheduler looks for unpaid splits
+that were last reminded more than REMINDER_INTERVAL_HOURS ago (or never, once
+their order is that old). Each user with any gets one message listing all
+of them, and the splits are marked as reminded. Matches are read in keyset
+pages of REMINDER_SWEEP_BATCH ordered by (user_id, split id), which the
+partial index ix_splits_unpaid_keyset serves directly, so a user's splits
+arrive together and memory stays flat however many are due. No reminders go
+out during REMINDER_QUIET_HOURS; those splits go in the first sweep
+afterwards. A failed send is retried after REMINDER_RETRY_MINUTES, doubling
+with each failure in a row up to the reminder interval.
+
+Every API process runs the scheduler (when REMINDER_SWEEP_ENABLED), but a
+sweep only runs while holding a Postgres advisory lock, so one instance
+sweeps at a time and the others skip. It can also run on its own:
+`python -m services.reminder_service [--once] [--dry-run]`.
+"""
+import asyncio
+import os
+from datetime import datetime, time as clock, timedelta, timezone
+from typing import List, Optional, Tuple
+from zoneinfo import ZoneInfo
+
+from dotenv import load_dotenv
+from sqlalchemy import ARRAY, Integer, bindparam, text
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+
+from services.cache_service import response_cache
+from services.sms_service import send_reminder_digest
+
+load_dotenv()
+
+REMINDER_SWEEP_ENABLED = os.getenv("REMINDER_SWEEP_ENABLED", "false").lower() in ("1", "true", "yes")
+# How often the scheduler wakes up to look for due reminders
+REMINDER_SWEEP_INTERVAL_SECONDS = float(os.getenv("REMINDER_SWEEP_INTERVAL_SECONDS", "900"))
+# Cadence: an unpaid split is reminded again once its last reminder is this old
+REMINDER_INTERVAL_HOURS = float(os.getenv("REMINDER_INTERVAL_HOURS", "72"))
+REMINDER_SWEEP_BATCH = int(os.getenv("REMINDER_SWEEP_BATCH", "500"))
+# First retry delay after a failed send (e.g. a bad number); doubles per failure in a row
+REMINDER_RETRY_MINUTES = float(os.getenv("REMINDER_RETRY_MINUTES", "60"))
+# Local time window with no reminders, e.g. "22:00-08:00" (empty disables)
+REMINDER_QUIET_HOURS = os.getenv("REMINDER_QUIET_HOURS", "22:00-08:00")
+REMINDER_TIMEZONE = os.getenv("REMINDER_TIMEZONE", "UTC")
+
+# Arbitrary constant (next to migrate.MIGRATION_LOCK_ID) held for the length of a sweep
+REMINDER_SWEEP_LOCK_ID = 804_202
+
+DUE_SQL = text("""
+    SELECT s.id, s.user_id, s.order_id, s.amount_owed, s.reminder_payload,
+           u.name AS user_name, COALESCE(u.whatsapp_number, u.phone) AS user_phone,
+           o.restaurant, p.name AS payer_name, p.payment_handle
+    FROM splits s
+    JOIN orders o ON o.id = s.order_id
+    JOIN users u ON u.id = s.user_id
+    JOIN users p ON p.id = o.paid_by_user_id
+    WHERE s.paid_status = false
+      AND (s.reminder_sent_at < :cutoff OR (s.reminder_sent_at IS NULL AND o.date < :cutoff))
+      AND (s.reminder_retry_at IS NULL OR s.reminder_retry_at <= :now)
+      AND s.user_id <> o.paid_by_user_id
+      AND (s.user_id, s.id) > (:after_user, :after_id)
+    ORDER BY s.user_id, s.id
+    LIMIT :batch
+""")
+
+# Skips splits paid (or reminded by hand) since they were read
+MARK_SENT_SQL = text("""
+    UPDATE splits
+    SET reminder_sent = true, reminder_sent_at = :sent_at, message_sid = :message_sid,
+        reminder_failures = 0, reminder_retry_at = NULL
+    WHERE id = ANY(:split_ids) AND paid_status = false
+      AND (reminder_sent_at IS NULL OR reminder_sent_at < :cutoff)
+    RETURNING order_id
+""").bindparams(bindparam("split_ids", type_=ARRAY(Integer)))
+
+# Next attempt after retry * 2^(failures so far), capped at the reminder interval
+MARK_FAILED_SQL = text("""
+    UPDATE splits
+    SET reminder_failures = reminder_failures + 1,
+        reminder_retry_at = :now + LEAST(:retry_minutes * power(2, reminder_failures), :max_minutes)
+                                   * interval '1 minute'
+    WHERE id = ANY(:split_ids) AND paid_status = false
+""").bindparams(bindparam("split_ids", type_=ARRAY(Integer)))
+
+
+def parse_quiet_hours(value: str) -> Optional[Tuple[clock, clock]]:
+    """"22:00-08:00" or "22-8" -> (start, end); None when empty"""
+    if not value.strip():
+        return None
+
+    def parse(part: str) -> clock:
+        hours, _, minutes = part.strip().partition(":")
+        return clock(int(hours), int(minutes or 0))
+
+    start, end = value.split("-")
+    return parse(start), parse(end)
+
+
+def in_quiet_hours(now: datetime, quiet: Optional[Tuple[clock, clock]] = None,
+                   tz: str = REMINDER_TIMEZONE) -> bool:
+    """Whether now (UTC) falls in the quiet window, which may wrap past midnight"""
+    quiet = parse_quiet_hours(REMINDER_QUIET_HOURS) if quiet is None else quiet
+    if not quiet:
+        return False
+    start, end = quiet
+    local = now.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(tz)).time()
+    if start <= end:
+        return start <= local < end
+    return local >= start or local < end
+
+
+def _group_by_user(rows: list) -> List[list]:
+    groups: List[list] = []
+    for row in rows:
+        if groups and groups[-1][0].user_id == row.user_id:
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+    return groups
+
+
+def _send_digest(engine: Engine, splits: list, now: datetime, cutoff: datetime, stats: dict):
+    """One message for all of a user's due splits, then mark them reminded"""
+    first = splits[0]
+    debts = [
+        {
+            "payer_name": s.payer_name,
+            "restaurant": (s.reminder_payload or {}).get("restaurant", s.restaurant),
+            "amount": s.amount_owed,
+            "payment_method": s.payment_handle,
+        }
+        for s in splits
+    ]
+    result = send_reminder_digest(first.user_name, first.user_phone, debts)
+    if result["status"] != "sent":
+        # Still due, but skipped by sweeps until its retry time
+        with engine.begin() as conn:
+            conn.execute(MARK_FAILED_SQL, {
+                "now": now,
+                "retry_minutes": REMINDER_RETRY_MINUTES,
+                "max_minutes": REMINDER_INTERVAL_HOURS * 60,
+                "split_ids": [s.id for s in splits],
+            })
+        stats["failed"] += 1
+        print(f"⚠️  Reminder to user {first.user_id} failed: {result.get('error') or result.get('message')}")
+        return
+
+    with engine.begin() as conn:
+        order_ids = conn.execute(MARK_SENT_SQL, {
+            "sent_at": datetime.utcnow(),
+            "message_sid": result.get("message_sid"),
+            "split_ids": [s.id for s in splits],
+            "cutoff": cutoff,
+        }).scalars().all()
+    stats["sent"] += 1
+    for order_id in set(order_ids):
+        response_cache.invalidate_order(order_id, splits_only=True)
+
+
+def run_sweep(engine: Engine, dry_run: bool = False, now: Optional[datetime] = None) -> dict:
+    """
+    Send one consolidated reminder to every user with due splits. Returns
+    what was found and sent; skipped (ran=False) during quiet hours or while
+    another instance holds the sweep lock. dry_run counts without sending.
+    """
+    now = now or datetime.utcnow()
+    stats = {"ran": False, "quiet_hours": False, "batches": 0, "splits": 0, "users": 0, "sent": 0, "failed": 0}
+    if in_quiet_hours(now):
+        stats["quiet_hours"] = True
+        return stats
+
+    cutoff = now - timedelta(hours=REMINDER_INTERVAL_HOURS)
+    with engine.connect() as lock_conn:
+        if not lock_conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": REMINDER_SWEEP_LOCK_ID}).scalar():
+            return stats
+        lock_conn.commit()
+        stats["ran"] = True
+        try:
+            after = (0, 0)
+            pending: list = []  # The last user of a full page may continue on the next one
+            while True:
+                with engine.connect() as conn:
+                    rows = conn.execute(DUE_SQL, {"cutoff": cutoff, "now": now, "after_user": after[0],
+                                                  "after_id": after[1], "batch": REMINDER_SWEEP_BATCH}).all()
+                stats["batches"] += 1
+                stats["splits"] += len(rows)
+                groups = _group_by_user(pending + rows)
+                last_page = len(rows) < REMINDER_SWEEP_BATCH
+                pending = [] if last_page or not groups else groups.pop()
+                for splits in groups:
+                    stats["users"] += 1
+                    if not dry_run:
+                        _send_digest(engine, splits, now, cutoff, stats)
+                if last_page:
+                    break
+                after = (rows[-1].user_id, rows[-1].id)
+        finally:
+            lock_conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": REMINDER_SWEEP_LOCK_ID})
+            lock_conn.commit()
+
+    if stats["users"]:
+        print(f"🔔 Reminder sweep: {stats['splits']} due splits for {stats['users']} users, "
+              f"{stats['sent']} sent, {stats['failed']} failed{' (dry run)' if dry_run else ''}")
+    return stats
+
+
+async def scheduler_loop(engine: Engine, interval: float = REMINDER_SWEEP_INTERVAL_SECONDS):
+    """Sweep every interval seconds until cancelled"""
+    while True:
+        try:
+            # Sends are blocking Twilio calls, so the whole sweep runs off the event loop
+            await run_in_threadpool(run_sweep, engine)
+        except Exception as e:
+            print(f"WARNING: reminder sweep failed: {e}")
+        await asyncio.sleep(interval)
+
+
+def start_scheduler(engine: Engine, enabled: bool = REMINDER_SWEEP_ENABLED) -> list:
+    if not enabled:
+        return []
+    print(f"🔔 Reminder sweeps every {REMINDER_SWEEP_INTERVAL_SECONDS:g}s "
+          f"(cadence {REMINDER_INTERVAL_HOURS:g}h, quiet hours {REMINDER_QUIET_HOURS or 'off'})")
+    return [asyncio.create_task(scheduler_loop(engine))]
+
+
+async def stop_scheduler(tasks: list):
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+if __name__ == "__main__":
+    # python -m services.reminder_service [--once] [--dry-run]
+    import argparse
+    from database import engine
+
+    parser = argparse.ArgumentParser(description="Run scheduled payment reminder sweeps")
+    parser.add_argument("--once", action="store_true", help="Run one sweep and exit (e.g. from cron)")
+    parser.add_argument("--dry-run", action="store_true", help="Count due reminders without sending (implies --once)")
+    args = parser.parse_args()
+
+    if args.once or args.dry_run:
+        print(run_sweep(engine, dry_run=args.dry_run))
+    else:
+        try:
+            asyncio.run(scheduler_loop(engine))
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,94 @@
+from typing import List, Optional
+
+from sqlalchemy import exists, func, select
+from sqlalchemy import text as sql_text
+from sqlalchemy.orm import Query, Session, selectinload
+
+import models
+
+
+def contains_pattern(value: str) -> str:
+    """ILIKE pattern matching value anywhere, with LIKE wildcards escaped"""
+    escaped = value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+# When a search matches fewer orders than this, they are fetched through the
+# search index and sorted instead of walking the primary key (see search_orders)
+SPARSE_MATCH_LIMIT = 1000
+
+
+def _filtered(db: Session, restaurant: Optional[str], item: Optional[str], text: Optional[str]) -> Query:
+    query = db.query(models.Order)
+
+    if restaurant:
+        query = query.filter(models.Order.restaurant.ilike(contains_pattern(restaurant), escape="\\"))
+    if item:
+        query = query.filter(exists().where(
+            models.Item.order_id == models.Order.id,
+            models.Item.name.ilike(contains_pattern(item), escape="\\"),
+        ))
+    if text:
+        query = query.filter(models.Order.ocr_tsv.match(text, postgresql_regconfig="simple"))
+    return query
+
+
+def count_text_matches(db: Session, text: str, limit: int = SPARSE_MATCH_LIMIT) -> int:
+    """Orders whose OCR text matches, capped at limit, counted through the full-text index only"""
+    probe = _filtered(db, None, None, text).with_entities(models.Order.id).limit(limit).subquery()
+    savepoint = db.begin_nested()
+    try:
+        # Rolled back with the savepoint
+        db.execute(sql_text("SET LOCAL enable_seqscan = off"))
+        db.execute(sql_text("SET LOCAL enable_indexscan = off"))
+        return db.execute(select(func.count()).select_from(probe)).scalar()
+    finally:
+        savepoint.rollback()
+
+
+def build_search_query(
+    db: Session,
+    restaurant: Optional[str] = None,
+    item: Optional[str] = None,
+    text: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+    sparse: bool = False,
+) -> Query:
+    """Query for search_orders, exposed separately so the benchmark can EXPLAIN it"""
+    query = _filtered(db, restaurant, item, text).options(selectinload(models.Order.items))
+    # id + 0 can't use the primary key, so Postgres filters through the search index and sorts
+    order = (models.Order.id + 0) if sparse else models.Order.id
+    return query.order_by(order.desc()).offset(skip).limit(limit)
+
+
+def search_orders(
+    db: Session,
+    restaurant: Optional[str] = None,
+    item: Optional[str] = None,
+    text: Optional[str] = None,
+    skip: int = 0,
+    limit: int = 50,
+) -> List[models.Order]:
+    """
+    Find orders by restaurant, item name and/or words in the OCR output.
+
+    Postgres doesn't know how rare a search term is, so for newest-first
+    results it walks the primary key backwards until it has a page of
+    matches. That is instant for common terms and reads the whole table for
+    rare ones. For full-text searches a capped count through the GIN index
+    tells the two apart first, and rare terms are fetched via the index and
+    sorted. (Restaurant/item filters only narrow the text matches further.)
+
+    Args:
+        restaurant: Case-insensitive substring of the restaurant name (trigram index)
+        item: Case-insensitive substring of any item name on the order (trigram index)
+        text: Words that must all appear in the OCR text (full-text index)
+        skip: Offset for paging
+        limit: Page size
+
+    Returns:
+        Matching orders with items loaded, newest first
+    """
+    sparse = bool(text) and count_text_matches(db, text) < SPARSE_MATCH_LIMIT
+    return build_search_query(db, restaurant, item, text, skip, limit, sparse).all()
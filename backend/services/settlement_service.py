@@ -0,0 +1,130 @@
+import heapq
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+import models
+
+
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def net_balances(debts: Iterable[Tuple[int, int, float]]) -> Dict[int, int]:
+    """
+    Collapse pairwise debts into one net position per user.
+
+    Args:
+        debts: (debtor_id, creditor_id, amount) triples
+
+    Returns:
+        Dict of user_id -> net cents (positive = is owed money, negative = owes)
+    """
+    net: Dict[int, int] = defaultdict(int)
+    for debtor_id, creditor_id, amount in debts:
+        if debtor_id == creditor_id:
+            continue
+        cents = to_cents(amount)
+        net[debtor_id] -= cents
+        net[creditor_id] += cents
+    return {uid: cents for uid, cents in net.items() if cents != 0}
+
+
+def minimize_transfers(net: Dict[int, int]) -> List[Tuple[int, int, int]]:
+    """
+    Find a small set of transfers that settles every net position.
+
+    Finding the true minimum is NP-hard, so this pairs off debtors and
+    creditors with exactly matching amounts first (each such pair settles in
+    one transfer), then greedily matches the largest remaining debtor with the
+    largest remaining creditor using two heaps. The result never has more
+    than (users - 1) transfers and runs in O(n log n).
+
+    Args:
+        net: user_id -> net cents, as returned by net_balances (must sum to 0)
+
+    Returns:
+        List of (from_user_id, to_user_id, cents)
+    """
+    transfers: List[Tuple[int, int, int]] = []
+
+    # Exact matches: a debtor owing exactly what some creditor is owed
+    creditors_by_amount: Dict[int, List[int]] = defaultdict(list)
+    for uid, cents in sorted(net.items()):
+        if cents > 0:
+            creditors_by_amount[cents].append(uid)
+
+    debtors: List[Tuple[int, int]] = []
+    matched = set()
+    for uid, cents in sorted(net.items()):
+        if cents >= 0:
+            continue
+        candidates = creditors_by_amount.get(-cents)
+        if candidates:
+            creditor = candidates.pop()
+            matched.add(creditor)
+            transfers.append((uid, creditor, -cents))
+        else:
+            debtors.append((cents, uid))  # most negative first in a min-heap
+
+    creditors = [(-cents, uid) for uid, cents in net.items() if cents > 0 and uid not in matched]
+    heapq.heapify(debtors)
+    heapq.heapify(creditors)
+
+    while debtors and creditors:
+        debt, debtor = heapq.heappop(debtors)
+        credit, creditor = heapq.heappop(creditors)
+        amount = min(-debt, -credit)
+        transfers.append((debtor, creditor, amount))
+
+        if -debt > amount:
+            heapq.heappush(debtors, (debt + amount, debtor))
+        if -credit > amount:
+            heapq.heappush(creditors, (credit + amount, creditor))
+
+    return transfers
+
+
+def load_group_debts(db: Session, user_ids: Optional[List[int]] = None) -> List[Tuple[int, int, float]]:
+    """Outstanding pairwise debts from the balance ledger, restricted to a group of users"""
+    query = db.query(models.Balance.debtor_id, models.Balance.creditor_id, models.Balance.amount).filter(
+        models.Balance.amount > 0
+    )
+    if user_ids is not None:
+        query = query.filter(
+            models.Balance.debtor_id.in_(user_ids),
+            models.Balance.creditor_id.in_(user_ids),
+        )
+    return [(d, c, amount) for d, c, amount in query.all()]
+
+
+def build_settlement_plan(db: Session, user_ids: Optional[List[int]] = None) -> dict:
+    """Net a group's outstanding splits and compute the transfers that settle them"""
+    debts = load_group_debts(db, user_ids)
+    net = net_balances(debts)
+    transfers = minimize_transfers(net)
+
+    involved = set(net)
+    names = {}
+    if involved:
+        names = dict(db.query(models.User.id, models.User.name).filter(models.User.id.in_(involved)).all())
+
+    return {
+        "balances": [
+            {"user_id": uid, "name": names.get(uid, ""), "net": cents / 100}
+            for uid, cents in sorted(net.items(), key=lambda kv: kv[1])
+        ],
+        "transfers": [
+            {
+                "from_user_id": debtor,
+                "from_name": names.get(debtor, ""),
+                "to_user_id": creditor,
+                "to_name": names.get(creditor, ""),
+                "amount": cents / 100,
+            }
+            for debtor, creditor, cents in transfers
+        ],
+        "original_debt_count": len(debts),
+        "transfer_count": len(transfers),
+    }
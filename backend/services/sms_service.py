@@ -40,13 +40,6 @@ async def send_payment_reminder(
     Returns:
         Dict with status and message_sid
     """
-    if not twilio_client:
-        return {
-            "status": "error",
-            "message": "Twilio client not initialized",
-            "recipient": recipient_phone
-        }
-    
     # Format items list
     items_text = ", ".join(items) if items else "your order"
     
@@ -58,6 +51,78 @@ async def send_payment_reminder(
         f"Please pay via {payment_method}."
     )
     
+    return _send_sms(message_body, recipient_phone)
+
+
+async def send_settlement_reminder(
+    recipient_name: str,
+    recipient_phone: str,
+    payments: List[Dict]
+) -> Dict:
+    """
+    Send one consolidated reminder covering everything a user needs to pay
+    
+    Args:
+        recipient_name: Name of person who owes money
+        recipient_phone: Phone number to send SMS to
+        payments: List of dicts with payee_name, amount and payment_method
+    
+    Returns:
+        Dict with status and message_sid
+    """
+    total = sum(p["amount"] for p in payments)
+    lines = "\n".join(
+        f"- ${p['amount']:.2f} to {p['payee_name']} via {p.get('payment_method') or 'Cliq'}"
+        for p in payments
+    )
+    message_body = (
+        f"Hey {recipient_name}! 👋\n\n"
+        f"To settle up you owe ${total:.2f} in total:\n"
+        f"{lines}"
+    )
+    
+    return _send_sms(message_body, recipient_phone)
+
+
+def send_reminder_digest(
+    recipient_name: str,
+    recipient_phone: str,
+    debts: List[Dict]
+) -> Dict:
+    """
+    Send one message listing every unpaid split of a user (used by the reminder sweep)
+    
+    Args:
+        recipient_name: Name of person who owes money
+        recipient_phone: Phone number to send SMS to
+        debts: List of dicts with payer_name, restaurant, amount and payment_method
+    
+    Returns:
+        Dict with status and message_sid
+    """
+    total = sum(d["amount"] for d in debts)
+    lines = "\n".join(
+        f"- ${d['amount']:.2f} to {d['payer_name']} for {d['restaurant']} (via {d.get('payment_method') or 'Cliq'})"
+        for d in debts
+    )
+    message_body = (
+        f"Hey {recipient_name}! 👋\n\n"
+        f"Friendly reminder, you still owe ${total:.2f}:\n"
+        f"{lines}"
+    )
+    
+    return _send_sms(message_body, recipient_phone)
+
+
+def _send_sms(message_body: str, recipient_phone: str) -> Dict:
+    """Send an SMS through Twilio and return a status dict"""
+    if not twilio_client:
+        return {
+            "status": "error",
+            "message": "Twilio client not initialized",
+            "recipient": recipient_phone
+        }
+    
     try:
         # Build message parameters
         message_params = {
@@ -1,8 +1,13 @@
 import boto3
 from botocore.client import Config
+from botocore.exceptions import ClientError
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import UploadFile
+import io
 import os
 from dotenv import load_dotenv
+from PIL import Image, ImageOps
+from typing import Callable, Optional, Tuple
 import uuid
 
 load_dotenv()
@@ -11,6 +16,24 @@ S3_ENDPOINT = os.getenv("S3_ENDPOINT", "http://localhost:9000")
 S3_ACCESS_KEY = os.getenv("S3_ACCESS_KEY", "minioadmin")
 S3_SECRET_KEY = os.getenv("S3_SECRET_KEY", "minioadmin")
 S3_BUCKET = os.getenv("S3_BUCKET", "receipts")
+# Address browsers use to reach S3 for presigned uploads, if not S3_ENDPOINT (e.g. the API runs in docker)
+S3_PUBLIC_ENDPOINT = os.getenv("S3_PUBLIC_ENDPOINT") or S3_ENDPOINT
+PRESIGNED_UPLOAD_EXPIRES_SECONDS = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES_SECONDS", "600"))
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(10 * 1024 * 1024)))
+
+# Presigned uploads go under this prefix; process-receipt only reads keys inside it
+UPLOAD_PREFIX = "uploads/"
+
+# WebP thumbnail and mid-resolution copy of each receipt, made in the background once its order is saved
+IMAGE_DERIVATIVES = os.getenv("IMAGE_DERIVATIVES", "true").lower() in ("1", "true", "yes")
+IMAGE_DERIVATIVE_WORKERS = int(os.getenv("IMAGE_DERIVATIVE_WORKERS", "2"))
+THUMBNAIL_MAX_SIDE = int(os.getenv("THUMBNAIL_MAX_SIDE", "320"))
+MEDIUM_MAX_SIDE = int(os.getenv("MEDIUM_MAX_SIDE", "1280"))
+WEBP_QUALITY = int(os.getenv("WEBP_QUALITY", "80"))
+# Move originals here once the derivatives exist (e.g. "cold/", with a bucket lifecycle rule
+# moving that prefix to cheaper storage). Empty keeps originals where they are.
+S3_COLD_PREFIX = os.getenv("S3_COLD_PREFIX", "")
+DERIVED_PREFIX = "derived/"
 
 # Initialize S3 client for Garage S3
 s3_client = boto3.client(
@@ -21,6 +44,15 @@ s3_client = boto3.client(
     config=Config(signature_version='s3v4')
 )
 
+# Presigned URLs are signed for the host the browser will use; signing doesn't call S3
+presign_client = s3_client if S3_PUBLIC_ENDPOINT == S3_ENDPOINT else boto3.client(
+    's3',
+    endpoint_url=S3_PUBLIC_ENDPOINT,
+    aws_access_key_id=S3_ACCESS_KEY,
+    aws_secret_access_key=S3_SECRET_KEY,
+    config=Config(signature_version='s3v4')
+)
+
 def ensure_bucket_exists():
     """Ensure the S3 bucket exists"""
     try:
@@ -57,3 +89,155 @@ async def upload_image(file: UploadFile) -> str:
         
     except Exception as e:
         raise Exception(f"Failed to upload image: {str(e)}")
+
+
+def object_url(key: str) -> str:
+    """URL stored for an uploaded image, same form as upload_image returns"""
+    return f"{S3_ENDPOINT}/{S3_BUCKET}/{key}"
+
+
+def create_presigned_upload(filename: Optional[str], content_type: str) -> dict:
+    """
+    Presigned POST (form fields, size-limited) and PUT URLs for uploading one
+    receipt image straight to S3 under a new key.
+    """
+    ensure_bucket_exists()
+    file_extension = filename.rsplit('.', 1)[-1].lower() if filename and '.' in filename else 'jpg'
+    key = f"{UPLOAD_PREFIX}{uuid.uuid4()}.{file_extension}"
+
+    post = presign_client.generate_presigned_post(
+        Bucket=S3_BUCKET,
+        Key=key,
+        Fields={"Content-Type": content_type},
+        Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, MAX_UPLOAD_BYTES]],
+        ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+    )
+    put_url = presign_client.generate_presigned_url(
+        "put_object",
+        Params={"Bucket": S3_BUCKET, "Key": key, "ContentType": content_type},
+        ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+    )
+    return {
+        "key": key,
+        "url": post["url"],
+        "fields": post["fields"],
+        "put_url": put_url,
+        "expires_in": PRESIGNED_UPLOAD_EXPIRES_SECONDS,
+        "max_bytes": MAX_UPLOAD_BYTES,
+    }
+
+
+def get_uploaded_object(key: str) -> Optional[Tuple[bytes, str]]:
+    """(bytes, content type) of an uploaded object, or None if it doesn't exist. Raises ValueError if too large."""
+    try:
+        obj = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("NoSuchKey", "404"):
+            return None
+        raise
+    # A presigned PUT can't enforce a size limit, so check before reading it into memory
+    if obj.get("ContentLength", 0) > MAX_UPLOAD_BYTES:
+        obj["Body"].close()
+        raise ValueError(f"Uploaded image is larger than {MAX_UPLOAD_BYTES} bytes")
+    return obj["Body"].read(), obj.get("ContentType") or "image/jpeg"
+
+
+def key_from_url(url: Optional[str]) -> Optional[str]:
+    """Object key of a URL from object_url/upload_image, or None for images stored elsewhere"""
+    prefix = object_url("")
+    if not url or not url.startswith(prefix) or len(url) == len(prefix):
+        return None
+    return url[len(prefix):]
+
+
+def derivative_keys(key: str) -> dict:
+    """Deterministic keys of an original's derivatives, so regenerating overwrites instead of adding"""
+    stem = key.rsplit('.', 1)[0]
+    if S3_COLD_PREFIX and stem.startswith(S3_COLD_PREFIX):
+        stem = stem[len(S3_COLD_PREFIX):]
+    return {
+        "thumbnail": f"{DERIVED_PREFIX}{stem}/thumb.webp",
+        "medium": f"{DERIVED_PREFIX}{stem}/medium.webp",
+    }
+
+
+def encode_webp(image: Image.Image, max_side: int) -> bytes:
+    """Image scaled down to fit max_side x max_side (never up), as WebP"""
+    copy = image.copy()
+    copy.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    copy.save(buffer, format="WEBP", quality=WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def create_derivatives(key: str) -> dict:
+    """
+    Store the thumbnail and medium WebP copies of an uploaded original and,
+    with S3_COLD_PREFIX set, move the original there. Returns the URLs to
+    record on the order: thumbnail_url, medium_url and image_url.
+    """
+    source = key
+    try:
+        obj = s3_client.get_object(Bucket=S3_BUCKET, Key=key)
+    except ClientError as e:
+        # Already moved by an earlier run that didn't get to record it
+        if not S3_COLD_PREFIX or e.response.get("Error", {}).get("Code") not in ("NoSuchKey", "404"):
+            raise
+        source = f"{S3_COLD_PREFIX}{key}"
+        obj = s3_client.get_object(Bucket=S3_BUCKET, Key=source)
+    original = obj["Body"].read()
+
+    image = ImageOps.exif_transpose(Image.open(io.BytesIO(original)))
+    if image.mode not in ("RGB", "RGBA", "L"):
+        image = image.convert("RGB")
+
+    keys = derivative_keys(key)
+    sizes = {"thumbnail": THUMBNAIL_MAX_SIDE, "medium": MEDIUM_MAX_SIDE}
+    stored = {}
+    for name, derived_key in keys.items():
+        body = encode_webp(image, sizes[name])
+        s3_client.put_object(
+            Bucket=S3_BUCKET,
+            Key=derived_key,
+            Body=body,
+            ContentType="image/webp",
+            CacheControl="public, max-age=31536000, immutable",
+        )
+        stored[name] = len(body)
+
+    if S3_COLD_PREFIX and source == key and not key.startswith(S3_COLD_PREFIX):
+        source = f"{S3_COLD_PREFIX}{key}"
+        s3_client.copy_object(Bucket=S3_BUCKET, Key=source, CopySource={"Bucket": S3_BUCKET, "Key": key})
+        s3_client.delete_object(Bucket=S3_BUCKET, Key=key)
+
+    print(f"🖼️  Derivatives for {key}: {len(original)} bytes -> thumbnail {stored['thumbnail']}, "
+          f"medium {stored['medium']} bytes")
+    return {
+        "thumbnail_url": object_url(keys["thumbnail"]),
+        "medium_url": object_url(keys["medium"]),
+        "image_url": object_url(source),
+    }
+
+
+# At most IMAGE_DERIVATIVE_WORKERS images are decoded and encoded at once; the rest wait their turn
+_derivative_executor = ThreadPoolExecutor(max_workers=max(1, IMAGE_DERIVATIVE_WORKERS),
+                                          thread_name_prefix="image-derivatives")
+
+
+def schedule_derivatives(image_url: Optional[str], on_done: Callable[[dict], None]):
+    """
+    Create an image's derivatives in the background and pass their URLs to
+    on_done. Does nothing for images that aren't in our bucket, or already
+    derived ones.
+    """
+    key = key_from_url(image_url)
+    if not IMAGE_DERIVATIVES or key is None or key.startswith(DERIVED_PREFIX):
+        return None
+
+    def run():
+        try:
+            on_done(create_derivatives(key))
+        except Exception as e:
+            print(f"⚠️  Could not create derivatives for {key}: {e}")
+
+    return _derivative_executor.submit(run)
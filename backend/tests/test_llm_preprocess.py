@@ -0,0 +1,48 @@
+"""
+Tests for OCR text preprocessing before the LLM call
+Usage: uv run python -m pytest tests/test_llm_preprocess.py  (or: uv run python tests/test_llm_preprocess.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.llm_service import preprocess_ocr_text
+
+
+def test_markdown_table_keeps_priced_rows_and_header():
+    text = "## Pizza Palace\n\n| Item | Qty | Price |\n|---|---|---|\n| Pepperoni Pizza | 1 | 12.50 |\nThank you!"
+    assert preprocess_ocr_text(text) == "Pizza Palace\nItem | Qty | Price\nPepperoni Pizza | 1 | 12.50"
+
+
+def test_name_and_price_on_separate_lines():
+    # Surya returns one line per text box
+    assert preprocess_ocr_text("Cheeseburger\n12.50") == "Cheeseburger\n12.50"
+    text = "Burger Barn\nOrder #12 - thanks!\nCheeseburger\n2\n$12.50\nFries\n3.00\nHave a nice day\nTotal\n$15.50"
+    assert preprocess_ocr_text(text) == "Burger Barn\nCheeseburger\n2\n$12.50\nFries\n3.00\nTotal\n$15.50"
+
+
+def test_prices_without_two_decimals():
+    assert preprocess_ocr_text("Cheeseburger 12.5\nFries 4") == "Cheeseburger 12.5\nFries 4"
+    assert preprocess_ocr_text("Noodle Bar\nPad Thai $12.5 each\nCome back soon") == "Noodle Bar\nPad Thai $12.5 each"
+    assert preprocess_ocr_text("Kaffee 3,5 € x2\nDanke") == "Kaffee 3,5 € x2"
+
+
+def test_text_without_amounts_is_kept_whole():
+    assert preprocess_ocr_text("Noodle Bar\n**Pad Thai**\nCome back soon") == "Noodle Bar\nPad Thai\nCome back soon"
+
+
+def test_fixture_corpus_keeps_every_item_and_amount():
+    from benchmarks.bench_prompt import fidelity
+    from benchmarks.fixtures import load_receipts
+    from services import llm_service
+
+    for receipt in load_receipts():
+        assert fidelity(llm_service, receipt), receipt["id"]
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✓ {name}")
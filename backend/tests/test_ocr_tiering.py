@@ -0,0 +1,102 @@
+"""
+Tests for tiered OCR: the arithmetic check, escalation reasons and tier selection
+Usage: uv run python -m pytest tests/test_ocr_tiering.py  (or: uv run python tests/test_ocr_tiering.py)
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import ocr_service
+from services.ocr_service import AMOUNT_RE, escalation_reason, parse_amount, receipt_arithmetic_ok
+
+GOOD = "Burger 10.00\nFries 4.50\nSubtotal 14.50\nTax 1.16\nTotal 15.66"
+WRONG_TOTAL = "Burger 10.00\nFries 4.50\nSubtotal 14.50\nTax 1.16\nTotal 16.66"
+
+ARITHMETIC_CASES = [
+    (GOOD, True),
+    (WRONG_TOTAL, False),
+    ("Burger 10.00\nFries 4.50\nTotal 14.50", True),
+    ("Steak 600.00\nWine 500.00\nSubtotal 1,100.00\nTax 88.00\nTotal 1,188.00", True),
+    ("Steak 600,00\nWein 500,00\nSubtotal 1.100,00\nTotal 1.100,00", True),
+    ("Burger 10.00\nFries 4.50\nSubtotal 15.50\nTotal 15.50", False),
+    ("Pizza 20.00\nDiscount -5.00\nDelivery fee 2.50\nTip 3.00\nTotal 20.50", True),
+    ("Pizza 20.00\nTotal 20.00\nCash 50.00\nChange 30.00", True),
+    ("Burger 10.00\nFries 4.50", False),
+    ("", False),
+]
+
+ESCALATION_CASES = [
+    ({"raw_text": GOOD, "confidence": 0.95}, None),
+    ({"raw_text": GOOD, "confidence": 0.95, "fallback": True}, "failed"),
+    ({"raw_text": "", "error": "OCR service unreachable"}, "failed"),
+    ({"raw_text": GOOD, "confidence": 0.5}, "low_confidence"),
+    ({"raw_text": WRONG_TOTAL, "confidence": 0.95}, "arithmetic"),
+    # Per-line scores: only lines with amounts count
+    ({"raw_text": "Diner\n" + GOOD, "confidence": 0.9, "line_confidences": [0.3, 0.9, 0.9, 0.9, 0.9, 0.9]}, None),
+    ({"raw_text": GOOD, "confidence": 0.9, "line_confidences": [0.9, 0.3, 0.9, 0.9, 0.9]}, "low_confidence"),
+]
+
+
+def fake_engines(results: dict):
+    """run_engine stand-in returning results[engine] (raising it if it's an exception)"""
+    async def run_engine(engine: str, contents: bytes) -> dict:
+        result = results[engine]
+        if isinstance(result, Exception):
+            raise result
+        return {**result, "engine": engine}
+    return run_engine
+
+
+def tiered(results: dict) -> dict:
+    saved = ocr_service.OCR_TIERS, ocr_service.run_engine
+    ocr_service.OCR_TIERS, ocr_service.run_engine = list(results), fake_engines(results)
+    try:
+        return asyncio.run(ocr_service.process_receipt_tiered(b"image"))
+    finally:
+        ocr_service.OCR_TIERS, ocr_service.run_engine = saved
+
+
+# (tier results in order, engine whose result is returned, issue found at each tier run)
+TIERED_CASES = [
+    ({"fast": {"raw_text": GOOD, "confidence": 0.95}, "slow": {"raw_text": GOOD, "confidence": 0.99}},
+     "fast", [None]),
+    ({"fast": {"raw_text": WRONG_TOTAL, "confidence": 0.95}, "slow": {"raw_text": GOOD, "confidence": 0.99}},
+     "slow", ["arithmetic", None]),
+    ({"fast": {"raw_text": GOOD, "confidence": 0.4}, "slow": {"raw_text": WRONG_TOTAL, "confidence": 0.9}},
+     "slow", ["low_confidence", "arithmetic"]),
+    # The last tier failing outright falls back to the earlier tier's text
+    ({"fast": {"raw_text": WRONG_TOTAL, "confidence": 0.95}, "slow": RuntimeError("model not loaded")},
+     "fast", ["arithmetic", "failed"]),
+]
+
+
+def test_amounts_with_thousands_separators():
+    assert [parse_amount(value) for _, value in AMOUNT_RE.findall("Total 1,234.56")] == [1234.56]
+    assert [parse_amount(value) for _, value in AMOUNT_RE.findall("Summe 1.234,56 €")] == [1234.56]
+    assert [parse_amount(value) for _, value in AMOUNT_RE.findall("Pizza x2 12,50")] == [12.5]
+
+
+def test_receipt_arithmetic_ok():
+    for text, expected in ARITHMETIC_CASES:
+        assert receipt_arithmetic_ok(text) is expected, text
+
+
+def test_escalation_reason():
+    for result, expected in ESCALATION_CASES:
+        assert escalation_reason(result) == expected, result
+
+
+def test_process_receipt_tiered():
+    for results, engine, issues in TIERED_CASES:
+        result = tiered(results)
+        assert result["engine"] == engine, results
+        assert [tier["issue"] for tier in result["tiers"]] == issues, results
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_") and callable(fn):
+            fn()
+            print(f"✓ {name}")
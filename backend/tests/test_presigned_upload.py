@@ -0,0 +1,64 @@
+"""
+Presigned receipt uploads against local MinIO (docker compose up -d minio)
+Usage: uv run python -m pytest tests/test_presigned_upload.py  (or: uv run python tests/test_presigned_upload.py)
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+import pytest
+from dotenv import load_dotenv
+
+load_dotenv()
+
+from services import storage_service
+
+IMAGE = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+
+
+def minio_reachable() -> bool:
+    try:
+        httpx.get(f"{storage_service.S3_ENDPOINT}/minio/health/live", timeout=2)
+        return True
+    except httpx.HTTPError:
+        return False
+
+
+pytestmark = pytest.mark.skipif(not minio_reachable(), reason="MinIO is not running")
+
+
+def test_presigned_post_upload():
+    upload = storage_service.create_presigned_upload("receipt.png", "image/png")
+    assert upload["key"].startswith(storage_service.UPLOAD_PREFIX) and upload["key"].endswith(".png")
+
+    response = httpx.post(upload["url"], data=upload["fields"], files={"file": ("receipt.png", IMAGE, "image/png")})
+    assert response.status_code in (200, 204), response.text
+
+    contents, content_type = storage_service.get_uploaded_object(upload["key"])
+    assert contents == IMAGE
+    assert content_type == "image/png"
+
+
+def test_presigned_put_upload():
+    upload = storage_service.create_presigned_upload(None, "image/jpeg")
+    response = httpx.put(upload["put_url"], content=IMAGE, headers={"Content-Type": "image/jpeg"})
+    assert response.status_code == 200, response.text
+    assert storage_service.get_uploaded_object(upload["key"])[0] == IMAGE
+
+
+def test_presigned_post_rejects_oversized_file():
+    upload = storage_service.create_presigned_upload("big.png", "image/png")
+    too_big = b"\x00" * (storage_service.MAX_UPLOAD_BYTES + 1)
+    response = httpx.post(upload["url"], data=upload["fields"], files={"file": ("big.png", too_big, "image/png")})
+    assert response.status_code >= 400
+    assert storage_service.get_uploaded_object(upload["key"]) is None
+
+
+def test_missing_object():
+    assert storage_service.get_uploaded_object(f"{storage_service.UPLOAD_PREFIX}does-not-exist.png") is None
+
+
+if __name__ == "__main__":
+    sys.exit(pytest.main([__file__, "-v"]))
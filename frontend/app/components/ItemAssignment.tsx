@@ -6,7 +6,10 @@ import { User, Item, Order, Split } from "../types";
 interface ItemAssignmentProps {
   order: Order;
   users: User[];
-  onSaveSplits: (splits: Split[]) => void;
+  // Splits already saved for the order; edits to them are sent as a PATCH of the changed items
+  splits?: Split[];
+  splitsVersion?: number;
+  onSaveSplits: (splits: Split[], splitsVersion: number) => void;
 }
 
 // Palette of colours cycled through for each user badge
@@ -34,15 +37,32 @@ function initials(name: string) {
     .slice(0, 2);
 }
 
-export default function ItemAssignment({ order, users, onSaveSplits }: ItemAssignmentProps) {
-  // assignments[itemId] = Set of userIds assigned to that item
-  const [assignments, setAssignments] = useState<Record<number, Set<number>>>(() => {
-    const init: Record<number, Set<number>> = {};
-    order.items.forEach((item) => {
-      init[item.id] = new Set();
-    });
-    return init;
+function assignmentsFromSplits(order: Order, splits: Split[]) {
+  const init: Record<number, Set<number>> = {};
+  order.items.forEach((item) => {
+    init[item.id] = new Set();
+  });
+  splits.forEach((split) => {
+    split.item_ids.forEach((itemId) => init[itemId]?.add(split.user_id));
   });
+  return init;
+}
+
+function sameUsers(a: Set<number>, b: Set<number>) {
+  return a.size === b.size && Array.from(a).every((uid) => b.has(uid));
+}
+
+export default function ItemAssignment({
+  order,
+  users,
+  splits = [],
+  splitsVersion = order.splits_version ?? 0,
+  onSaveSplits,
+}: ItemAssignmentProps) {
+  // assignments[itemId] = Set of userIds assigned to that item
+  const [assignments, setAssignments] = useState<Record<number, Set<number>>>(() =>
+    assignmentsFromSplits(order, splits)
+  );
   const [saving, setSaving] = useState(false);
   const [error, setError] = useState("");
 
@@ -110,30 +130,58 @@ export default function ItemAssignment({ order, users, onSaveSplits }: ItemAssig
     setSaving(true);
 
     try {
-      const payload = {
-        order_id: order.id,
-        assignments: order.items.map((item) => ({
-          item_id: item.id,
-          user_ids: Array.from(assignments[item.id]),
-        })),
-      };
-
-      const res = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/api/splits/bulk`,
-        {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify(payload),
+      let res: Response;
+      if (splits.length > 0) {
+        // Only send the items whose people changed; untouched splits keep their paid/reminder state
+        const saved = assignmentsFromSplits(order, splits);
+        const changes = order.items
+          .filter((item) => !sameUsers(saved[item.id], assignments[item.id]))
+          .map((item) => ({ item_id: item.id, user_ids: Array.from(assignments[item.id]) }));
+        if (changes.length === 0) {
+          onSaveSplits(splits, splitsVersion);
+          return;
         }
-      );
+        res = await fetch(
+          `${process.env.NEXT_PUBLIC_API_URL}/api/splits/order/${order.id}`,
+          {
+            method: "PATCH",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify({ version: splitsVersion, changes }),
+          }
+        );
+      } else {
+        const payload = {
+          order_id: order.id,
+          version: splitsVersion,
+          assignments: order.items.map((item) => ({
+            item_id: item.id,
+            user_ids: Array.from(assignments[item.id]),
+          })),
+        };
+        res = await fetch(
+          `${process.env.NEXT_PUBLIC_API_URL}/api/splits/bulk`,
+          {
+            method: "POST",
+            headers: { "Content-Type": "application/json" },
+            body: JSON.stringify(payload),
+          }
+        );
+      }
 
+      if (res.status === 409) {
+        throw new Error("Someone else changed these splits. Reload the order to see their changes.");
+      }
       if (!res.ok) {
         const data = await res.json();
         throw new Error(data.detail || "Failed to save splits");
       }
 
-      const splits: Split[] = await res.json();
-      onSaveSplits(splits);
+      if (splits.length > 0) {
+        const data = await res.json();
+        onSaveSplits(data.splits, data.version);
+      } else {
+        onSaveSplits(await res.json(), Number(res.headers.get("Splits-Version") ?? splitsVersion + 1));
+      }
     } catch (err: unknown) {
       setError(err instanceof Error ? err.message : "Failed to save splits");
     } finally {
@@ -27,6 +27,40 @@ export default function ReceiptUpload({ onUploadComplete }: ReceiptUploadProps)
     }
   };
 
+  // Upload straight to S3 with a presigned POST, then ask the API to process the stored image
+  const uploadDirect = async (file: File) => {
+    const api = process.env.NEXT_PUBLIC_API_URL;
+    const presign = await fetch(`${api}/api/orders/upload-url`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ filename: file.name, content_type: file.type || "image/jpeg" }),
+    });
+    if (!presign.ok) throw new Error("Could not get an upload URL");
+    const { key, url, fields } = await presign.json();
+
+    const form = new FormData();
+    Object.entries(fields as Record<string, string>).forEach(([name, value]) => form.append(name, value));
+    form.append("file", file);
+    const stored = await fetch(url, { method: "POST", body: form });
+    if (!stored.ok) throw new Error("Direct upload to storage failed");
+
+    return fetch(`${api}/api/orders/process-receipt`, {
+      method: "POST",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify({ key }),
+    });
+  };
+
+  // Fallback when storage isn't reachable from the browser: send the file through the API
+  const uploadThroughApi = (file: File) => {
+    const formData = new FormData();
+    formData.append("file", file);
+    return fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/upload-receipt`, {
+      method: "POST",
+      body: formData,
+    });
+  };
+
   const handleUpload = async () => {
     if (!file) {
       setError("Please select a file");
@@ -37,16 +71,7 @@ export default function ReceiptUpload({ onUploadComplete }: ReceiptUploadProps)
     setError("");
 
     try {
-      const formData = new FormData();
-      formData.append("file", file);
-
-      const response = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/api/orders/upload-receipt`,
-        {
-          method: "POST",
-          body: formData,
-        }
-      );
+      const response = await uploadDirect(file).catch(() => uploadThroughApi(file));
 
       if (!response.ok) {
         const errorData = await response.json();
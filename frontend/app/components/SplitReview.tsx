@@ -1,12 +1,13 @@
 "use client";
 
 import { useState } from "react";
-import { User, Item, Order, Split } from "../types";
+import { User, Item, Order, OrderDetail, Split } from "../types";
 
 interface SplitReviewProps {
   order: Order;
   splits: Split[];
   users: User[];
+  onEditAssignments?: () => void;
   onDone: () => void;
 }
 
@@ -30,7 +31,7 @@ function initials(name: string) {
     .slice(0, 2);
 }
 
-export default function SplitReview({ order, splits, users, onDone }: SplitReviewProps) {
+export default function SplitReview({ order, splits, users, onEditAssignments, onDone }: SplitReviewProps) {
   const [splitStates, setSplitStates] = useState<Split[]>(splits);
   const [sendingAll, setSendingAll] = useState(false);
   const [sendingId, setSendingId] = useState<number | null>(null);
@@ -93,13 +94,13 @@ export default function SplitReview({ order, splits, users, onDone }: SplitRevie
         { method: "POST" }
       );
       if (!res.ok) throw new Error("Failed to send reminders");
-      // Refresh all splits
-      const splitsRes = await fetch(
-        `${process.env.NEXT_PUBLIC_API_URL}/api/splits/order/${order.id}`
+      // Refresh all splits from the composite detail (one call, same payload as the orders page)
+      const detailRes = await fetch(
+        `${process.env.NEXT_PUBLIC_API_URL}/api/orders/${order.id}/detail`
       );
-      if (splitsRes.ok) {
-        const refreshed: Split[] = await splitsRes.json();
-        setSplitStates(refreshed);
+      if (detailRes.ok) {
+        const detail: OrderDetail = await detailRes.json();
+        setSplitStates(detail.splits);
       }
       showToast("All reminders sent!");
     } catch {
@@ -406,6 +407,15 @@ export default function SplitReview({ order, splits, users, onDone }: SplitRevie
         </div>
       )}
 
+      {onEditAssignments && (
+        <button
+          onClick={onEditAssignments}
+          className="w-full py-3 px-6 bg-blue-50 hover:bg-blue-100 text-blue-700 font-medium rounded-xl transition-colors"
+        >
+          Edit Assignments
+        </button>
+      )}
+
       {/* Done */}
       <button
         onClick={onDone}
@@ -20,8 +20,24 @@ interface Item {
   quantity: number;
 }
 
+interface Person {
+  id: number;
+  name: string;
+}
+
+interface SplitWithUser {
+  id: number;
+  user_id: number;
+  amount_owed: number;
+  paid_status: boolean;
+  user?: Person;
+}
+
+// GET /api/orders/{id}/detail: the order with its items, payer and splits in one call
 interface OrderDetails extends Order {
   items: Item[];
+  payer?: Person;
+  splits: SplitWithUser[];
 }
 
 export default function OrdersPage() {
@@ -49,7 +65,7 @@ export default function OrdersPage() {
   const fetchOrderDetails = async (orderId: number) => {
     setOrderLoading(true);
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/${orderId}`);
+      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/orders/${orderId}/detail`);
       const data = await response.json();
       setSelectedOrder(data);
     } catch (error) {
@@ -123,6 +139,9 @@ export default function OrdersPage() {
                   {new Date(selectedOrder.date).toLocaleDateString()} at{" "}
                   {new Date(selectedOrder.date).toLocaleTimeString()}
                 </p>
+                {selectedOrder.payer && (
+                  <p className="text-slate-600 text-sm mt-1">Paid by {selectedOrder.payer.name}</p>
+                )}
               </div>
               <button
                 onClick={() => setSelectedOrder(null)}
@@ -164,6 +183,34 @@ export default function OrdersPage() {
                   )}
                 </div>
 
+                {selectedOrder.splits && selectedOrder.splits.length > 0 && (
+                  <div className="space-y-2 mb-6">
+                    <h4 className="font-semibold text-slate-800 mb-3">Splits</h4>
+                    {selectedOrder.splits.map((split) => (
+                      <div
+                        key={split.id}
+                        className="flex justify-between items-center py-2 border-b border-slate-200"
+                      >
+                        <p className="font-medium text-slate-800">
+                          {split.user?.name ?? `User ${split.user_id}`}
+                        </p>
+                        <div className="flex items-center space-x-3">
+                          <span
+                            className={`text-xs font-medium px-2 py-1 rounded-full ${
+                              split.paid_status
+                                ? "bg-emerald-100 text-emerald-700"
+                                : "bg-orange-100 text-orange-700"
+                            }`}
+                          >
+                            {split.paid_status ? "Paid" : "Unpaid"}
+                          </span>
+                          <p className="font-semibold text-slate-800">${split.amount_owed.toFixed(2)}</p>
+                        </div>
+                      </div>
+                    ))}
+                  </div>
+                )}
+
                 <div className="bg-slate-50 rounded-xl p-4 space-y-2">
                   {selectedOrder.subtotal !== undefined && (
                     <div className="flex justify-between text-slate-700">
@@ -81,6 +81,7 @@ export default function Home() {
 
   // Step 3 → 4
   const [splits, setSplits] = useState<Split[]>([]);
+  const [splitsVersion, setSplitsVersion] = useState(0);
 
   useEffect(() => {
     fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/users/`)
@@ -120,6 +121,7 @@ export default function Home() {
         paid_by_user_id: payerId,
         image_url: imageUrl || null,
         ocr_raw_text: ocrText || null,
+        parsed_data: data,
         items: data.items.map((item) => ({
           name: item.name,
           price: item.price,
@@ -148,8 +150,9 @@ export default function Home() {
     }
   };
 
-  const handleSaveSplits = (newSplits: Split[]) => {
+  const handleSaveSplits = (newSplits: Split[], version: number) => {
     setSplits(newSplits);
+    setSplitsVersion(version);
     setStep(4);
   };
 
@@ -162,6 +165,7 @@ export default function Home() {
     setOcrEngine("");
     setOrder(null);
     setSplits([]);
+    setSplitsVersion(0);
   };
 
   return (
@@ -202,6 +206,8 @@ export default function Home() {
         <ItemAssignment
           order={order}
           users={users}
+          splits={splits}
+          splitsVersion={splitsVersion}
           onSaveSplits={handleSaveSplits}
         />
       )}
@@ -212,6 +218,7 @@ export default function Home() {
           order={order}
           splits={splits}
           users={users}
+          onEditAssignments={() => setStep(3)}
           onDone={handleDone}
         />
       )}
@@ -27,6 +27,8 @@ export interface Order {
   paid_by_user_id: number;
   image_url?: string;
   ocr_raw_text?: string;
+  parsed_data?: Record<string, unknown>;
+  splits_version?: number;
   date: string;
   items: Item[];
 }
@@ -43,6 +45,12 @@ export interface Split {
   message_sid?: string;
 }
 
+// GET /api/orders/{id}/detail: the order with its items, payer and splits (each with its user) in one call
+export interface OrderDetail extends Order {
+  payer?: User;
+  splits: (Split & { user?: User })[];
+}
+
 // The parsed receipt data returned from the LLM (before saving to DB)
 export interface ParsedReceiptData {
   restaurant: string;
@@ -54,3 +62,12 @@ export interface ParsedReceiptData {
   discount?: number;
   total: number;
 }
+
+// Per-user totals from the balance ledger (GET /api/balances/)
+export interface BalanceSummary {
+  user_id: number;
+  name: string;
+  total_owes: number;
+  total_owed: number;
+  net: number;
+}
@@ -1,6 +1,7 @@
 "use client";
 
 import { useState, useEffect } from "react";
+import { BalanceSummary } from "../types";
 
 interface User {
   id: number;
@@ -12,6 +13,7 @@ interface User {
 
 export default function UsersPage() {
   const [users, setUsers] = useState<User[]>([]);
+  const [balances, setBalances] = useState<Record<number, BalanceSummary>>({});
   const [loading, setLoading] = useState(true);
   const [showForm, setShowForm] = useState(false);
   const [editingUser, setEditingUser] = useState<User | null>(null);
@@ -42,8 +44,19 @@ export default function UsersPage() {
 
   useEffect(() => {
     fetchUsers();
+    fetchBalances();
   }, []);
 
+  const fetchBalances = async () => {
+    try {
+      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/balances/`);
+      const data: BalanceSummary[] = await response.json();
+      setBalances(Object.fromEntries(data.map((b) => [b.user_id, b])));
+    } catch (error) {
+      console.error("Failed to fetch balances:", error);
+    }
+  };
+
   const fetchUsers = async () => {
     try {
       const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL}/api/users`);
@@ -292,6 +305,16 @@ export default function UsersPage() {
                 <span className="font-medium">Payment:</span> {user.payment_handle}
               </p>
             )}
+            {balances[user.id] && (
+              <div className="mt-4 pt-4 border-t border-slate-100 flex justify-between text-sm">
+                <span className="text-red-600">
+                  Owes ${balances[user.id].total_owes.toFixed(2)}
+                </span>
+                <span className="text-green-600">
+                  Owed ${balances[user.id].total_owed.toFixed(2)}
+                </span>
+              </div>
+            )}
           </div>
         ))}
       </div>